@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+# Serve recipe, tag and ingredient reads from the native async views
+os.environ.setdefault('ASYNC_READS', '1')
 
 application = get_asgi_application()
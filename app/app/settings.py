@@ -46,6 +46,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -88,6 +89,34 @@ DATABASES = {
     }
 }
 
+# Read-only copies of the default database, e.g. DB_REPLICA_HOSTS=replica1,replica2
+DATABASE_REPLICAS = []
+for number, host in enumerate(filter(None, os.environ.get("DB_REPLICA_HOSTS", "").split(",")), 1):
+    DATABASE_REPLICAS.append(f"replica{number}")
+    DATABASES[f"replica{number}"] = dict(DATABASES["default"], HOST=host, TEST={"MIRROR": "default"})
+
+DATABASE_ROUTERS = ["core.routers.ReplicaRouter"]
+
+# Primary pins, throttle buckets and coalesced reads must be seen by every
+# process, so deployments set CACHE_URL=redis://host:6379/0. Without it each
+# process falls back to its own memory cache.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Compressed response bodies; per process and bounded, see COMPRESSION_CACHE_MAX_SIZE
+    "compression": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "compression",
+        "OPTIONS": {"MAX_ENTRIES": 256},
+    },
+}
+if os.environ.get("CACHE_URL"):
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ["CACHE_URL"],
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -137,3 +166,118 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = "/vol/web/media"
 
 AUTH_USER_MODEL = "core.User"
+
+# Number of rows removed per statement by the batched deletes in core.deletion
+DELETE_BATCH_SIZE = 1000
+
+# Limits enforced by core.uploadhandlers.ImageUploadHandler while an image streams in
+RECIPE_IMAGE_MAX_SIZE = 5 * 1024 * 1024
+RECIPE_IMAGE_MAX_PIXELS = 5000 * 5000
+RECIPE_IMAGE_FORMATS = ["JPEG", "PNG", "WEBP", "GIF"]
+
+# Resized variants served by recipes.views.recipe_image_variant
+RECIPE_IMAGE_WIDTHS = [160, 320, 640, 1280]
+RECIPE_IMAGE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Set to e.g. "X-Accel-Redirect" to let the web server send variant files
+RECIPE_IMAGE_SENDFILE_HEADER = None
+RECIPE_IMAGE_SENDFILE_PREFIX = "/internal-media/"
+
+# Mount recipes.async_views in front of the DRF read paths (enabled by app/asgi.py).
+# They throttle, read from replicas and coalesce like the viewsets they replace.
+ASYNC_READS = os.environ.get("ASYNC_READS") == "1"
+
+# Maximum number of changes returned by one /api/recipes/sync/ response
+SYNC_PAGE_SIZE = 1000
+
+# In-memory per-user indexes behind the recipes "cookable" and "similar" actions
+RECIPE_INDEX_CACHE_SIZE = 128
+RECIPE_INDEX_MAX_DELTA = 5000
+PANTRY_RESULT_LIMIT = 100
+SIMILAR_RESULT_CACHE_SIZE = 10000
+
+# Seconds an aggregated shopping list stays in the cache
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60
+
+# Seconds a user keeps reading from the primary database after a write
+READ_YOUR_WRITES_SECONDS = 5
+
+# Rows merged per transaction by core.imports, and rejected rows reported per import
+IMPORT_BATCH_SIZE = 5000
+IMPORT_MAX_REJECTED = 100
+
+# Admin changelists trust the planner's row estimate above this many rows
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100000
+
+# Response compression by core.middleware.CompressionMiddleware, in order of preference
+COMPRESSION_ENCODINGS = ["br", "gzip"]
+COMPRESSION_LEVELS = {"br": 5, "gzip": 6}
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_CACHE = "compression"
+COMPRESSION_CACHE_MAX_SIZE = 64 * 1024
+COMPRESSION_CACHE_TIMEOUT = 60 * 5
+
+# Sub-requests accepted by /api/batch/, and reads dispatched at the same time
+BATCH_MAX_REQUESTS = 20
+BATCH_MAX_CONCURRENCY = 4
+
+# Seconds a stored Idempotency-Key response is replayed for, and after which a
+# key whose request never finished can be used again
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+IDEMPOTENCY_IN_PROGRESS_TIMEOUT = 5 * 60
+# Multipart bodies sent with a key are spooled to be fingerprinted; larger
+# ones are refused with 413 before the rest is read. Fits image uploads and imports.
+IDEMPOTENCY_MAX_BODY_SIZE = 32 * 1024 * 1024
+
+# Cache alias holding the token buckets of core.throttling; it has to be shared
+# by every process (see CACHES) for the rates to hold across workers
+THROTTLE_CACHE = "default"
+
+# Seconds coalesced recipe reads stay fresh, are then served stale while one
+# request refreshes them, and how long identical requests wait for it
+COALESCE_FRESH_SECONDS = 30
+COALESCE_STALE_SECONDS = 60
+COALESCE_WAIT_SECONDS = 5
+
+# Database job queue run by `manage.py run_worker`: attempts per job, retry
+# backoff base and cap in seconds, seconds before a running job counts as
+# abandoned, and the idle poll interval and default pool size of a worker
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_BACKOFF = 30
+JOB_RETRY_BACKOFF_MAX = 60 * 60
+JOB_LOCK_TIMEOUT = 60 * 60
+JOB_POLL_INTERVAL = 1.0
+JOB_WORKER_PROCESSES = 1
+JOB_WORKER_THREADS = 1
+# Directory shared with the workers for files handed to jobs (system temp if unset)
+JOB_FILES_DIR = os.environ.get("JOB_FILES_DIR")
+
+REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": [
+        "rest_framework.renderers.JSONRenderer",
+        "core.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "rest_framework.parsers.JSONParser",
+        "core.parsers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+    "DEFAULT_THROTTLE_CLASSES": [
+        "core.throttling.UserBucketThrottle",
+        "core.throttling.AnonBucketThrottle",
+        "core.throttling.ScopedBucketThrottle",
+    ],
+    # Reverse proxies in front of the app; X-Forwarded-For is ignored unless
+    # set, so clients cannot pick the address they are throttled by
+    "NUM_PROXIES": int(os.environ.get("NUM_PROXIES", "0")),
+    "DEFAULT_THROTTLE_RATES": {
+        "user": "600/min",
+        "anon": "60/min",
+        "recipes": "300/min",
+        "recipe_attrs": "300/min",
+        "uploads": "10/min",
+        "bulk": "10/min",
+        "sync": "30/min",
+    },
+}
@@ -0,0 +1,12 @@
+# Settings for management commands and workers that never render the admin:
+# the admin app is installed without autodiscovery, so booting skips importing
+# every admin module (and what they pull in) while keeping its models and
+# migrations. Selected automatically by manage.py for LEAN_COMMANDS.
+from .settings import *  # noqa
+
+INSTALLED_APPS = [
+    "django.contrib.admin.apps.SimpleAdminConfig" if app == "django.contrib.admin" else app
+    for app in INSTALLED_APPS  # noqa: F405
+]
+
+ROOT_URLCONF = "app.urls_lean"
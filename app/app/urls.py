@@ -14,14 +14,20 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from core.views import BatchView, JobStatusView, ThrottleStatsView
+from recipes.views import recipe_image_variant
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("api/users/", include("users.urls")),
     path("api/recipes/", include("recipes.urls")),
+    path("api/batch/", BatchView.as_view(), name="batch"),
+    path("api/throttles/", ThrottleStatsView.as_view(), name="throttle-stats"),
+    re_path(r"^api/jobs/(?P<job>[0-9a-f]{32})/$", JobStatusView.as_view(), name="job-status"),
+    path("media/recipe/<int:pk>", recipe_image_variant, name="recipe-image-variant"),
 ]
 
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,113 @@
+"""
+Compare the sync WSGI read path with the native async ASGI read path.
+
+Each mode runs in its own process so ASYNC_READS picks the matching URLconf.
+A throwaway test database is created, seeded and destroyed on every run;
+point DJANGO_SETTINGS_MODULE at the Postgres settings for realistic numbers.
+
+    python -m benchmarks.async_reads --concurrency 50 --requests 500
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+URL = "/api/recipes/recipes/"
+
+
+def setup(mode, recipes):
+    os.environ["ASYNC_READS"] = "1" if mode == "async" else "0"
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+    import django
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    from django.contrib.auth import get_user_model
+    from rest_framework.authtoken.models import Token
+    from core.models import Recipe, Tag
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    user = get_user_model().objects.create_user(email="bench@example.com", password="bench-password")
+    tag = Tag.objects.create(user=user, name="bench")
+    Recipe.objects.bulk_create([
+        Recipe(user=user, title=f"recipe {i}", time_minutes=5, price="4.99")
+        for i in range(recipes)
+    ])
+    Recipe.tags.through.objects.bulk_create([
+        Recipe.tags.through(recipe_id=recipe_id, tag_id=tag.id)
+        for recipe_id in Recipe.objects.values_list("id", flat=True)
+    ])
+    return {"Authorization": f"Token {Token.objects.create(user=user).key}"}
+
+
+def run_sync(headers, concurrency, requests):
+    from django.test import Client
+
+    def fetch(_):
+        return Client().get(URL, headers=headers).status_code
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        return list(pool.map(fetch, range(requests)))
+
+
+def run_async(headers, concurrency, requests):
+    from django.test import AsyncClient
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch():
+            async with semaphore:
+                return (await AsyncClient().get(URL, headers=headers)).status_code
+
+        return await asyncio.gather(*(fetch() for _ in range(requests)))
+
+    return asyncio.run(main())
+
+
+def measure(args):
+    headers = setup(args.mode, args.recipes)
+    runner = run_async if args.mode == "async" else run_sync
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    statuses = runner(headers, args.concurrency, args.requests)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert set(statuses) == {200}, set(statuses)
+    print(
+        f"{args.mode:<6}{args.concurrency:>12}{args.requests / elapsed:>12.1f}"
+        f"{elapsed * 1000 / args.requests:>14.2f}{peak / 1024:>14.0f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["sync", "async"])
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--recipes", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.mode:
+        measure(args)
+        return
+
+    print(f"{'mode':<6}{'concurrency':>12}{'req/s':>12}{'ms/request':>14}{'peak KiB':>14}")
+    for mode in ("sync", "async"):
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.async_reads", "--mode", mode] + sys.argv[1:],
+            check=True
+        )
+
+
+if __name__ == "__main__":
+    main()
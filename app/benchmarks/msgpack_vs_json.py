@@ -0,0 +1,78 @@
+"""
+Payload size and encode/decode time of MessagePack against JSON.
+
+Recipe list and detail pages are built in memory with the shape the API
+serializers produce (decimal prices as strings, absolute image URLs and a
+srcset), then rendered and parsed with the registered renderers and parsers:
+
+    python -m benchmarks.msgpack_vs_json --recipes 1000 --runs 20
+"""
+import argparse
+import io
+import os
+import statistics
+import time
+
+
+def payloads(recipes):
+    listing = [
+        {
+            "id": i,
+            "title": f"recipe {i}",
+            "time_minutes": 5 + i % 60,
+            "price": f"{i % 100}.99",
+            "link": f"https://example.com/recipes/{i}/",
+            "tags": [1, 2, 3],
+            "ingredients": [4, 5, 6, 7],
+        }
+        for i in range(recipes)
+    ]
+    image = "http://testserver/media/uploads/recipe/3f/3fa85f6457174562b3fc2c963f66afa6.jpg"
+    detail = dict(
+        listing[0],
+        tags=[{"id": i, "name": f"tag {i}", "recipe_count": i} for i in range(3)],
+        ingredients=[{"id": i, "name": f"ingredient {i}", "recipe_count": i} for i in range(4)],
+        image=image,
+        srcset=", ".join(f"{image}?w={width} {width}w" for width in (160, 320, 640, 1280)),
+    )
+    return {"list": listing, "detail": detail}
+
+
+def timed(func, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return result, statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recipes", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+    import django
+    django.setup()
+
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+    from core.parsers import MessagePackParser
+    from core.renderers import MessagePackRenderer
+
+    formats = [("json", JSONRenderer(), JSONParser()), ("msgpack", MessagePackRenderer(), MessagePackParser())]
+    for name, data in payloads(args.recipes).items():
+        for fmt, renderer, parser in formats:
+            body, encode = timed(lambda: renderer.render(data), args.runs)
+            _, decode = timed(lambda: parser.parse(io.BytesIO(body)), args.runs)
+            print(
+                f"{name:<6} {fmt:<8} {len(body):9d} bytes"
+                f"  render {encode * 1000:8.3f} ms"
+                f"  parse {decode * 1000:8.3f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
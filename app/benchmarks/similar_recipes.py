@@ -0,0 +1,72 @@
+"""
+Query latency of SimilarityIndex on a synthetic catalogue.
+
+The index is filled directly, without a database, so this measures the
+scoring path only:
+
+    python -m benchmarks.similar_recipes --recipes 100000
+"""
+import argparse
+import os
+import random
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+django.setup()
+
+from recipes.indexes import SimilarityIndex  # noqa: E402
+
+
+def build(recipes, tags, ingredients, seed=0):
+    rng = random.Random(seed)
+    ingredient_weights = [1 / (rank + 1) for rank in range(ingredients)]
+    index = SimilarityIndex(user_id=None)
+    started = time.perf_counter()
+    for recipe_id in range(1, recipes + 1):
+        features = {index._feature(0, tag) for tag in rng.sample(range(tags), rng.randint(1, 4))}
+        features |= {
+            index._feature(1, ingredient)
+            for ingredient in rng.choices(range(ingredients), ingredient_weights, k=rng.randint(3, 12))
+        }
+        index._set(recipe_id, features)
+    return index, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recipes", type=int, default=100000)
+    parser.add_argument("--tags", type=int, default=50)
+    parser.add_argument("--ingredients", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    index, build_time = build(args.recipes, args.tags, args.ingredients)
+    print(f"built index for {args.recipes} recipes in {build_time:.1f}s")
+
+    rng = random.Random(1)
+    for metric in ("jaccard", "cosine"):
+        timings = []
+        for _ in range(args.queries):
+            recipe_id = rng.randint(1, args.recipes)
+            started = time.perf_counter()
+            index._score(recipe_id, args.k, metric)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        print(
+            f"{metric:<8} p50 {timings[len(timings) // 2]:.2f} ms"
+            f"  p95 {timings[int(len(timings) * 0.95)]:.2f} ms"
+            f"  max {timings[-1]:.2f} ms"
+        )
+
+    recipe_id = rng.randint(1, args.recipes)
+    index.similar(recipe_id, args.k)
+    started = time.perf_counter()
+    index.similar(recipe_id, args.k)
+    print(f"cached   {(time.perf_counter() - started) * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
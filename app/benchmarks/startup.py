@@ -0,0 +1,63 @@
+"""
+Cold-start time of a fresh process for each settings profile.
+
+Every run boots Django in a new interpreter and serves one request, so the
+numbers include interpreter start, django.setup() and URLconf loading. Pass
+--record to append the medians with the current commit to a JSON lines file
+and follow boot time across commits:
+
+    python -m benchmarks.startup --runs 10 --record startup.jsonl
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import time
+
+from core import startup
+
+PROFILES = ["app.settings", "app.settings_lean"]
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--url", default="/api/recipes/tags/")
+    parser.add_argument("--settings", nargs="+", default=PROFILES)
+    parser.add_argument("--record", default=None)
+    args = parser.parse_args()
+
+    results = {}
+    for settings_module in args.settings:
+        runs = [startup.measure(args.url, settings_module) for _ in range(args.runs)]
+        results[settings_module] = {
+            key: statistics.median(run[key] for run in runs)
+            for key in ("process", "setup", "first_request", "modules")
+        }
+        result = results[settings_module]
+        print(
+            f"{settings_module:<24} process {result['process'] * 1000:7.1f} ms"
+            f"  setup {result['setup'] * 1000:7.1f} ms"
+            f"  first request {result['first_request'] * 1000:7.1f} ms"
+            f"  modules {result['modules']:.0f}"
+        )
+
+    if args.record:
+        with open(args.record, "a") as record:
+            record.write(json.dumps({"commit": commit(), "time": time.time(), "results": results}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
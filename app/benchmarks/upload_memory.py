@@ -0,0 +1,90 @@
+"""
+Peak memory per concurrent image upload, and bytes handed on to the
+memory/temporary file handlers, with and without ImageUploadHandler.
+
+Run from the app directory:
+
+    python -m benchmarks.upload_memory --concurrency 16
+"""
+import argparse
+import io
+import os
+import threading
+import tracemalloc
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.files.uploadhandler import load_handler  # noqa: E402
+from django.http.multipartparser import MultiPartParser  # noqa: E402
+from PIL import Image  # noqa: E402
+from core.uploadhandlers import ImageUploadHandler  # noqa: E402
+
+BOUNDARY = "benchmark-boundary"
+
+
+def multipart_body(payload, filename):
+    head = (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="image"; filename="{filename}"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    return head + payload + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def image_bytes(size, image_format, noise=True):
+    data = os.urandom(size[0] * size[1] * 3) if noise else bytes(size[0] * size[1] * 3)
+    buffer = io.BytesIO()
+    Image.frombytes("RGB", size, data).save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+def parse(body, guarded, stored):
+    handlers = [load_handler(path) for path in settings.FILE_UPLOAD_HANDLERS]
+    if guarded:
+        handlers.insert(0, ImageUploadHandler())
+    meta = {
+        "CONTENT_TYPE": f"multipart/form-data; boundary={BOUNDARY}",
+        "CONTENT_LENGTH": str(len(body)),
+    }
+    _, files = MultiPartParser(meta, io.BytesIO(body), handlers).parse()
+    for upload in files.values():
+        stored.append(upload.size)
+        upload.close()
+
+
+def measure(body, guarded, concurrency):
+    stored = []
+    tracemalloc.start()
+    threads = [threading.Thread(target=parse, args=(body, guarded, stored)) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / concurrency, sum(stored) / concurrency
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    scenarios = {
+        "valid 1MP jpeg": multipart_body(image_bytes((1000, 1000), "JPEG"), "a.jpg"),
+        "oversized png": multipart_body(image_bytes((1800, 1800), "PNG"), "b.png"),
+        "pixel bomb png": multipart_body(image_bytes((8000, 8000), "PNG", noise=False), "c.png"),
+    }
+    print(f"{'per upload':<18}{'body':>10}{'default peak':>14}{'stored':>10}{'guarded peak':>14}{'stored':>10}")
+    for name, body in scenarios.items():
+        default = measure(body, False, args.concurrency)
+        guarded = measure(body, True, args.concurrency)
+        print(f"{name:<18}{len(body):>10}{default[0]:>14.0f}{default[1]:>10.0f}{guarded[0]:>14.0f}{guarded[1]:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
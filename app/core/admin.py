@@ -1,9 +1,39 @@
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from django.utils.translation import gettext as _
 from . import models
 
 
+class EstimatedCountPaginator(Paginator):
+    # Unfiltered changelists of large tables use the planner's row estimate
+    # instead of a COUNT(*) that scans the whole table.
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if not queryset.query.where and connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                    [connection.ops.quote_name(queryset.model._meta.db_table)]
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return int(row[0])
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_select_related = ["user"]
+    raw_id_fields = ["user"]
+
+
 class UserAdmin(BaseUserAdmin):
     ordering = ["id"]
     list_display = ["email", "name"]
@@ -21,7 +51,19 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class RecipeAttrAdmin(LargeTableAdmin):
+    list_display = ["name", "user", "recipe_count"]
+    search_fields = ["name__startswith", "user__email__exact"]
+    readonly_fields = ["recipe_count"]
+
+
+class RecipeAdmin(LargeTableAdmin):
+    list_display = ["title", "user", "time_minutes", "price"]
+    search_fields = ["title__startswith", "user__email__exact"]
+    autocomplete_fields = ["tags", "ingredients"]
+
+
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Tag)
-admin.site.register(models.Ingredient)
-admin.site.register(models.Recipe)
+admin.site.register(models.Tag, RecipeAttrAdmin)
+admin.site.register(models.Ingredient, RecipeAttrAdmin)
+admin.site.register(models.Recipe, RecipeAdmin)
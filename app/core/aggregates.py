@@ -0,0 +1,24 @@
+from django.db import models
+
+
+class ConcatIds(models.Aggregate):
+    function = "STRING_AGG"
+    template = "%(function)s(CAST(%(expressions)s AS TEXT), ',')"
+    output_field = models.TextField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler,
+            connection,
+            function="GROUP_CONCAT",
+            template="%(function)s(%(expressions)s)",
+            **extra_context
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sqlite(compiler, connection, **extra_context)
+
+    def convert_value(self, value, expression, connection):
+        if not value:
+            return []
+        return sorted(int(object_id) for object_id in value.split(","))
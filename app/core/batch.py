@@ -0,0 +1,168 @@
+import io
+import json
+import logging
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections, transaction
+from django.urls import Resolver404, resolve
+from django.utils.translation import gettext as _
+from rest_framework import status
+from . import routers
+
+API_PREFIX = "/api/"
+READ_METHODS = ("GET", "HEAD")
+
+logger = logging.getLogger("django.request")
+
+
+class Rollback(Exception):
+    pass
+
+
+def build_request(parent, item):
+    # A bare request for one sub-request: the parent's headers and the user it
+    # already authenticated, a JSON body, and none of the middleware.
+    url = urlsplit(item["path"])
+    payload = b"" if item.get("body") is None else json.dumps(item["body"]).encode()
+    environ = {key: value for key, value in parent.META.items() if key.startswith("HTTP_")}
+    environ.pop("HTTP_IDEMPOTENCY_KEY", None)
+    environ.update({
+        "REQUEST_METHOD": item["method"],
+        "PATH_INFO": url.path,
+        "QUERY_STRING": url.query,
+        "SERVER_NAME": parent.META.get("SERVER_NAME", "localhost"),
+        "SERVER_PORT": parent.META.get("SERVER_PORT", "80"),
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(payload)),
+        "HTTP_ACCEPT": "application/json",
+        "wsgi.input": io.BytesIO(payload),
+        "wsgi.url_scheme": parent.scheme,
+    })
+    request = WSGIRequest(environ)
+    request._force_auth_user = parent.user
+    request._force_auth_token = parent.auth
+    return request
+
+
+def _body(response):
+    # DRF responses are used unrendered; the batch response renders them once
+    if hasattr(response, "data"):
+        return response.data
+    if response.get("Content-Type", "").startswith("application/json"):
+        return json.loads(response.content)
+    return None
+
+
+def dispatch(parent, item):
+    try:
+        match = resolve(urlsplit(item["path"]).path)
+    except Resolver404:
+        return {"status": status.HTTP_404_NOT_FOUND, "headers": {}, "body": {"detail": _("Not found.")}}
+
+    # Async read paths expose the DRF view they fall back to
+    view = getattr(match.func, "sync_view", match.func)
+    if iscoroutinefunction(view):
+        view = async_to_sync(view)
+    try:
+        response = view(build_request(parent, item), *match.args, **match.kwargs)
+    except Exception:
+        # Only this entry fails; responses of earlier, committed writes are
+        # still returned
+        logger.exception("Internal Server Error in batch: %s %s", item["method"], item["path"])
+        return {
+            "status": status.HTTP_500_INTERNAL_SERVER_ERROR,
+            "headers": {},
+            "body": {"detail": _("A server error occurred.")},
+        }
+    return {
+        "status": response.status_code,
+        "headers": {key: value for key, value in response.items() if key not in ("Content-Type", "Content-Length")},
+        "body": _body(response),
+    }
+
+
+def _dispatch_reads(parent, items, workers):
+    # Each thread takes reads off a shared queue and closes its database
+    # connections once it runs dry, so a group opens at most `workers`
+    # connections rather than one per read.
+    responses = [None] * len(items)
+    pending = queue.SimpleQueue()
+    for position, item in enumerate(items):
+        pending.put((position, item))
+
+    def work():
+        try:
+            while True:
+                try:
+                    position, item = pending.get_nowait()
+                except queue.Empty:
+                    return
+                responses[position] = dispatch(parent, item)
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for future in [pool.submit(work) for _ in range(workers)]:
+            future.result()
+    return responses
+
+
+def _groups(items):
+    # Runs of consecutive reads, with every write on its own, so reads never
+    # overtake a write listed before them.
+    group = []
+    for item in items:
+        if item["method"] in READ_METHODS:
+            group.append(item)
+            continue
+        if group:
+            yield group
+            group = []
+        yield [item]
+    if group:
+        yield group
+
+
+def _dispatch_write(parent, item):
+    # Reads after a write must not be answered from entries keyed on the
+    # change_seq the user was authenticated with
+    response = dispatch(parent, item)
+    parent.user.refresh_from_db(fields=["change_seq"])
+    return response
+
+
+def run(parent, items):
+    responses = []
+    for group in _groups(items):
+        if group[0]["method"] not in READ_METHODS:
+            responses.append(_dispatch_write(parent, group[0]))
+            continue
+        workers = min(len(group), settings.BATCH_MAX_CONCURRENCY)
+        if workers < 2:
+            responses.extend(dispatch(parent, item) for item in group)
+            continue
+        responses.extend(_dispatch_reads(parent, group, workers))
+    return responses
+
+
+def run_atomic(parent, items):
+    # Sequential, in one transaction on the primary; the first failing
+    # sub-request rolls everything back and ends the batch.
+    routers.pin_to_primary(parent.user.id)
+    responses = []
+    try:
+        with transaction.atomic():
+            for item in items:
+                if item["method"] in READ_METHODS:
+                    responses.append(dispatch(parent, item))
+                else:
+                    responses.append(_dispatch_write(parent, item))
+                if responses[-1]["status"] >= 400:
+                    raise Rollback
+    except Rollback:
+        return responses, False
+    return responses, True
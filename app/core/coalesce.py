@@ -0,0 +1,185 @@
+import asyncio
+import functools
+import hashlib
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+from . import routers
+
+POLL_INTERVAL = 0.05
+
+_flights = {}
+_flights_lock = threading.Lock()
+# Flights of asingle_flight; they only run on the event loop, so need no lock
+_async_flights = {}
+
+
+class Flight:
+    def __init__(self, event=threading.Event):
+        self.done = event()
+        self.value = None
+
+
+def _lead(key, compute, stale, fresh_seconds, stale_seconds, wait_seconds, cacheable):
+    # Only the holder of the cache lock computes; others across processes
+    # serve the stale value if there is one, else poll for the new one.
+    lock_key = f"{key}:lock"
+    token = uuid.uuid4().hex
+    if not cache.add(lock_key, token, wait_seconds):
+        if stale is not None:
+            return stale[0]
+        deadline = time.monotonic() + wait_seconds
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry[0]
+        return compute()
+
+    try:
+        value = compute()
+        if cacheable(value):
+            cache.set(key, (value, time.time() + fresh_seconds), fresh_seconds + stale_seconds)
+        return value
+    finally:
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+
+
+def single_flight(key, compute, fresh_seconds=None, stale_seconds=None, wait_seconds=None, cacheable=bool):
+    # Returns the cached value while fresh. Once it expires one caller
+    # recomputes it while identical concurrent callers share the result: they
+    # get the stale value during the next stale_seconds, otherwise wait up to
+    # wait_seconds before computing it themselves.
+    fresh_seconds = settings.COALESCE_FRESH_SECONDS if fresh_seconds is None else fresh_seconds
+    stale_seconds = settings.COALESCE_STALE_SECONDS if stale_seconds is None else stale_seconds
+    wait_seconds = settings.COALESCE_WAIT_SECONDS if wait_seconds is None else wait_seconds
+
+    entry = cache.get(key)
+    if entry is not None and entry[1] > time.time():
+        return entry[0]
+
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = Flight()
+
+    if not leader:
+        if entry is not None:
+            return entry[0]
+        if flight.done.wait(wait_seconds) and flight.value is not None:
+            return flight.value
+        return compute()
+
+    try:
+        flight.value = _lead(key, compute, entry, fresh_seconds, stale_seconds, wait_seconds, cacheable)
+        return flight.value
+    finally:
+        flight.done.set()
+        with _flights_lock:
+            _flights.pop(key, None)
+
+
+async def _alead(key, compute, stale, fresh_seconds, stale_seconds, wait_seconds, cacheable):
+    # Same as _lead, awaiting the cache and compute
+    lock_key = f"{key}:lock"
+    token = uuid.uuid4().hex
+    if not await cache.aadd(lock_key, token, wait_seconds):
+        if stale is not None:
+            return stale[0]
+        deadline = time.monotonic() + wait_seconds
+        while time.monotonic() < deadline:
+            await asyncio.sleep(POLL_INTERVAL)
+            entry = await cache.aget(key)
+            if entry is not None:
+                return entry[0]
+        return await compute()
+
+    try:
+        value = await compute()
+        if cacheable(value):
+            await cache.aset(key, (value, time.time() + fresh_seconds), fresh_seconds + stale_seconds)
+        return value
+    finally:
+        if await cache.aget(lock_key) == token:
+            await cache.adelete(lock_key)
+
+
+async def asingle_flight(key, compute, fresh_seconds=None, stale_seconds=None, wait_seconds=None, cacheable=bool):
+    # single_flight for async views, with compute a coroutine function.
+    # Entries and locks are shared with other processes through the cache.
+    fresh_seconds = settings.COALESCE_FRESH_SECONDS if fresh_seconds is None else fresh_seconds
+    stale_seconds = settings.COALESCE_STALE_SECONDS if stale_seconds is None else stale_seconds
+    wait_seconds = settings.COALESCE_WAIT_SECONDS if wait_seconds is None else wait_seconds
+
+    entry = await cache.aget(key)
+    if entry is not None and entry[1] > time.time():
+        return entry[0]
+
+    flight = _async_flights.get(key)
+    if flight is not None:
+        if entry is not None:
+            return entry[0]
+        try:
+            await asyncio.wait_for(flight.done.wait(), wait_seconds)
+        except asyncio.TimeoutError:
+            pass
+        if flight.value is not None:
+            return flight.value
+        return await compute()
+
+    flight = _async_flights[key] = Flight(asyncio.Event)
+    try:
+        flight.value = await _alead(key, compute, entry, fresh_seconds, stale_seconds, wait_seconds, cacheable)
+        return flight.value
+    finally:
+        flight.done.set()
+        _async_flights.pop(key, None)
+
+
+def _change_seq(request):
+    # On a replica the counter is read from that replica before the body, so
+    # an entry never holds data older than the change_seq in its key
+    if not routers.reading_from_replica():
+        return request.user.change_seq
+    return get_user_model().objects.filter(pk=request.user.pk).values_list("change_seq", flat=True).first()
+
+
+async def _achange_seq(request):
+    if not routers.reading_from_replica():
+        return request.user.change_seq
+    return await get_user_model().objects.filter(pk=request.user.pk).values_list("change_seq", flat=True).afirst()
+
+
+def coalesce(fresh_seconds=None, stale_seconds=None, wait_seconds=None):
+    # For read actions of viewsets: identical requests of the same user share
+    # one computation. change_seq is part of the key, so a user's own writes
+    # are never answered from an older entry; only 200 responses are kept.
+    # Sharing across processes needs the default cache to be shared too.
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            digest = hashlib.sha1(request.build_absolute_uri().encode()).hexdigest()
+            key = f"coalesce:{type(self).__name__}:{self.action}:{request.user.id}:{_change_seq(request)}:{digest}"
+
+            def compute():
+                response = method(self, request, *args, **kwargs)
+                return response.status_code, response.data
+
+            status_code, data = single_flight(
+                key,
+                compute,
+                fresh_seconds,
+                stale_seconds,
+                wait_seconds,
+                cacheable=lambda value: value[0] == status.HTTP_200_OK
+            )
+            return Response(data, status=status_code)
+        return wrapper
+    return decorator
@@ -0,0 +1,105 @@
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, transaction
+from . import jobs, models
+
+
+def _links(model):
+    tags = models.Recipe.tags.through
+    ingredients = models.Recipe.ingredients.through
+    if model is models.Recipe:
+        return [(tags, "recipe"), (ingredients, "recipe")]
+    elif model is models.Tag:
+        return [(tags, "tag")]
+    elif model is models.Ingredient:
+        return [(ingredients, "ingredient")]
+    return []
+
+
+def _delete_ids(model, ids, using):
+    connection = connections[using]
+    placeholders = ", ".join("%s" for _ in ids)
+    tables = [
+        (through._meta.db_table, through._meta.get_field(field).column)
+        for through, field in _links(model)
+    ]
+    tables.append((model._meta.db_table, model._meta.pk.column))
+
+    if model is models.Recipe:
+        models.Recipe.objects.db_manager(using).adjust_link_counts(ids, -1)
+
+    with connection.cursor() as cursor:
+        for table, column in tables:
+            cursor.execute(
+                f"DELETE FROM {connection.ops.quote_name(table)} "
+                f"WHERE {connection.ops.quote_name(column)} IN ({placeholders})",
+                ids
+            )
+        return cursor.rowcount
+
+
+def _record_tombstones(queryset, rows):
+    changes = models.ChangeLog.objects.db_manager(queryset.db)
+    for user_id in {user_id for _, user_id in rows}:
+        changes.record(
+            user_id,
+            queryset.model._meta.model_name,
+            [pk for pk, owner in rows if owner == user_id],
+            deleted=True
+        )
+
+
+def delete_in_batches(queryset, batch_size=None, progress=None, record_changes=True):
+    batch_size = batch_size or settings.DELETE_BATCH_SIZE
+    deleted = 0
+    # Owners are only needed for the tombstones
+    fields = ["pk", "user_id"] if record_changes else ["pk"]
+    while True:
+        rows = list(queryset.order_by().values_list(*fields)[:batch_size])
+        if not rows:
+            return deleted
+
+        with transaction.atomic(using=queryset.db):
+            deleted += _delete_ids(queryset.model, [row[0] for row in rows], queryset.db)
+            if record_changes:
+                _record_tombstones(queryset, rows)
+        if progress:
+            progress(deleted)
+
+
+def delete_user(user, batch_size=None, progress=None):
+    user.is_active = False
+    user.save(update_fields=["is_active"])
+
+    deleted = 0
+
+    def report(count):
+        if progress:
+            progress(deleted + count)
+
+    for queryset in (user.recipes.all(), user.tags.all(), user.ingredients.all()):
+        deleted += delete_in_batches(
+            queryset,
+            batch_size=batch_size,
+            progress=report,
+            record_changes=False
+        )
+    # The change log is dropped in batches too, so the final cascade is small
+    delete_in_batches(user.changes.all(), batch_size=batch_size, record_changes=False)
+
+    user.delete()
+    return deleted
+
+
+@jobs.job()
+def delete_objects(model_label, user_id, ids, progress=None):
+    model = apps.get_model(model_label)
+    return delete_in_batches(model.objects.filter(user_id=user_id, id__in=ids), progress=progress)
+
+
+@jobs.job()
+def delete_user_by_id(user_id, progress=None):
+    user = models.User.objects.filter(pk=user_id).first()
+    if user is None:
+        return 0
+    return delete_user(user, progress=progress)
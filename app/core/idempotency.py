@@ -0,0 +1,123 @@
+import hashlib
+import tempfile
+from datetime import timedelta
+from functools import partial
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.throttling import BaseThrottle
+from . import models
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+
+class KeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = _("This Idempotency-Key was already used for a different request.")
+    default_code = "idempotency_key_reused"
+
+
+class InProgress(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = _("A request with this Idempotency-Key is still being processed.")
+    default_code = "idempotency_key_in_progress"
+
+
+class BodyTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = _("Request bodies sent with an Idempotency-Key must be smaller than %(size)s bytes.")
+    default_code = "idempotency_body_too_large"
+
+    def __init__(self):
+        super().__init__(self.default_detail % {"size": settings.IDEMPOTENCY_MAX_BODY_SIZE})
+
+
+class Replay(Exception):
+    def __init__(self, record):
+        super().__init__(record.key)
+        self.record = record
+
+
+def owner(request):
+    # Anonymous callers are told apart by client address, as the throttles
+    # identify them, hashed to fit the column
+    if request.user and request.user.is_authenticated:
+        return f"user:{request.user.id}"
+    ident = BaseThrottle().get_ident(request) or ""
+    return f"anonymous:{hashlib.sha256(ident.encode()).hexdigest()[:40]}"
+
+
+def _spool_body(request, digest):
+    # Multipart bodies may be larger than DATA_UPLOAD_MAX_MEMORY_SIZE, so
+    # rather than request.body they are hashed into a temporary file that
+    # the upload handlers then parse as if it were the original stream.
+    # Spooling stops at IDEMPOTENCY_MAX_BODY_SIZE, so it cannot fill the disk.
+    http_request = request._request
+    limit = settings.IDEMPOTENCY_MAX_BODY_SIZE
+    try:
+        length = int(http_request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        length = 0
+    if length > limit:
+        raise BodyTooLarge()
+
+    spooled = tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+    size = 0
+    for chunk in iter(partial(http_request.read, 64 * 1024), b""):
+        size += len(chunk)
+        if size > limit:
+            spooled.close()
+            raise BodyTooLarge()
+        digest.update(chunk)
+        spooled.write(chunk)
+    spooled.seek(0)
+    http_request._stream = spooled
+    http_request._read_started = False
+
+
+def fingerprint(request):
+    digest = hashlib.sha256(f"{request.method} {request.get_full_path()}\n".encode())
+    if request.content_type.startswith("multipart/"):
+        _spool_body(request, digest)
+    else:
+        digest.update(request.body)
+    return digest.hexdigest()
+
+
+def claim(owner, key, fingerprint):
+    # None when this request now holds the key, otherwise the existing row
+    # Keys left in progress by a process that died are taken over after
+    # IDEMPOTENCY_IN_PROGRESS_TIMEOUT
+    keys = models.IdempotencyKey.objects
+    abandoned = timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_IN_PROGRESS_TIMEOUT)
+    keys.filter(
+        Q(created__lt=expired_before()) | Q(status_code__isnull=True, created__lt=abandoned),
+        owner=owner,
+        key=key
+    ).delete()
+    while True:
+        try:
+            with transaction.atomic():
+                keys.create(owner=owner, key=key, fingerprint=fingerprint)
+            return None
+        except IntegrityError:
+            existing = keys.filter(owner=owner, key=key).first()
+            if existing is not None:
+                return existing
+
+
+def complete(owner, key, status_code, data):
+    models.IdempotencyKey.objects.filter(owner=owner, key=key).update(status_code=status_code, response=data)
+
+
+def release(owner, key):
+    models.IdempotencyKey.objects.filter(owner=owner, key=key, status_code__isnull=True).delete()
+
+
+def expired_before():
+    return timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
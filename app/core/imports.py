@@ -0,0 +1,330 @@
+import csv
+import io
+import json
+import os
+import re
+import uuid
+from decimal import Decimal
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models.functions import Lower, Trim
+from . import jobs, merge, models
+
+FORMATS = ("csv", "ndjson")
+COLUMNS = ("title", "time_minutes", "price", "link", "tags", "ingredients")
+# Tag and ingredient names are staged as one string per row
+NAME_SEPARATOR = "|"
+
+# The same rules are applied in SQL on the staged rows and in Python on the
+# fallback path, so both report identical errors.
+TIME_PATTERN = "^[0-9]{1,9}$"
+PRICE_PATTERN = "^[0-9]{1,3}([.][0-9]{1,2})?$"
+RULES = [
+    ("title", "title is required."),
+    ("title_length", "title must be at most 100 characters."),
+    ("time_minutes", "time_minutes must be a whole number."),
+    ("price", "price must have at most 3 digits before and 2 after the decimal point."),
+    ("link", "link must be at most 255 characters."),
+    ("names", "tag and ingredient names must be at most 50 characters."),
+]
+
+
+def detect_format(name):
+    ext = os.path.splitext(name)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".ndjson", ".jsonl"):
+        return "ndjson"
+    return None
+
+
+def _names(value):
+    if isinstance(value, (list, tuple)):
+        value = NAME_SEPARATOR.join(str(name) for name in value)
+    return value or ""
+
+
+def read_rows(fileobj, fmt):
+    # Yields (line, title, time_minutes, price, link, tags, ingredients) with
+    # every value as a string; validation happens in the merge step.
+    text = io.TextIOWrapper(fileobj, encoding="utf-8", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield (reader.line_num, *(str(record.get(column) or "").strip() for column in COLUMNS))
+        return
+
+    for line, raw in enumerate(text, 1):
+        if not raw.strip():
+            continue
+        try:
+            record = json.loads(raw)
+        except ValueError:
+            record = None
+        if not isinstance(record, dict):
+            yield (line, "", "", "", "", "", "")
+            continue
+        yield (
+            line,
+            str(record.get("title") or "").strip(),
+            str(record.get("time_minutes", "")).strip(),
+            str(record.get("price", "")).strip(),
+            str(record.get("link") or "").strip(),
+            _names(record.get("tags")),
+            _names(record.get("ingredients")),
+        )
+
+
+def _batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _relations():
+    for field in ("tags", "ingredients"):
+        related = models.Recipe._meta.get_field(field)
+        yield field, related.related_model, related.remote_field.through
+
+
+def _record_changes(user_id, using, recipe_ids, created):
+    changes = models.ChangeLog.objects.db_manager(using)
+    changes.record(user_id, models.ChangeLog.RECIPE, recipe_ids)
+    for model, ids in created.items():
+        changes.record(user_id, model._meta.model_name, ids)
+
+
+class PythonMerge:
+    # Fallback for databases without COPY: same steps, done with bulk ORM
+    # statements per batch instead of SQL over a staging table.
+    def __init__(self, user, using):
+        self.user = user
+        self.using = using
+
+    def close(self):
+        pass
+
+    def error(self, row):
+        _, title, time_minutes, price, link, tags, ingredients = row
+        names = [merge.clean_name(name) for name in (tags + NAME_SEPARATOR + ingredients).split(NAME_SEPARATOR)]
+        checks = {
+            "title": bool(title),
+            "title_length": len(title) <= 100,
+            "time_minutes": re.match(TIME_PATTERN, time_minutes),
+            "price": re.match(PRICE_PATTERN, price),
+            "link": len(link) <= 255,
+            "names": all(len(name) <= 50 for name in names),
+        }
+        for rule, message in RULES:
+            if not checks[rule]:
+                return message
+        return None
+
+    def merge(self, batch):
+        rejected = []
+        valid = []
+        for row in batch:
+            error = self.error(row)
+            if error:
+                rejected.append({"line": row[0], "error": error})
+            else:
+                valid.append(row)
+
+        recipes = models.Recipe.objects.db_manager(self.using).bulk_create([
+            models.Recipe(
+                user=self.user,
+                title=title,
+                time_minutes=int(time_minutes),
+                price=Decimal(price),
+                link=link,
+            )
+            for _, title, time_minutes, price, link, _, _ in valid
+        ])
+
+        created = {}
+        for position, (field, model, through) in enumerate(_relations(), 5):
+            rows = [
+                (recipe.id, {merge.name_key(name): merge.clean_name(name) for name in row[position].split(NAME_SEPARATOR)})
+                for recipe, row in zip(recipes, valid)
+            ]
+            names = {}
+            for _, row_names in rows:
+                for key, name in row_names.items():
+                    names.setdefault(key, name)
+            names.pop("", None)
+            ids, created[model] = self._resolve(model, names)
+            column = f"{model._meta.model_name}_id"
+            through.objects.using(self.using).bulk_create([
+                through(recipe_id=recipe_id, **{column: ids[key]})
+                for recipe_id, row_names in rows
+                for key in row_names
+                if key
+            ])
+
+        recipe_ids = [recipe.id for recipe in recipes]
+        models.Recipe.objects.db_manager(self.using).adjust_link_counts(recipe_ids, 1)
+        _record_changes(self.user.id, self.using, recipe_ids, created)
+        return len(recipes), rejected
+
+    def _resolve(self, model, names):
+        # names maps each normalized key to the spelling used for new rows
+        ids = dict(
+            model.objects.using(self.using).annotate(key=Lower(Trim("name"))).filter(
+                user=self.user,
+                key__in=list(names)
+            ).values_list("key", "id")
+        )
+        missing = model.objects.using(self.using).bulk_create([
+            model(user=self.user, name=names[key]) for key in sorted(set(names) - set(ids))
+        ])
+        ids.update((merge.name_key(obj.name), obj.id) for obj in missing)
+        return ids, [obj.id for obj in missing]
+
+
+class CopyMerge:
+    # Each batch is COPYed into a temporary staging table, validated and
+    # resolved with set-based statements, then merged into the real tables.
+    def __init__(self, user, using):
+        self.user = user
+        self.using = using
+        self.connection = connections[using]
+        self.staging = self.connection.ops.quote_name(f"recipe_import_{uuid.uuid4().hex}")
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE {self.staging} ("
+                "line integer, title text, time_minutes text, price text, link text, "
+                "tags text, ingredients text, recipe_id bigint)"
+            )
+
+    def close(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {self.staging}")
+
+    def _error_case(self):
+        checks = {
+            "title": "title = ''",
+            "title_length": "length(title) > 100",
+            "time_minutes": "time_minutes !~ %s",
+            "price": "price !~ %s",
+            "link": "length(link) > 255",
+            "names": (
+                "EXISTS (SELECT 1 FROM unnest(string_to_array(tags || %s || ingredients, %s)) AS n(name) "
+                "WHERE length(btrim(n.name, %s)) > 50)"
+            ),
+        }
+        params = {
+            "time_minutes": [TIME_PATTERN],
+            "price": [PRICE_PATTERN],
+            "names": [NAME_SEPARATOR, NAME_SEPARATOR, merge.WHITESPACE],
+        }
+        sql = " ".join(f"WHEN {checks[rule]} THEN %s" for rule, _ in RULES)
+        values = [value for rule, message in RULES for value in params.get(rule, []) + [message]]
+        return f"CASE {sql} END", values
+
+    def merge(self, batch):
+        quote = self.connection.ops.quote_name
+        recipe_table = quote(models.Recipe._meta.db_table)
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(batch)
+        buffer.seek(0)
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {self.staging}")
+            cursor.copy_expert(
+                f"COPY {self.staging} (line, title, time_minutes, price, link, tags, ingredients) "
+                "FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (title, time_minutes, price, link, tags, ingredients))",
+                buffer
+            )
+
+            error, params = self._error_case()
+            cursor.execute(
+                f"DELETE FROM {self.staging} WHERE ({error}) IS NOT NULL RETURNING line, {error}",
+                params + params
+            )
+            rejected = [{"line": line, "error": message} for line, message in sorted(cursor.fetchall())]
+
+            cursor.execute(
+                f"UPDATE {self.staging} SET recipe_id = nextval(pg_get_serial_sequence(%s, 'id')) "
+                "RETURNING recipe_id",
+                [models.Recipe._meta.db_table]
+            )
+            recipe_ids = sorted(recipe_id for recipe_id, in cursor.fetchall())
+            cursor.execute(
+                f"INSERT INTO {recipe_table} (id, user_id, title, time_minutes, price, link) "
+                f"SELECT recipe_id, %s, title, time_minutes::integer, price::numeric, link FROM {self.staging}",
+                [self.user.id]
+            )
+
+            created = {}
+            for field, model, through in _relations():
+                created[model] = self._merge_links(cursor, field, model, through)
+
+        models.Recipe.objects.db_manager(self.using).adjust_link_counts(recipe_ids, 1)
+        _record_changes(self.user.id, self.using, recipe_ids, created)
+        return len(recipe_ids), rejected
+
+    def _merge_links(self, cursor, field, model, through):
+        quote = self.connection.ops.quote_name
+        table = quote(model._meta.db_table)
+        through_table = quote(through._meta.db_table)
+        column = quote(f"{model._meta.model_name}_id")
+        names = (
+            f"SELECT DISTINCT s.recipe_id, btrim(n.name, %s) AS name FROM {self.staging} s "
+            f"CROSS JOIN LATERAL unnest(string_to_array(s.{field}, %s)) AS n(name) "
+            "WHERE btrim(n.name, %s) <> ''"
+        )
+        names_params = [merge.WHITESPACE, NAME_SEPARATOR, merge.WHITESPACE]
+        # Names already present under another spelling hit the per-user
+        # lower(btrim(name)) unique index and are skipped
+        cursor.execute(
+            f"INSERT INTO {table} (user_id, name, recipe_count) "
+            f"SELECT DISTINCT ON (lower(l.name)) %s, l.name, 0 FROM ({names}) l "
+            "ORDER BY lower(l.name), l.name ON CONFLICT DO NOTHING RETURNING id",
+            [self.user.id] + names_params
+        )
+        created = [object_id for object_id, in cursor.fetchall()]
+        cursor.execute(
+            f"INSERT INTO {through_table} (recipe_id, {column}) "
+            f"SELECT DISTINCT l.recipe_id, o.id FROM ({names}) l "
+            f"JOIN {table} o ON o.user_id = %s AND lower(btrim(o.name)) = lower(l.name)",
+            names_params + [self.user.id]
+        )
+        return created
+
+
+def import_recipes(user, fileobj, fmt, batch_size=None, progress=None, using="default"):
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    merger = CopyMerge if connections[using].vendor == "postgresql" else PythonMerge
+    imported = 0
+    rejected = []
+    with transaction.atomic(using=using):
+        merge = merger(user, using)
+    try:
+        for batch in _batches(read_rows(fileobj, fmt), batch_size):
+            with transaction.atomic(using=using):
+                count, errors = merge.merge(batch)
+            imported += count
+            rejected.extend(errors[:settings.IMPORT_MAX_REJECTED - len(rejected)])
+            if progress:
+                progress(imported, rejected=rejected)
+    finally:
+        merge.close()
+    return imported
+
+
+@jobs.job(max_attempts=1)
+def import_file(user_id, path, fmt, batch_size=None, progress=None):
+    # Background entry point: the upload was copied to path before the
+    # request finished, and is removed once the import ends. Not retried,
+    # since batches committed before a failure would be imported twice.
+    try:
+        user = models.User.objects.get(pk=user_id)
+        with open(path, "rb") as fileobj:
+            return import_recipes(user, fileobj, fmt, batch_size=batch_size, progress=progress)
+    finally:
+        os.remove(path)
@@ -0,0 +1,174 @@
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from . import models
+
+
+def job(max_attempts=None, priority=0):
+    # Marks a function as runnable by the worker. It is stored by dotted path,
+    # takes JSON-serializable arguments and a progress(count, **extra) keyword.
+    def decorator(func):
+        func.job_name = f"{func.__module__}.{func.__qualname__}"
+        func.max_attempts = max_attempts or settings.JOB_MAX_ATTEMPTS
+        func.priority = priority
+        return func
+    return decorator
+
+
+def enqueue(owner, func, *args, priority=None, delay=0):
+    record = models.Job.objects.create(
+        owner=owner,
+        name=func.job_name,
+        args=list(args),
+        priority=func.priority if priority is None else priority,
+        max_attempts=func.max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+    return record.key.hex
+
+
+def get_job(job):
+    try:
+        record = models.Job.objects.get(key=job)
+    except (models.Job.DoesNotExist, ValidationError):
+        return None
+    return {"owner": record.owner, "status": record.status, "count": record.count, **record.details}
+
+
+def claim(worker, limit=1):
+    # SKIP LOCKED lets concurrent workers pass over each other's rows on
+    # Postgres. The conditional update is what makes a claim exclusive, so
+    # backends without row locks (SQLite) never hand a job out twice either.
+    # Running jobs refresh locked_at on every progress report; one silent for
+    # JOB_LOCK_TIMEOUT lost its worker and is reclaimed if it has attempts
+    # left, otherwise failed.
+    now = timezone.now()
+    abandoned = Q(status=models.Job.RUNNING, locked_at__lt=now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT))
+    models.Job.objects.filter(abandoned, attempts__gte=F("max_attempts")).update(
+        status=models.Job.FAILED,
+        finished=now,
+        locked_by="",
+        locked_at=None,
+        error="The worker running this job stopped responding."
+    )
+    ready = Q(status=models.Job.PENDING, run_at__lte=now) | (abandoned & Q(attempts__lt=F("max_attempts")))
+    claimed = []
+    with transaction.atomic():
+        candidates = models.Job.objects.select_for_update(skip_locked=True).filter(ready).order_by(
+            "-priority", "run_at", "id"
+        ).values_list("id", "status", "locked_at")[:limit]
+        for pk, status, locked_at in list(candidates):
+            if models.Job.objects.filter(pk=pk, status=status, locked_at=locked_at).update(
+                status=models.Job.RUNNING,
+                locked_by=worker,
+                locked_at=now,
+                attempts=F("attempts") + 1
+            ):
+                claimed.append(pk)
+    return list(models.Job.objects.filter(pk__in=claimed).order_by("-priority", "run_at", "id"))
+
+
+def backoff(attempts):
+    return min(settings.JOB_RETRY_BACKOFF * 2 ** (attempts - 1), settings.JOB_RETRY_BACKOFF_MAX)
+
+
+def run(record):
+    # Updates only apply while this worker still holds the job, so a run
+    # that was given up on cannot overwrite its successor
+    jobs = models.Job.objects.filter(pk=record.pk, locked_by=record.locked_by)
+    details = dict(record.details)
+
+    def progress(count, **extra):
+        details.update(extra)
+        jobs.update(count=count, details=details, locked_at=timezone.now())
+
+    try:
+        func = import_string(record.name)
+        if getattr(func, "job_name", None) != record.name:
+            raise ImportError(f"{record.name} is not a job")
+        count = func(*record.args, progress=progress)
+    except Exception:
+        now = timezone.now()
+        if record.attempts < record.max_attempts:
+            jobs.update(
+                status=models.Job.PENDING,
+                run_at=now + timedelta(seconds=backoff(record.attempts)),
+                locked_by="",
+                locked_at=None,
+                details=details,
+                error=traceback.format_exc()
+            )
+        else:
+            jobs.update(
+                status=models.Job.FAILED,
+                finished=now,
+                locked_by="",
+                locked_at=None,
+                details=details,
+                error=traceback.format_exc()
+            )
+        return False
+
+    jobs.update(
+        status=models.Job.DONE,
+        count=count,
+        details=details,
+        finished=timezone.now(),
+        locked_by="",
+        locked_at=None
+    )
+    return True
+
+
+class Worker:
+    def __init__(self, threads=1, poll_interval=None):
+        self.threads = threads
+        self.poll_interval = settings.JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.stopping = threading.Event()
+
+    def stop(self):
+        self.stopping.set()
+
+    def run(self, burst=False):
+        # With burst set, returns once nothing is left to claim
+        if self.threads == 1:
+            self._loop(burst)
+            return
+
+        threads = [threading.Thread(target=self._thread_main, args=(burst,)) for _ in range(self.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _thread_main(self, burst):
+        try:
+            self._loop(burst)
+        finally:
+            connections.close_all()
+
+    def _loop(self, burst):
+        name = f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+        while not self.stopping.is_set():
+            try:
+                claimed = claim(name)
+            except DatabaseError:
+                # Lost connection or lock contention; try again after a pause
+                connections.close_all()
+                self.stopping.wait(self.poll_interval)
+                continue
+            if not claimed:
+                if burst:
+                    return
+                self.stopping.wait(self.poll_interval)
+                continue
+            for record in claimed:
+                run(record)
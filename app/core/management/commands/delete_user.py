@@ -0,0 +1,24 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from core import deletion
+
+
+class Command(BaseCommand):
+    help = "Delete a user and all of their recipes, tags and ingredients in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("email")
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **kwargs):
+        try:
+            user = get_user_model().objects.get(email=kwargs["email"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {kwargs['email']} does not exist.")
+
+        deleted = deletion.delete_user(
+            user,
+            batch_size=kwargs["batch_size"],
+            progress=lambda count: self.stdout.write(f"Deleted {count} rows...")
+        )
+        self.stdout.write(self.style.SUCCESS(f"Deleted user and {deleted} related rows."))
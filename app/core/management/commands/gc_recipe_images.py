@@ -0,0 +1,62 @@
+import os
+import time
+from django.core.management.base import BaseCommand
+from core.models import Recipe, RECIPE_IMAGE_DIR, recipe_image_storage
+
+
+class Command(BaseCommand):
+    help = "Remove recipe image files that are no longer referenced by any recipe."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=3600,
+            help="Skip files modified less than this many seconds ago."
+        )
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **kwargs):
+        directory = recipe_image_storage.path(RECIPE_IMAGE_DIR)
+        if not os.path.isdir(directory):
+            self.stdout.write("No recipe images found.")
+            return
+
+        cutoff = time.time() - kwargs["min_age"]
+        removed = 0
+        batch = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    batch.append(RECIPE_IMAGE_DIR + entry.name)
+                if len(batch) >= kwargs["batch_size"]:
+                    removed += self._collect(batch, cutoff, kwargs["dry_run"])
+                    batch = []
+        removed += self._collect(batch, cutoff, kwargs["dry_run"])
+
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} orphaned images."))
+
+    def _collect(self, names, cutoff, dry_run):
+        if not names:
+            return 0
+
+        # Deduplicated uploads touch an existing file before pointing a recipe
+        # at it, so files touched since the scan are skipped
+        referenced = set(Recipe.objects.filter(image__in=names).values_list("image", flat=True))
+        orphans = [
+            name for name in names
+            if name not in referenced and self._mtime(name) < cutoff
+        ]
+        for name in orphans:
+            self.stdout.write(f"Removing {name}")
+            if not dry_run:
+                recipe_image_storage.delete(name)
+
+        return len(orphans)
+
+    def _mtime(self, name):
+        try:
+            return os.stat(recipe_image_storage.path(name)).st_mtime
+        except FileNotFoundError:
+            return float("inf")
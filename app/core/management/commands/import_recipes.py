@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from core import imports
+
+
+class Command(BaseCommand):
+    help = "Import recipes for a user from a CSV or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("email")
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=imports.FORMATS, default=None)
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **kwargs):
+        try:
+            user = get_user_model().objects.get(email=kwargs["email"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {kwargs['email']} does not exist.")
+
+        fmt = kwargs["format"] or imports.detect_format(kwargs["path"])
+        if not fmt:
+            raise CommandError("Could not detect the file format, pass --format.")
+
+        rejected = []
+
+        def report(count, **details):
+            rejected[:] = details["rejected"]
+            self.stdout.write(f"Imported {count} recipes...")
+
+        with open(kwargs["path"], "rb") as fileobj:
+            imported = imports.import_recipes(user, fileobj, fmt, batch_size=kwargs["batch_size"], progress=report)
+        for row in rejected:
+            self.stdout.write(self.style.WARNING(f"Line {row['line']}: {row['error']}"))
+        self.stdout.write(self.style.SUCCESS(f"Imported {imported} recipes."))
@@ -0,0 +1,44 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models.functions import Lower, Trim
+from core import merge, models
+
+MODELS = {"tag": models.Tag, "ingredient": models.Ingredient}
+
+
+class Command(BaseCommand):
+    help = "Merge a user's tags or ingredients into one, moving all of their recipe links."
+
+    def add_arguments(self, parser):
+        parser.add_argument("email")
+        parser.add_argument("kind", choices=sorted(MODELS))
+        parser.add_argument("target")
+        parser.add_argument("sources", nargs="+")
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **kwargs):
+        try:
+            user = get_user_model().objects.get(email=kwargs["email"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {kwargs['email']} does not exist.")
+
+        model = MODELS[kwargs["kind"]]
+        names = [kwargs["target"]] + kwargs["sources"]
+        found = dict(
+            model.objects.filter(user=user).annotate(key=Lower(Trim("name"))).filter(
+                key__in=[merge.name_key(name) for name in names]
+            ).values_list("key", "id")
+        )
+        missing = [name for name in names if merge.name_key(name) not in found]
+        if missing:
+            raise CommandError(f"No {kwargs['kind']} named {', '.join(missing)}.")
+
+        target = model.objects.get(pk=found[merge.name_key(kwargs["target"])])
+        moved = merge.merge(
+            model,
+            target,
+            [found[merge.name_key(name)] for name in kwargs["sources"]],
+            batch_size=kwargs["batch_size"],
+            progress=lambda count: self.stdout.write(f"Moved {count} recipe links...")
+        )
+        self.stdout.write(self.style.SUCCESS(f"Merged into {target.name}, moved {moved} recipe links."))
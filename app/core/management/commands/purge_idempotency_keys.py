@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from core import deletion, idempotency
+from core.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Delete stored Idempotency-Key responses older than IDEMPOTENCY_KEY_TTL."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **kwargs):
+        deleted = deletion.delete_in_batches(
+            IdempotencyKey.objects.filter(created__lt=idempotency.expired_before()),
+            batch_size=kwargs["batch_size"],
+            record_changes=False
+        )
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} idempotency keys."))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+from django.db.models.functions import Coalesce
+from core import models
+
+
+class Command(BaseCommand):
+    help = "Recompute the recipe_count of every tag and ingredient from the recipe links."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **kwargs):
+        batch_size = kwargs["batch_size"]
+        for field in ("tags", "ingredients"):
+            model = models.Recipe._meta.get_field(field).related_model
+            counted = Coalesce(models.Recipe.objects.link_count_subquery(field), 0)
+            bounds = model.objects.aggregate(low=Min("pk"), high=Max("pk"))
+            if bounds["low"] is None:
+                continue
+
+            changed = 0
+            for start in range(bounds["low"], bounds["high"] + 1, batch_size):
+                changed += model.objects.filter(
+                    pk__gte=start,
+                    pk__lt=start + batch_size
+                ).exclude(recipe_count=counted).update(recipe_count=counted)
+            self.stdout.write(f"Repaired {changed} {model._meta.verbose_name_plural}.")
+        self.stdout.write(self.style.SUCCESS("Recipe counts are up to date."))
@@ -0,0 +1,46 @@
+import multiprocessing
+import signal
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from core import jobs
+
+
+def _serve(threads, poll_interval, burst):
+    worker = jobs.Worker(threads=threads, poll_interval=poll_interval)
+    signal.signal(signal.SIGTERM, lambda *args: worker.stop())
+    worker.run(burst=burst)
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs with a pool of worker processes and threads."
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=settings.JOB_WORKER_PROCESSES)
+        parser.add_argument("--threads", type=int, default=settings.JOB_WORKER_THREADS)
+        parser.add_argument("--poll-interval", type=float, default=settings.JOB_POLL_INTERVAL)
+        parser.add_argument("--burst", action="store_true", help="Exit once no job is ready to run.")
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write(f"Starting {kwargs['processes']} x {kwargs['threads']} workers...")
+        options = (kwargs["threads"], kwargs["poll_interval"], kwargs["burst"])
+        if kwargs["processes"] == 1:
+            _serve(*options)
+            return
+
+        # Forked children must not share the parent's database connections
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        children = [context.Process(target=_serve, args=options) for _ in range(kwargs["processes"])]
+        for child in children:
+            child.start()
+        signal.signal(signal.SIGTERM, lambda *args: [child.terminate() for child in children])
+        try:
+            for child in children:
+                child.join()
+        except KeyboardInterrupt:
+            for child in children:
+                child.terminate()
+            for child in children:
+                child.join()
@@ -0,0 +1,34 @@
+from collections import defaultdict
+from django.core.management.base import BaseCommand
+from core import startup
+
+
+class Command(BaseCommand):
+    help = "Boot Django in a fresh process and report import times and time to first request."
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="/api/recipes/tags/")
+        parser.add_argument("--settings-module", default=None)
+        parser.add_argument("--top", type=int, default=20)
+
+    def handle(self, *args, **kwargs):
+        result = startup.measure(kwargs["url"], kwargs["settings_module"], importtime=True)
+
+        packages = defaultdict(float)
+        for module, own, _, _ in result["imports"]:
+            packages[module.split(".")[0]] += own
+
+        self.stdout.write("Slowest modules (self time, cumulative):")
+        for module, own, cumulative, _ in sorted(result["imports"], key=lambda i: -i[1])[:kwargs["top"]]:
+            self.stdout.write(f"  {own * 1000:8.1f} ms {cumulative * 1000:8.1f} ms  {module}")
+        self.stdout.write("Slowest packages (total self time):")
+        for package, own in sorted(packages.items(), key=lambda p: -p[1])[:kwargs["top"]]:
+            self.stdout.write(f"  {own * 1000:8.1f} ms  {package}")
+
+        self.stdout.write(f"Modules loaded: {result['modules']}")
+        self.stdout.write(f"django.setup(): {result['setup'] * 1000:.1f} ms")
+        self.stdout.write(
+            f"First request to {kwargs['url']}: {result['first_request'] * 1000:.1f} ms (HTTP {result['status']})"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Process total: {result['process'] * 1000:.1f} ms"))
@@ -0,0 +1,106 @@
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, F, Func, OuterRef, Subquery
+from django.db.models.constants import OnConflict
+from django.db.models.functions import Coalesce, Lower, Trim
+from . import jobs, models
+from .aggregates import ConcatIds
+
+
+# Characters stripped from both ends of tag and ingredient names, as DRF and
+# form fields do, so stored names never start or end with whitespace and
+# Lower(Trim(name)) in the unique constraints is just their lowercase.
+WHITESPACE = " \t\n\r\f\v"
+
+
+def clean_name(name):
+    return name.strip(WHITESPACE)
+
+
+def name_key(name):
+    # Python side of the Lower(Trim(name)) expression in the unique constraints
+    return clean_name(name).lower()
+
+
+def _relink(model, target_id, link_ids, using):
+    # Copy the links over to the target, skipping recipes that already have
+    # it, then drop the originals; nothing is loaded into Python.
+    connection = connections[using]
+    through = model._meta.get_field("recipes").through
+    table = connection.ops.quote_name(through._meta.db_table)
+    recipe_field = through._meta.get_field("recipe")
+    target_field = through._meta.get_field(model._meta.model_name)
+    pk = connection.ops.quote_name(through._meta.pk.column)
+    placeholders = ", ".join("%s" for _ in link_ids)
+    insert = connection.ops.insert_statement(on_conflict=OnConflict.IGNORE)
+    suffix = connection.ops.on_conflict_suffix_sql([recipe_field, target_field], OnConflict.IGNORE, None, None)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"{insert} {table} ({recipe_field.column}, {target_field.column}) "
+            f"SELECT {recipe_field.column}, %s FROM {table} WHERE {pk} IN ({placeholders}) {suffix}",
+            [target_id] + link_ids
+        )
+        cursor.execute(f"DELETE FROM {table} WHERE {pk} IN ({placeholders})", link_ids)
+
+
+def merge(model, target, source_ids, batch_size=None, progress=None, record_changes=True, using="default"):
+    batch_size = batch_size or settings.DELETE_BATCH_SIZE
+    through = model._meta.get_field("recipes").through
+    column = through._meta.get_field(model._meta.model_name).attname
+    source_ids = [pk for pk in source_ids if pk != target.pk]
+    links = through.objects.using(using).filter(**{f"{column}__in": source_ids}).order_by()
+
+    moved = 0
+    while True:
+        rows = list(links.values_list("pk", "recipe_id")[:batch_size])
+        if not rows:
+            break
+
+        with transaction.atomic(using=using):
+            _relink(model, target.pk, [link_id for link_id, _ in rows], using)
+            if record_changes:
+                models.ChangeLog.objects.db_manager(using).record(
+                    target.user_id,
+                    models.ChangeLog.RECIPE,
+                    sorted({recipe_id for _, recipe_id in rows})
+                )
+        moved += len(rows)
+        if progress:
+            progress(moved)
+
+    with transaction.atomic(using=using):
+        model.objects.using(using).filter(pk__in=source_ids).delete()
+        counted = through.objects.using(using).filter(**{column: OuterRef("pk")}).order_by().annotate(
+            count=Func(F("pk"), function="COUNT")
+        ).values("count")
+        model.objects.using(using).filter(pk=target.pk).update(recipe_count=Coalesce(Subquery(counted), 0))
+    return moved
+
+
+@jobs.job()
+def merge_into(model_label, target_id, source_ids, progress=None):
+    model = apps.get_model(model_label)
+    target = model.objects.filter(pk=target_id).first()
+    if target is None:
+        return 0
+    return merge(model, target, source_ids, progress=progress)
+
+
+def duplicate_groups(queryset):
+    # Lists of ids sharing a normalized name for the same user, lowest first
+    groups = queryset.order_by().values("user_id", key=Lower(Trim("name"))).annotate(
+        count=Count("id"),
+        ids=ConcatIds("id")
+    ).filter(count__gt=1)
+    return [group["ids"] for group in groups]
+
+
+def merge_duplicates(queryset, batch_size=None, progress=None, record_changes=True):
+    merged = 0
+    for ids in duplicate_groups(queryset):
+        target = queryset.model.objects.using(queryset.db).get(pk=ids[0])
+        merge(queryset.model, target, ids[1:], batch_size, progress, record_changes, queryset.db)
+        merged += len(ids) - 1
+    return merged
@@ -0,0 +1,143 @@
+import hashlib
+import re
+import zlib
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = re.compile(r"^(text/|application/(json|javascript|xml|msgpack|x-msgpack)|image/svg)")
+
+
+class GzipEncoder:
+    def __init__(self, level):
+        self.stream = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self.stream.compress(data)
+
+    def flush(self):
+        return self.stream.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.stream.flush()
+
+
+class BrotliEncoder:
+    def __init__(self, level):
+        self.stream = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self.stream.process(data)
+
+    def flush(self):
+        return self.stream.flush()
+
+    def finish(self):
+        return self.stream.finish()
+
+
+ENCODERS = {"gzip": GzipEncoder}
+if brotli is not None:
+    ENCODERS["br"] = BrotliEncoder
+
+
+def accepted_encoding(header):
+    # Highest q-value wins; on a tie the server preference in
+    # COMPRESSION_ENCODINGS decides.
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        match = re.search(r"q=([0-9.]+)", params)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for coding in settings.COMPRESSION_ENCODINGS:
+        quality = accepted.get(coding, accepted.get("*", 0.0))
+        if coding in ENCODERS and quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    # Negotiated brotli/gzip for text-like responses. Streaming bodies are
+    # compressed chunk by chunk; whole bodies of cacheable responses are
+    # cached per encoding in COMPRESSION_CACHE, keyed by content digest, so
+    # repeated payloads are only compressed once.
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding") or not COMPRESSIBLE_TYPES.match(response.get("Content-Type", "")):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = accepted_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self._compress_async(encoding, response.streaming_content)
+            else:
+                response.streaming_content = self._compress_stream(encoding, response.streaming_content)
+            response.headers.pop("Content-Length", None)
+        else:
+            compressed = self._compress_content(encoding, response)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    def _encoder(self, encoding):
+        return ENCODERS[encoding](settings.COMPRESSION_LEVELS[encoding])
+
+    def _compress_content(self, encoding, response):
+        cacheable = (
+            len(response.content) <= settings.COMPRESSION_CACHE_MAX_SIZE
+            and "no-store" not in response.get("Cache-Control", "")
+        )
+        cache = caches[settings.COMPRESSION_CACHE]
+        if cacheable:
+            key = f"compressed:{encoding}:{hashlib.sha1(response.content).hexdigest()}"
+            compressed = cache.get(key)
+            if compressed is not None:
+                return compressed
+
+        encoder = self._encoder(encoding)
+        compressed = encoder.compress(response.content) + encoder.finish()
+        if cacheable:
+            cache.set(key, compressed, settings.COMPRESSION_CACHE_TIMEOUT)
+        return compressed
+
+    def _compress_stream(self, encoding, chunks):
+        encoder = self._encoder(encoding)
+        for chunk in chunks:
+            data = encoder.compress(chunk) + encoder.flush()
+            if data:
+                yield data
+        yield encoder.finish()
+
+    async def _compress_async(self, encoding, chunks):
+        encoder = self._encoder(encoding)
+        async for chunk in chunks:
+            data = encoder.compress(chunk) + encoder.flush()
+            if data:
+                yield data
+        yield encoder.finish()
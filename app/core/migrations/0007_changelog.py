@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_changelog(apps, schema_editor):
+    User = apps.get_model("core", "User")
+    ChangeLog = apps.get_model("core", "ChangeLog")
+    tracked = [
+        ("recipe", apps.get_model("core", "Recipe")),
+        ("tag", apps.get_model("core", "Tag")),
+        ("ingredient", apps.get_model("core", "Ingredient")),
+    ]
+    for user_id in User.objects.values_list("id", flat=True).iterator():
+        seq = 0
+        for kind, model in tracked:
+            rows = []
+            for object_id in model.objects.filter(user_id=user_id).values_list("id", flat=True).iterator():
+                seq += 1
+                rows.append(ChangeLog(user_id=user_id, kind=kind, object_id=object_id, seq=seq))
+            ChangeLog.objects.bulk_create(rows, batch_size=1000)
+        User.objects.filter(pk=user_id).update(change_seq=seq)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_recipe_image_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='change_seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('recipe', 'Recipe'), ('tag', 'Tag'), ('ingredient', 'Ingredient')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('seq', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='changes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'seq'], name='changelog_user_seq_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'kind', 'object_id'), name='changelog_unique_object')],
+            },
+        ),
+        migrations.RunPython(backfill_changelog, migrations.RunPython.noop),
+    ]
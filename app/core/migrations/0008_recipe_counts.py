@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:13
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_recipe_counts(apps, schema_editor):
+    Recipe = apps.get_model("core", "Recipe")
+    for field in ("tags", "ingredients"):
+        through = Recipe._meta.get_field(field).remote_field.through
+        model = Recipe._meta.get_field(field).related_model
+        column = f"{model._meta.model_name}_id"
+        links = through.objects.filter(**{column: models.OuterRef("pk")}).order_by().annotate(
+            count=models.Func(models.F("pk"), function="COUNT")
+        ).values("count")
+        model.objects.update(recipe_count=Coalesce(models.Subquery(links), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_changelog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', 'recipe_count', 'id'], name='ingredient_recipe_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'recipe_count', 'id'], name='tag_recipe_count_idx'),
+        ),
+        migrations.RunPython(backfill_recipe_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:25
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models.constants import OnConflict
+from django.db.models.functions import Coalesce, Lower, Trim
+
+# A frozen copy of core.merge as it was when this migration was written, so
+# later changes there cannot change what the migration does.
+BATCH_SIZE = 1000
+
+
+def relink(connection, model, target_id, link_ids):
+    through = model._meta.get_field("recipes").through
+    table = connection.ops.quote_name(through._meta.db_table)
+    recipe_field = through._meta.get_field("recipe")
+    target_field = through._meta.get_field(model._meta.model_name)
+    pk = connection.ops.quote_name(through._meta.pk.column)
+    placeholders = ", ".join("%s" for _ in link_ids)
+    insert = connection.ops.insert_statement(on_conflict=OnConflict.IGNORE)
+    suffix = connection.ops.on_conflict_suffix_sql([recipe_field, target_field], OnConflict.IGNORE, None, None)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"{insert} {table} ({recipe_field.column}, {target_field.column}) "
+            f"SELECT {recipe_field.column}, %s FROM {table} WHERE {pk} IN ({placeholders}) {suffix}",
+            [target_id] + link_ids
+        )
+        cursor.execute(f"DELETE FROM {table} WHERE {pk} IN ({placeholders})", link_ids)
+
+
+def merge(connection, model, target_id, source_ids):
+    through = model._meta.get_field("recipes").through
+    column = through._meta.get_field(model._meta.model_name).attname
+    links = through.objects.filter(**{f"{column}__in": source_ids}).order_by()
+    while True:
+        link_ids = list(links.values_list("pk", flat=True)[:BATCH_SIZE])
+        if not link_ids:
+            break
+        relink(connection, model, target_id, link_ids)
+
+    model.objects.filter(pk__in=source_ids).delete()
+    counted = through.objects.filter(**{column: models.OuterRef("pk")}).order_by().annotate(
+        count=models.Func(models.F("pk"), function="COUNT")
+    ).values("count")
+    model.objects.filter(pk=target_id).update(recipe_count=Coalesce(models.Subquery(counted), 0))
+
+
+def merge_existing_duplicates(apps, schema_editor):
+    # Rows sharing a user and normalized name are merged into the lowest id
+    for name in ("Tag", "Ingredient"):
+        model = apps.get_model("core", name)
+        named = model.objects.annotate(key=Lower(Trim("name")))
+        groups = named.order_by().values("user_id", "key").annotate(count=models.Count("id")).filter(count__gt=1)
+        for group in list(groups):
+            ids = list(named.filter(user_id=group["user_id"], key=group["key"]).order_by("id").values_list("id", flat=True))
+            merge(schema_editor.connection, model, ids[0], ids[1:])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_admin_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_existing_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower(django.db.models.functions.text.Trim('name')), models.F('user'), name='ingredient_unique_user_name'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower(django.db.models.functions.text.Trim('name')), models.F('user'), name='tag_unique_user_name'),
+        ),
+    ]
@@ -0,0 +1,83 @@
+from django.utils.translation import gettext as _
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from . import idempotency, routers
+
+
+class ReplicaReadMixin:
+    # Safe requests read from a replica unless the user wrote something within
+    # the last READ_YOUR_WRITES_SECONDS; successful writes start that window.
+    def dispatch(self, request, *args, **kwargs):
+        # Reset here rather than in finalize_response, which unhandled
+        # exceptions skip, leaving the thread reading from the replica
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            replicas = self.__dict__.pop("_replicas", None)
+            if replicas is not None:
+                routers.reset_replicas(replicas)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            user_id = request.user.id
+            self._replicas = routers.use_replicas(user_id is None or not routers.pinned_to_primary(user_id))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            user = getattr(request, "_user", None)
+            if user is not None and user.id is not None:
+                routers.pin_to_primary(user.id)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class IdempotencyMixin:
+    # A POST sent with an Idempotency-Key runs once per caller and key within
+    # IDEMPOTENCY_KEY_TTL; retries get the stored response replayed without
+    # reaching validation or the database writes again.
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        key = request.headers.get(idempotency.HEADER)
+        if request.method != "POST" or key is None:
+            return
+        if not key or len(key) > idempotency.MAX_KEY_LENGTH:
+            raise ValidationError({idempotency.HEADER: [
+                _("Use between 1 and %(max)d characters.") % {"max": idempotency.MAX_KEY_LENGTH}
+            ]})
+
+        owner = idempotency.owner(request)
+        fingerprint = idempotency.fingerprint(request)
+        existing = idempotency.claim(owner, key, fingerprint)
+        if existing is None:
+            self._idempotency_claim = (owner, key)
+        elif existing.fingerprint != fingerprint:
+            raise idempotency.KeyReused()
+        elif existing.status_code is None:
+            raise idempotency.InProgress()
+        else:
+            raise idempotency.Replay(existing)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, idempotency.Replay):
+            return Response(
+                exc.record.response,
+                status=exc.record.status_code,
+                headers={"Idempotent-Replayed": "true"}
+            )
+        try:
+            return super().handle_exception(exc)
+        except Exception:
+            claim = self.__dict__.pop("_idempotency_claim", None)
+            if claim is not None:
+                idempotency.release(*claim)
+            raise
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        claim = self.__dict__.pop("_idempotency_claim", None)
+        if claim is not None:
+            if response.status_code < 500:
+                idempotency.complete(*claim, response.status_code, getattr(response, "data", None))
+            else:
+                idempotency.release(*claim)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -1,15 +1,23 @@
-import uuid
 import os
-from django.db import models
+import uuid
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, connections, router, transaction
+from django.db.models.functions import Lower, Trim
+from django.utils import timezone
 from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
+from .storage import ContentAddressedStorage
+
+RECIPE_IMAGE_DIR = "uploads/recipe/"
+
+recipe_image_storage = ContentAddressedStorage()
 
 
 def recipe_image_path(instance, filename):
-    ext = filename.split(".")[-1]
-    file_name = f"{uuid.uuid4()}.{ext}"
+    ext = filename.split(".")[-1].lower()
+    file_name = f"image.{ext}"
 
-    return os.path.join("uploads/recipe/", file_name)
+    return os.path.join(RECIPE_IMAGE_DIR, file_name)
 
 
 class UserManager(BaseUserManager):
@@ -42,40 +50,268 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    change_seq = models.BigIntegerField(default=0)
 
     objects = UserManager()
 
     USERNAME_FIELD = "email"
 
+    def save(self, *args, **kwargs):
+        # change_seq only moves through ChangeLog.objects.record(); saving a
+        # user loaded earlier must not write back a stale counter
+        if not self._state.adding and not kwargs.get("force_insert"):
+            update_fields = kwargs.get("update_fields")
+            if update_fields is None:
+                update_fields = [
+                    field.name for field in self._meta.concrete_fields if not field.primary_key
+                ]
+            kwargs["update_fields"] = [name for name in update_fields if name != "change_seq"]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return str(self.email)
 
 
 class Tag(models.Model):
-    name = models.CharField(max_length=50)
+    name = models.CharField(max_length=50, db_index=True)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="tags")
+    recipe_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "recipe_count", "id"], name="tag_recipe_count_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(Lower(Trim("name")), "user", name="tag_unique_user_name"),
+        ]
 
     def __str__(self):
         return self.name
 
 
 class Ingredient(models.Model):
-    name = models.CharField(max_length=50)
+    name = models.CharField(max_length=50, db_index=True)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="ingredients")
+    recipe_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "recipe_count", "id"], name="ingredient_recipe_count_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(Lower(Trim("name")), "user", name="ingredient_unique_user_name"),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class WriteManager(models.Manager):
+    # The methods of these managers write. Without db_manager() they use the
+    # write database, even inside a request reading from a replica.
+    @property
+    def db(self):
+        return self._db or router.db_for_write(self.model, **self._hints)
+
+
+class RecipeManager(WriteManager):
+    def clone(self, recipes):
+        sources = sorted(recipes, key=lambda recipe: recipe.id)
+        if not sources:
+            return []
+
+        with transaction.atomic(using=self.db):
+            clones = self.bulk_create([
+                self.model(
+                    user_id=recipe.user_id,
+                    title=recipe.title,
+                    time_minutes=recipe.time_minutes,
+                    price=recipe.price,
+                    link=recipe.link,
+                    image=recipe.image.name or None,
+                )
+                for recipe in sources
+            ])
+            id_map = [(source.id, clone.id) for source, clone in zip(sources, clones)]
+            for field in ("tags", "ingredients"):
+                self._copy_links(self.model._meta.get_field(field).remote_field.through, id_map)
+            self.adjust_link_counts([clone.id for clone in clones], 1)
+            for user_id in {clone.user_id for clone in clones}:
+                ChangeLog.objects.db_manager(self.db).record(
+                    user_id,
+                    ChangeLog.RECIPE,
+                    [clone.id for clone in clones if clone.user_id == user_id]
+                )
+
+        return clones
+
+    def link_count_subquery(self, field, recipe_ids=None):
+        through = self.model._meta.get_field(field).remote_field.through
+        column = f"{self.model._meta.get_field(field).related_model._meta.model_name}_id"
+        links = through.objects.using(self.db).filter(**{column: models.OuterRef("pk")})
+        if recipe_ids is not None:
+            links = links.filter(recipe_id__in=recipe_ids)
+        return models.Subquery(
+            links.order_by().annotate(count=models.Func(models.F("pk"), function="COUNT")).values("count")
+        )
+
+    def adjust_link_counts(self, recipe_ids, delta):
+        for field in ("tags", "ingredients"):
+            related = self.model._meta.get_field(field)
+            column = f"{related.related_model._meta.model_name}_id"
+            linked = related.remote_field.through.objects.filter(recipe_id__in=recipe_ids).values(column)
+            related.related_model.objects.using(self.db).filter(pk__in=linked).update(
+                recipe_count=models.F("recipe_count") + delta * self.link_count_subquery(field, recipe_ids)
+            )
+
+    def _copy_links(self, through, id_map):
+        connection = connections[self.db]
+        table = connection.ops.quote_name(through._meta.db_table)
+        source_column = through._meta.get_field("recipe").column
+        target_column = [
+            f.column for f in through._meta.local_fields
+            if f.is_relation and f.column != source_column
+        ][0]
+        cases = " ".join("WHEN %s THEN %s" for _ in id_map)
+        placeholders = ", ".join("%s" for _ in id_map)
+        params = [value for pair in id_map for value in pair]
+        params += [old_id for old_id, _ in id_map]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} ({source_column}, {target_column}) "
+                f"SELECT CASE {source_column} {cases} END, {target_column} "
+                f"FROM {table} WHERE {source_column} IN ({placeholders})",
+                params
+            )
+
+
 class Recipe(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="recipes")
-    title = models.CharField(max_length=100)
+    title = models.CharField(max_length=100, db_index=True)
     time_minutes = models.IntegerField()
     price = models.DecimalField(max_digits=5, decimal_places=2)
     link = models.CharField(max_length=255, blank=True)
     tags = models.ManyToManyField(Tag, related_name="recipes")
     ingredients = models.ManyToManyField(Ingredient, related_name="recipes")
-    image = models.ImageField(upload_to=recipe_image_path, null=True)
+    image = models.ImageField(upload_to=recipe_image_path, storage=recipe_image_storage, null=True, db_index=True)
+
+    objects = RecipeManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "price", "id"], name="recipe_user_price_idx"),
+            models.Index(fields=["user", "time_minutes", "id"], name="recipe_user_time_idx"),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class ChangeLogManager(WriteManager):
+    def record(self, user_id, kind, object_ids, deleted=False):
+        object_ids = list(object_ids)
+        if not object_ids:
+            return
+
+        # The counter row stays locked until commit, so a user's changes
+        # become visible in sequence order.
+        with transaction.atomic(using=self.db):
+            users = User.objects.db_manager(self.db).filter(pk=user_id)
+            users.update(change_seq=models.F("change_seq") + len(object_ids))
+            last_seq = users.values_list("change_seq", flat=True).get()
+            self.bulk_create(
+                [
+                    self.model(
+                        user_id=user_id,
+                        kind=kind,
+                        object_id=object_id,
+                        seq=last_seq - len(object_ids) + i + 1,
+                        deleted=deleted,
+                    )
+                    for i, object_id in enumerate(object_ids)
+                ],
+                update_conflicts=True,
+                unique_fields=["user", "kind", "object_id"],
+                update_fields=["seq", "deleted"],
+            )
+
+
+class ChangeLog(models.Model):
+    RECIPE = "recipe"
+    TAG = "tag"
+    INGREDIENT = "ingredient"
+    KIND_CHOICES = [(RECIPE, "Recipe"), (TAG, "Tag"), (INGREDIENT, "Ingredient")]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="changes")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    seq = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+
+    objects = ChangeLogManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "kind", "object_id"], name="changelog_unique_object"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "seq"], name="changelog_user_seq_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} @ {self.seq}"
+
+
+class IdempotencyKey(models.Model):
+    # First response to a POST sent with an Idempotency-Key. The row is
+    # inserted before the view runs, so concurrent duplicates collide on the
+    # unique constraint; status_code stays null until the response is stored.
+    owner = models.CharField(max_length=64)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "key"], name="idempotency_unique_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.owner} {self.key}"
+
+
+class Job(models.Model):
+    # Background work claimed by `manage.py run_worker`. owner is a plain id
+    # rather than a foreign key because a job may delete its own owner.
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [(PENDING, "Pending"), (RUNNING, "Running"), (DONE, "Done"), (FAILED, "Failed")]
+
+    key = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    name = models.CharField(max_length=255)
+    args = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    owner = models.BigIntegerField(null=True, db_index=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    priority = models.SmallIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=1)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True)
+    count = models.BigIntegerField(null=True, default=0)
+    details = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "-priority", "run_at"], name="job_claim_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
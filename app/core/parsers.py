@@ -0,0 +1,15 @@
+import msgpack
+from django.utils.translation import gettext as _
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from .renderers import MESSAGEPACK_MEDIA_TYPE
+
+
+class MessagePackParser(BaseParser):
+    media_type = MESSAGEPACK_MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.ExtraData) as exc:
+            raise ParseError(_("MessagePack parse error - %(error)s") % {"error": exc})
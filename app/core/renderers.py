@@ -0,0 +1,37 @@
+import datetime
+import decimal
+import uuid
+import msgpack
+from django.utils.functional import Promise
+from rest_framework.renderers import BaseRenderer
+
+MESSAGEPACK_MEDIA_TYPE = "application/msgpack"
+
+
+def encode_default(obj):
+    # Same conversions as rest_framework.utils.encoders.JSONEncoder, so both
+    # formats carry identical values (prices stay decimal strings).
+    if isinstance(obj, Promise):
+        return str(obj)
+    if isinstance(obj, datetime.datetime):
+        value = obj.isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Cannot encode {type(obj).__name__} as MessagePack")
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = MESSAGEPACK_MEDIA_TYPE
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
@@ -0,0 +1,60 @@
+import random
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+# Alias of the replica serving the current request's reads, if any. One is
+# picked per request so related reads (a count and its page, change_seq and
+# the ChangeLog rows after it) see the same point in time.
+_replica = ContextVar("replica", default=None)
+
+
+def _pin_key(user_id):
+    return f"primary-pin:{user_id}"
+
+
+def pin_to_primary(user_id):
+    # Pins live in the default cache, which must be shared by all processes
+    # (CACHE_URL) for them to hold across workers
+    cache.set(_pin_key(user_id), True, settings.READ_YOUR_WRITES_SECONDS)
+
+
+def pinned_to_primary(user_id):
+    return bool(cache.get(_pin_key(user_id)))
+
+
+def choose_replica():
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+def use_replicas(enabled=True):
+    return _replica.set(choose_replica() if enabled and settings.DATABASE_REPLICAS else None)
+
+
+def reset_replicas(token):
+    _replica.reset(token)
+
+
+def reading_from_replica():
+    return _replica.get() is not None
+
+
+class ReplicaRouter:
+    # Reads only leave the primary inside a request that opted in through
+    # ReplicaReadMixin; everything else (writes, commands, background jobs)
+    # stays on the default database.
+    def db_for_read(self, model, **hints):
+        return _replica.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in settings.DATABASE_REPLICAS
@@ -0,0 +1,39 @@
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.urls import reverse
+from django.utils.translation import gettext as _
+from rest_framework import serializers
+from . import batch, models
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE"])
+    path = serializers.CharField(max_length=2048)
+    body = serializers.JSONField(required=False, allow_null=True)
+
+    def validate_path(self, value):
+        path = urlsplit(value).path
+        if not path.startswith(batch.API_PREFIX) or path == reverse("batch"):
+            raise serializers.ValidationError(_("Only API paths other than the batch endpoint can be batched."))
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = BatchRequestSerializer(many=True, allow_empty=False)
+    atomic = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                _("At most %(count)d requests can be batched.") % {"count": settings.BATCH_MAX_REQUESTS}
+            )
+        return value
+
+
+class JobSerializer(serializers.ModelSerializer):
+    job = serializers.CharField(source="key.hex", read_only=True)
+
+    class Meta:
+        model = models.Job
+        fields = ["job", "status", "priority", "attempts", "max_attempts", "count", "details", "created", "finished"]
+        read_only_fields = fields
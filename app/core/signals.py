@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from . import models
+
+
+def _started_by_user_delete(origin):
+    return issubclass(getattr(origin, "model", type(origin)), get_user_model())
+
+
+# Receivers are connected per model so every other model keeps Django's fast
+# delete path instead of being collected row by row
+@receiver(post_save, sender=models.Recipe)
+@receiver(post_save, sender=models.Tag)
+@receiver(post_save, sender=models.Ingredient)
+def record_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        models.ChangeLog.objects.record(instance.user_id, sender._meta.model_name, [instance.id])
+
+
+@receiver(post_delete, sender=models.Recipe)
+@receiver(post_delete, sender=models.Tag)
+@receiver(post_delete, sender=models.Ingredient)
+def record_delete(sender, instance, origin=None, **kwargs):
+    if not _started_by_user_delete(origin):
+        models.ChangeLog.objects.record(
+            instance.user_id,
+            sender._meta.model_name,
+            [instance.id],
+            deleted=True
+        )
+
+
+@receiver(m2m_changed, sender=models.Recipe.tags.through)
+@receiver(m2m_changed, sender=models.Recipe.ingredients.through)
+def record_links(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == "pre_clear":
+        instance._cleared_recipe_ids = list(instance.recipes.values_list("id", flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse:
+        recipe_ids = [instance.id]
+    elif action == "post_clear":
+        recipe_ids = instance.__dict__.pop("_cleared_recipe_ids", [])
+    else:
+        recipe_ids = pk_set
+    models.ChangeLog.objects.record(instance.user_id, models.ChangeLog.RECIPE, recipe_ids)
+
+
+def _unlinked_ids(sender, instance, reverse, pk_set):
+    # The ids passed to remove() may include objects that were never linked,
+    # so look up the rows that will actually go away.
+    column = "tag_id" if sender is models.Recipe.tags.through else "ingredient_id"
+    links = sender.objects.filter(**{column if reverse else "recipe_id": instance.id})
+    if pk_set is not None:
+        links = links.filter(**{"recipe_id__in" if reverse else f"{column}__in": pk_set})
+    return list(links.values_list("recipe_id" if reverse else column, flat=True))
+
+
+@receiver(m2m_changed, sender=models.Recipe.tags.through)
+@receiver(m2m_changed, sender=models.Recipe.ingredients.through)
+def count_links(sender, instance, action, reverse, model, pk_set, **kwargs):
+    key = f"_unlinked_{sender._meta.model_name}"
+    if action in ("pre_remove", "pre_clear"):
+        instance.__dict__[key] = _unlinked_ids(sender, instance, reverse, pk_set)
+        return
+    if action == "post_add":
+        ids, delta = pk_set, 1
+    elif action in ("post_remove", "post_clear"):
+        ids, delta = instance.__dict__.pop(key, []), -1
+    else:
+        return
+
+    if not ids:
+        return
+    if reverse:
+        type(instance).objects.filter(pk=instance.id).update(recipe_count=F("recipe_count") + delta * len(ids))
+    else:
+        model.objects.filter(pk__in=ids).update(recipe_count=F("recipe_count") + delta)
+
+
+@receiver(pre_delete, sender=models.Recipe)
+def uncount_links(sender, instance, origin=None, **kwargs):
+    if not _started_by_user_delete(origin):
+        sender.objects.adjust_link_counts([instance.id], -1)
@@ -0,0 +1,83 @@
+"""
+Measure how long a fresh process takes to boot Django and serve one request.
+
+Run in a child interpreter (optionally with -X importtime) by the
+startup_profile command and benchmarks.startup:
+
+    python -m core.startup /api/recipes/tags/
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def boot(url):
+    started = time.perf_counter()
+    import django
+    django.setup()
+    setup_done = time.perf_counter()
+
+    from io import BytesIO
+    from django.core.handlers.wsgi import WSGIHandler, WSGIRequest
+    handler = WSGIHandler()
+    request = WSGIRequest({
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": url,
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "80",
+        "HTTP_HOST": "localhost",
+        "wsgi.input": BytesIO(),
+        "wsgi.url_scheme": "http",
+    })
+    ready = time.perf_counter()
+    response = handler.get_response(request)
+    first_request = time.perf_counter() - ready
+
+    return {
+        "setup": setup_done - started,
+        "first_request": first_request,
+        "status": response.status_code,
+        "modules": len(sys.modules),
+    }
+
+
+def measure(url, settings_module=None, importtime=False):
+    env = dict(os.environ)
+    if settings_module:
+        env["DJANGO_SETTINGS_MODULE"] = settings_module
+    env.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+    args = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-m", "core.startup", url]
+
+    started = time.perf_counter()
+    child = subprocess.run(
+        args,
+        env=env,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    result = json.loads(child.stdout.strip().splitlines()[-1])
+    result["process"] = time.perf_counter() - started
+    result["imports"] = parse_importtime(child.stderr) if importtime else []
+    return result
+
+
+def parse_importtime(output):
+    # (module, self seconds, cumulative seconds, nesting depth) per import
+    imports = []
+    for line in output.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            own, cumulative, indent, module = match.groups()
+            imports.append((module, int(own) / 1e6, int(cumulative) / 1e6, (len(indent) - 1) // 2))
+    return imports
+
+
+if __name__ == "__main__":
+    print(json.dumps(boot(sys.argv[1] if len(sys.argv) > 1 else "/")))
@@ -0,0 +1,27 @@
+import hashlib
+import os
+import uuid
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        directory, file_name = os.path.split(name)
+        ext = os.path.splitext(file_name)[1].lower()
+        name = os.path.join(directory, f"{digest.hexdigest()}{ext}")
+
+        if self.exists(name):
+            # Restarts the grace period of gc_recipe_images, which may be
+            # about to collect this file as unreferenced
+            os.utime(self.path(name))
+            return name
+
+        temp_name = super()._save(f"{name}.{uuid.uuid4().hex}.tmp", content)
+        os.replace(self.path(temp_name), self.path(name))
+        return name
@@ -1,6 +1,9 @@
 from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from core.models import Recipe, Tag
 
 
 class AdminSiteTests(TestCase):
@@ -31,3 +34,41 @@ class AdminSiteTests(TestCase):
         url = reverse("admin:core_user_add")
         res = self.client.get(url)
         self.assertEqual(res.status_code, 200)
+
+    def test_recipe_changelist_queries_do_not_grow(self):
+        tag = Tag.objects.create(user=self.user, name="tag")
+        url = reverse("admin:core_recipe_changelist")
+
+        def changelist_queries(count):
+            for _ in range(count):
+                Recipe.objects.create(user=self.user, title="t", time_minutes=5, price=4.99).tags.add(tag)
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.get(url)
+            self.assertEqual(res.status_code, 200)
+            return len(queries)
+
+        self.assertEqual(changelist_queries(1), changelist_queries(10))
+
+    def test_recipe_change_page_does_not_list_related_rows(self):
+        tag = Tag.objects.create(user=self.user, name="some-tag")
+        Tag.objects.create(user=self.user, name="other-tag")
+        recipe = Recipe.objects.create(user=self.user, title="t", time_minutes=5, price=4.99)
+        recipe.tags.add(tag)
+        url = reverse("admin:core_recipe_change", args=[recipe.id])
+
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertContains(res, "vForeignKeyRawIdAdminField")
+        self.assertContains(res, "some-tag")
+        self.assertNotContains(res, "other-tag")
+
+    def test_tag_search(self):
+        Tag.objects.create(user=self.user, name="Vegan")
+        Tag.objects.create(user=self.user, name="Dessert")
+        url = reverse("admin:core_tag_changelist")
+
+        res = self.client.get(url, {"q": "Veg"})
+
+        self.assertContains(res, "Vegan")
+        self.assertNotContains(res, "Dessert")
@@ -0,0 +1,145 @@
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core import batch
+from core.models import Recipe, Tag
+from recipes import async_views, views
+
+BATCH_URL = reverse("batch")
+ME_URL = reverse("user:me")
+TAGS_URL = reverse("recipe:tag-list")
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def detail_url(recipe_id):
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+@override_settings(BATCH_MAX_CONCURRENCY=1)
+class BatchApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="ehsanadmin@gmail.com",
+            password="some-password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(user=self.user, title="Soup", time_minutes=10, price="3.50")
+
+    def test_login_required(self):
+        res = APIClient().post(BATCH_URL, {"requests": [{"method": "GET", "path": ME_URL}]}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_sub_requests_run_in_order(self):
+        res = self.client.post(BATCH_URL, {"requests": [
+            {"method": "GET", "path": ME_URL},
+            {"method": "POST", "path": TAGS_URL, "body": {"name": "vegan"}},
+            {"method": "GET", "path": TAGS_URL + "?ordering=name"},
+            {"method": "GET", "path": detail_url(self.recipe.id)},
+            {"method": "GET", "path": detail_url(self.recipe.id + 1)},
+        ]}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        responses = res.data["responses"]
+        self.assertEqual([sub["status"] for sub in responses], [200, 201, 200, 200, 404])
+        self.assertEqual(responses[0]["body"]["email"], self.user.email)
+        self.assertEqual([tag["name"] for tag in responses[2]["body"]], ["vegan"])
+        self.assertEqual(responses[3]["body"]["price"], "3.50")
+
+    def test_reads_after_write_see_it(self):
+        res = self.client.post(BATCH_URL, {"requests": [
+            {"method": "GET", "path": RECIPES_URL},
+            {"method": "DELETE", "path": detail_url(self.recipe.id)},
+            {"method": "GET", "path": RECIPES_URL},
+        ]}, format="json")
+
+        self.assertEqual([len(sub["body"] or []) for sub in res.data["responses"]], [1, 0, 0])
+
+    def test_atomic_batch_rolls_back_on_failure(self):
+        res = self.client.post(BATCH_URL, {"atomic": True, "requests": [
+            {"method": "POST", "path": TAGS_URL, "body": {"name": "vegan"}},
+            {"method": "POST", "path": TAGS_URL, "body": {"name": ""}},
+            {"method": "POST", "path": TAGS_URL, "body": {"name": "quick"}},
+        ]}, format="json")
+
+        self.assertFalse(res.data["committed"])
+        self.assertEqual([sub["status"] for sub in res.data["responses"]], [201, 400])
+        self.assertFalse(Tag.objects.exists())
+
+    def test_atomic_batch_commits(self):
+        res = self.client.post(BATCH_URL, {"atomic": True, "requests": [
+            {"method": "POST", "path": TAGS_URL, "body": {"name": "vegan"}},
+            {"method": "DELETE", "path": detail_url(self.recipe.id)},
+        ]}, format="json")
+
+        self.assertTrue(res.data["committed"])
+        self.assertTrue(Tag.objects.filter(name="vegan").exists())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_invalid_batches_rejected(self):
+        for requests in (
+            [],
+            [{"method": "GET", "path": "/admin/"}],
+            [{"method": "POST", "path": BATCH_URL}],
+            [{"method": "TRACE", "path": ME_URL}],
+        ):
+            res = self.client.post(BATCH_URL, {"requests": requests}, format="json")
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(BATCH_MAX_REQUESTS=2)
+    def test_too_many_requests_rejected(self):
+        res = self.client.post(BATCH_URL, {"requests": [{"method": "GET", "path": ME_URL}] * 3}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_failing_sub_request_does_not_end_batch(self):
+        with patch("recipes.views.TagViewSet.list", side_effect=RuntimeError("boom")):
+            with self.assertLogs("django.request", "ERROR"):
+                res = self.client.post(BATCH_URL, {"requests": [
+                    {"method": "POST", "path": TAGS_URL, "body": {"name": "vegan"}},
+                    {"method": "GET", "path": TAGS_URL},
+                    {"method": "GET", "path": ME_URL},
+                ]}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([sub["status"] for sub in res.data["responses"]], [201, 500, 200])
+        self.assertTrue(Tag.objects.filter(name="vegan").exists())
+
+    def test_reads_are_grouped_between_writes(self):
+        items = [{"method": method} for method in ("GET", "GET", "POST", "HEAD", "DELETE", "GET")]
+        groups = [[item["method"] for item in group] for group in batch._groups(items)]
+
+        self.assertEqual(groups, [["GET", "GET"], ["POST"], ["HEAD"], ["DELETE"], ["GET"]])
+
+    def test_async_read_path_dispatches_to_drf_view(self):
+        sync_view = views.TagViewSet.as_view({"get": "list"})
+        view = async_views.read_path(async_views.tag_list, sync_view)
+
+        self.assertIs(view.sync_view, sync_view)
+
+
+@override_settings(BATCH_MAX_CONCURRENCY=4)
+class ConcurrentBatchTests(TransactionTestCase):
+    def test_reads_run_in_worker_threads(self):
+        user = get_user_model().objects.create_user(email="ehsanadmin@gmail.com", password="some-password")
+        client = APIClient()
+        client.force_authenticate(user)
+
+        with patch("core.batch.connections.close_all") as close_all:
+            res = client.post(BATCH_URL, {"requests": [
+                {"method": "GET", "path": ME_URL},
+                {"method": "GET", "path": TAGS_URL},
+                {"method": "GET", "path": ME_URL},
+                {"method": "GET", "path": TAGS_URL},
+                {"method": "GET", "path": ME_URL},
+            ]}, format="json")
+
+        self.assertEqual(close_all.call_count, 4)
+        self.assertEqual([sub["status"] for sub in res.data["responses"]], [200] * 5)
+        self.assertEqual(res.data["responses"][4]["body"]["email"], user.email)
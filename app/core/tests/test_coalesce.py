@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+from unittest.mock import Mock, patch
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from core import coalesce
+from core.models import Recipe
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+class SingleFlightTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_callers_share_one_computation(self):
+        started = threading.Event()
+
+        def compute():
+            started.set()
+            time.sleep(0.2)
+            return "value"
+
+        compute = Mock(side_effect=compute)
+        results = []
+        leader = threading.Thread(target=lambda: results.append(coalesce.single_flight("key", compute)))
+        leader.start()
+        started.wait()
+        followers = [
+            threading.Thread(target=lambda: results.append(coalesce.single_flight("key", compute)))
+            for _ in range(5)
+        ]
+        for thread in followers:
+            thread.start()
+        for thread in [leader] + followers:
+            thread.join()
+
+        self.assertEqual(results, ["value"] * 6)
+        self.assertEqual(compute.call_count, 1)
+
+    async def test_concurrent_async_callers_share_one_computation(self):
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.2)
+            return "value"
+
+        results = await asyncio.gather(*[coalesce.asingle_flight("key", compute) for _ in range(6)])
+
+        self.assertEqual(results, ["value"] * 6)
+        self.assertEqual(len(calls), 1)
+
+    def test_fresh_value_is_reused(self):
+        coalesce.single_flight("key", lambda: "first")
+
+        self.assertEqual(coalesce.single_flight("key", lambda: "second"), "first")
+
+    def test_stale_value_served_while_another_process_refreshes(self):
+        cache.set("key", ("stale", time.time() - 1))
+        cache.add("key:lock", "other-process")
+        compute = Mock(return_value="new")
+
+        self.assertEqual(coalesce.single_flight("key", compute), "stale")
+        compute.assert_not_called()
+
+    def test_waits_for_value_from_another_process(self):
+        cache.add("key:lock", "other-process")
+        threading.Timer(0.1, lambda: cache.set("key", ("shared", time.time() + 30))).start()
+        compute = Mock(return_value="own")
+
+        self.assertEqual(coalesce.single_flight("key", compute, wait_seconds=2), "shared")
+        compute.assert_not_called()
+
+    def test_computes_itself_after_waiting_too_long(self):
+        cache.add("key:lock", "other-process")
+
+        self.assertEqual(coalesce.single_flight("key", lambda: "own", wait_seconds=0.1), "own")
+
+    def test_uncacheable_values_are_not_stored(self):
+        coalesce.single_flight("key", lambda: "error", cacheable=lambda value: False)
+
+        self.assertEqual(coalesce.single_flight("key", lambda: "ok"), "ok")
+
+
+class CoalescedRecipeReadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="ehsanadmin@gmail.com",
+            password="some-password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_identical_list_requests_share_the_result(self):
+        Recipe.objects.create(user=self.user, title="Soup", time_minutes=10, price="3.50")
+        first = self.client.get(RECIPES_URL)
+        with self.assertNumQueries(0):
+            second = self.client.get(RECIPES_URL)
+
+        self.assertEqual(second.data, first.data)
+
+    def test_writes_are_visible_immediately(self):
+        self.client.get(RECIPES_URL)
+        Recipe.objects.create(user=self.user, title="Soup", time_minutes=10, price="3.50")
+        self.user.refresh_from_db()
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual([recipe["title"] for recipe in res.data], ["Soup"])
+
+    def test_errors_are_not_shared(self):
+        res = self.client.get(reverse("recipe:recipe-detail", args=[1]))
+
+        self.assertEqual(res.status_code, 404)
+        self.assertFalse([key for key in cache._cache if "coalesce" in key])
+
+    @override_settings(DATABASE_REPLICAS=["replica"])
+    @patch("core.routers.choose_replica", return_value="default")
+    def test_replica_reads_are_keyed_on_the_replica_change_seq(self, choose_replica):
+        self.client.get(RECIPES_URL)
+        # The request user keeps its stale change_seq; the replica has moved on
+        Recipe.objects.create(user=self.user, title="Soup", time_minutes=10, price="3.50")
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual([recipe["title"] for recipe in res.data], ["Soup"])
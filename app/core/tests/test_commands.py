@@ -1,7 +1,18 @@
 from django.test import TestCase, Client
 from django.core.management import call_command
+from django.db import connection
 from django.db.utils import OperationalError
+from django.test.utils import CaptureQueriesContext
 from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from core.models import ChangeLog, IdempotencyKey, Recipe, Tag
+from io import StringIO
+import tempfile
+from datetime import timedelta
+from django.utils import timezone
+from core.models import recipe_image_storage
+from core import startup
+from django.core.files.base import ContentFile
 
 
 class CommandTests(TestCase):
@@ -17,3 +28,129 @@ class CommandTests(TestCase):
             gi.side_effect = [OperationalError] * 5 + [True]
             call_command("wait_for_db")
             self.assertEqual(gi.call_count, 6)
+
+    def test_delete_user_in_batches(self):
+        user = get_user_model().objects.create_user(
+            email="ehsanadmin@gmail.com",
+            password="some-password"
+        )
+        tag = Tag.objects.create(user=user, name="tag")
+        for _ in range(5):
+            Recipe.objects.create(user=user, title="t", time_minutes=5, price=4.99).tags.add(tag)
+        out = StringIO()
+
+        call_command("delete_user", user.email, batch_size=2, stdout=out)
+
+        self.assertIn("Deleted 6 rows...", out.getvalue())
+        self.assertFalse(get_user_model().objects.exists())
+        self.assertFalse(Recipe.tags.through.objects.exists())
+        self.assertFalse(ChangeLog.objects.exists())
+
+    def test_repair_recipe_counts(self):
+        user = get_user_model().objects.create_user(
+            email="ehsanadmin@gmail.com",
+            password="some-password"
+        )
+        tags = [Tag.objects.create(user=user, name=f"tag-{i}") for i in range(3)]
+        Recipe.objects.create(user=user, title="t", time_minutes=5, price=4.99).tags.add(*tags[:2])
+        Tag.objects.update(recipe_count=7)
+
+        call_command("repair_recipe_counts", batch_size=2, stdout=StringIO())
+
+        counts = list(Tag.objects.order_by("id").values_list("recipe_count", flat=True))
+        self.assertEqual(counts, [1, 1, 0])
+
+    def test_import_recipes_csv(self):
+        user = get_user_model().objects.create_user(
+            email="ehsanadmin@gmail.com",
+            password="some-password"
+        )
+        rows = "title,time_minutes,price,link,tags,ingredients\n"
+        rows += "Salad,5,4.50,,Vegan|Quick,Kale\n"
+        rows += "Soup,5,9999,,,\n"
+        rows += "Stew,90,12.00,http://a.b,vegan |\tquick,Beef|Kale|KALE\n"
+        with tempfile.NamedTemporaryFile(suffix=".csv") as upload:
+            upload.write(rows.encode())
+            upload.flush()
+            out = StringIO()
+            call_command("import_recipes", user.email, upload.name, batch_size=2, stdout=out)
+
+        self.assertIn("Line 3: price", out.getvalue())
+        self.assertEqual(Recipe.objects.filter(user=user).count(), 2)
+        self.assertEqual(sorted(Tag.objects.values_list("name", "recipe_count")), [("Quick", 2), ("Vegan", 2)])
+        stew = Recipe.objects.get(title="Stew")
+        self.assertEqual(sorted(stew.ingredients.values_list("name", flat=True)), ["Beef", "Kale"])
+
+    def test_startup_profile(self):
+        stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       150 |        150 |   django.utils.version\n"
+            "import time:      2000 |       2150 | django\n"
+        )
+        result = {"setup": 0.2, "first_request": 0.05, "status": 401, "modules": 500, "process": 0.4}
+        result["imports"] = startup.parse_importtime(stderr)
+        out = StringIO()
+
+        with patch("core.startup.measure", return_value=result):
+            call_command("startup_profile", top=1, stdout=out)
+
+        self.assertEqual(result["imports"][0], ("django.utils.version", 0.00015, 0.00015, 1))
+        self.assertIn("2.0 ms      2.1 ms  django\n", out.getvalue())
+        self.assertIn("First request to /api/recipes/tags/: 50.0 ms (HTTP 401)", out.getvalue())
+
+    def test_merge_names(self):
+        user = get_user_model().objects.create_user(
+            email="ehsanadmin@gmail.com",
+            password="some-password"
+        )
+        salt = Tag.objects.create(user=user, name="Salt")
+        sea_salt = Tag.objects.create(user=user, name="Sea salt")
+        for _ in range(3):
+            Recipe.objects.create(user=user, title="t", time_minutes=5, price=4.99).tags.add(sea_salt)
+        out = StringIO()
+
+        call_command("merge_names", user.email, "tag", "salt", "SEA SALT", batch_size=2, stdout=out)
+
+        self.assertIn("Moved 2 recipe links...", out.getvalue())
+        self.assertEqual(list(Tag.objects.values_list("name", "recipe_count")), [("Salt", 3)])
+        self.assertEqual(Recipe.tags.through.objects.filter(tag=salt).count(), 3)
+
+    def test_purge_idempotency_keys(self):
+        IdempotencyKey.objects.create(owner="anonymous", key="fresh", fingerprint="")
+        stale = IdempotencyKey.objects.create(owner="anonymous", key="stale", fingerprint="")
+        IdempotencyKey.objects.filter(pk=stale.pk).update(created=timezone.now() - timedelta(days=2))
+        out = StringIO()
+
+        call_command("purge_idempotency_keys", stdout=out)
+
+        self.assertIn("Deleted 1 idempotency keys.", out.getvalue())
+        self.assertEqual(list(IdempotencyKey.objects.values_list("key", flat=True)), ["fresh"])
+
+    def test_purge_idempotency_keys_in_batches(self):
+        for key in ("a", "b", "c"):
+            IdempotencyKey.objects.create(owner="anonymous", key=key, fingerprint="")
+        IdempotencyKey.objects.update(created=timezone.now() - timedelta(days=2))
+        out = StringIO()
+
+        with CaptureQueriesContext(connection) as queries:
+            call_command("purge_idempotency_keys", batch_size=2, stdout=out)
+        deletes = [query["sql"] for query in queries if query["sql"].startswith("DELETE")]
+
+        self.assertEqual(len(deletes), 2)
+        self.assertIn("Deleted 3 idempotency keys.", out.getvalue())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_gc_recipe_images_removes_orphans(self):
+        user = get_user_model().objects.create_user(
+            email="ehsanadmin@gmail.com",
+            password="some-password"
+        )
+        recipe = Recipe.objects.create(user=user, title="t", time_minutes=5, price=4.99)
+        recipe.image.save("used.jpg", ContentFile(b"used"))
+        orphan = recipe_image_storage.save("uploads/recipe/orphan.jpg", ContentFile(b"orphan"))
+
+        call_command("gc_recipe_images", min_age=-1, stdout=StringIO())
+
+        self.assertFalse(recipe_image_storage.exists(orphan))
+        self.assertTrue(recipe_image_storage.exists(recipe.image.name))
+        recipe.image.delete()
@@ -0,0 +1,132 @@
+import io
+from datetime import timedelta
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from PIL import Image
+from core.models import IdempotencyKey, Recipe, Tag
+
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="ehsanadmin@gmail.com",
+            password="some-password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.payload = {"title": "Soup", "time_minutes": 10, "price": "3.50", "tags": [], "ingredients": []}
+
+    def post(self, url, payload, key="retry-1"):
+        return self.client.post(url, payload, format="json", HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_first_response(self):
+        first = self.post(RECIPES_URL, self.payload)
+        with patch("recipes.views.RecipeViewSet.perform_create") as perform_create:
+            retry = self.post(RECIPES_URL, self.payload)
+            perform_create.assert_not_called()
+
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_validation_errors_are_replayed(self):
+        first = self.post(TAGS_URL, {"name": ""})
+        retry = self.post(TAGS_URL, {"name": ""})
+
+        self.assertEqual(retry.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(retry.data, first.data)
+
+    def test_keys_are_scoped_per_user(self):
+        self.post(TAGS_URL, {"name": "vegan"})
+        other = get_user_model().objects.create_user(email="other@gmail.com", password="some-password")
+        self.client.force_authenticate(other)
+        res = self.post(TAGS_URL, {"name": "vegan"})
+
+        self.assertNotIn("Idempotent-Replayed", res)
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_reused_key_with_different_body(self):
+        self.post(TAGS_URL, {"name": "vegan"})
+        res = self.post(TAGS_URL, {"name": "quick"})
+
+        self.assertEqual(res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Tag.objects.count(), 1)
+
+    def test_concurrent_duplicate_conflicts(self):
+        self.post(TAGS_URL, {"name": "vegan"})
+        IdempotencyKey.objects.update(status_code=None, response=None)
+        res = self.post(TAGS_URL, {"name": "vegan"})
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+    def test_abandoned_key_runs_again(self):
+        self.post(TAGS_URL, {"name": "vegan"})
+        IdempotencyKey.objects.update(status_code=None, response=None, created=timezone.now() - timedelta(hours=1))
+        res = self.post(TAGS_URL, {"name": "vegan"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn("Idempotent-Replayed", res)
+
+    def test_multipart_bodies_are_fingerprinted_by_content(self):
+        recipe = Recipe.objects.create(user=self.user, title="Soup", time_minutes=10, price="3.50")
+        url = reverse("recipe:recipe-upload-image", args=[recipe.id])
+        responses = []
+        for color in ("red", "blue"):
+            image = io.BytesIO()
+            Image.new("RGB", (10, 10), color).save(image, format="PNG", compress_level=0)
+            image.name = "image.png"
+            image.seek(0)
+            responses.append(self.client.post(url, {"image": image}, format="multipart", HTTP_IDEMPOTENCY_KEY="upload"))
+        recipe.refresh_from_db()
+
+        self.assertEqual(responses[0].status_code, status.HTTP_200_OK)
+        self.assertEqual(responses[1].status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertTrue(recipe.image)
+        recipe.image.delete()
+
+    @override_settings(IDEMPOTENCY_MAX_BODY_SIZE=1024)
+    def test_large_multipart_body_is_refused(self):
+        recipe = Recipe.objects.create(user=self.user, title="Soup", time_minutes=10, price="3.50")
+        image = io.BytesIO()
+        Image.new("RGB", (100, 100)).save(image, format="PNG", compress_level=0)
+        image.name = "image.png"
+        image.seek(0)
+        url = reverse("recipe:recipe-upload-image", args=[recipe.id])
+
+        res = self.client.post(url, {"image": image}, format="multipart", HTTP_IDEMPOTENCY_KEY="upload")
+        recipe.refresh_from_db()
+
+        self.assertEqual(res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertFalse(recipe.image)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_expired_key_runs_again(self):
+        self.post(TAGS_URL, {"name": "vegan"})
+        IdempotencyKey.objects.update(created=timezone.now() - timedelta(days=2))
+        res = self.post(TAGS_URL, {"name": "vegan"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn("Idempotent-Replayed", res)
+
+    def test_server_error_releases_key(self):
+        with patch("recipes.views.TagViewSet.perform_create", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.post(TAGS_URL, {"name": "vegan"})
+
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.post(TAGS_URL, {"name": "vegan"}).status_code, status.HTTP_201_CREATED)
+
+    def test_invalid_key(self):
+        res = self.post(TAGS_URL, {"name": "vegan"}, key="x" * 256)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Tag.objects.exists())
@@ -0,0 +1,159 @@
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from core import jobs
+from core.models import Job
+
+calls = []
+
+
+@jobs.job(max_attempts=2)
+def record_call(value, progress=None):
+    calls.append(value)
+    progress(1, last=value)
+    return len(calls)
+
+
+@jobs.job(max_attempts=2)
+def always_fail(progress=None):
+    raise RuntimeError("broken")
+
+
+@jobs.job(max_attempts=1)
+def run_once(value, progress=None):
+    calls.append(value)
+
+
+@jobs.job(max_attempts=2)
+def report_then_claim(progress=None):
+    progress(1)
+    calls.append(jobs.claim("other-worker"))
+    return 1
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_jobs_claimed_by_priority(self):
+        jobs.enqueue(None, record_call, "low")
+        jobs.enqueue(None, record_call, "high", priority=5)
+
+        first = jobs.claim("worker-1")
+        second = jobs.claim("worker-2")
+
+        self.assertEqual([job.args for job in first + second], [["high"], ["low"]])
+        self.assertEqual(jobs.claim("worker-3"), [])
+        self.assertEqual(first[0].locked_by, "worker-1")
+        self.assertEqual(first[0].attempts, 1)
+
+    def test_delayed_job_waits(self):
+        jobs.enqueue(None, record_call, "later", delay=60)
+
+        self.assertEqual(jobs.claim("worker"), [])
+
+    def test_worker_runs_and_records_progress(self):
+        job = jobs.enqueue(7, record_call, "value")
+        jobs.Worker().run(burst=True)
+
+        self.assertEqual(calls, ["value"])
+        self.assertEqual(jobs.get_job(job), {"owner": 7, "status": "done", "count": 1, "last": "value"})
+
+    def test_failed_job_is_retried_with_backoff(self):
+        jobs.enqueue(None, always_fail)
+        jobs.Worker().run(burst=True)
+        job = Job.objects.get()
+
+        self.assertEqual((job.status, job.attempts), (Job.PENDING, 1))
+        self.assertIn("RuntimeError: broken", job.error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=20))
+
+        Job.objects.update(run_at=timezone.now())
+        jobs.Worker().run(burst=True)
+        job.refresh_from_db()
+
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    @override_settings(JOB_RETRY_BACKOFF=10, JOB_RETRY_BACKOFF_MAX=25)
+    def test_backoff_is_exponential_and_capped(self):
+        self.assertEqual([jobs.backoff(attempt) for attempt in (1, 2, 3)], [10, 20, 25])
+
+    def test_abandoned_job_is_reclaimed(self):
+        jobs.enqueue(None, record_call, "value")
+        jobs.claim("dead-worker")
+        Job.objects.update(locked_at=timezone.now() - timedelta(hours=2))
+
+        self.assertEqual(jobs.claim("worker")[0].attempts, 2)
+
+    def test_abandoned_job_without_attempts_left_fails(self):
+        jobs.enqueue(None, run_once, "value")
+        jobs.claim("dead-worker")
+        Job.objects.update(locked_at=timezone.now() - timedelta(hours=2))
+
+        self.assertEqual(jobs.claim("worker"), [])
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+
+    def test_progress_keeps_job_claimed(self):
+        jobs.enqueue(None, report_then_claim)
+        record = jobs.claim("worker")[0]
+        Job.objects.update(locked_at=timezone.now() - timedelta(hours=2))
+        jobs.run(record)
+
+        self.assertEqual(calls, [[]])
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+
+    def test_reclaimed_job_ignores_previous_worker(self):
+        jobs.enqueue(None, record_call, "value")
+        record = jobs.claim("old-worker")[0]
+        Job.objects.update(locked_at=timezone.now() - timedelta(hours=2))
+        jobs.claim("new-worker")
+        jobs.run(record)
+
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.locked_by, job.count), (Job.RUNNING, "new-worker", 0))
+
+    def test_only_marked_functions_run(self):
+        Job.objects.create(name="os.getcwd", max_attempts=1)
+        jobs.Worker().run(burst=True)
+
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+
+    def test_run_worker_command(self):
+        jobs.enqueue(None, record_call, "value")
+        out = StringIO()
+
+        call_command("run_worker", "--burst", "--threads", "1", stdout=out)
+
+        self.assertEqual(calls, ["value"])
+        self.assertIn("Starting 1 x 1 workers...", out.getvalue())
+
+
+class JobStatusApiTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="ehsanadmin@gmail.com",
+            password="some-password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_owner_sees_job_status(self):
+        job = jobs.enqueue(self.user.id, record_call, "value")
+        res = self.client.get(reverse("job-status", args=[job]))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["job"], job)
+        self.assertEqual(res.data["status"], "pending")
+        self.assertEqual(res.data["max_attempts"], 2)
+
+    def test_other_users_job_not_found(self):
+        job = jobs.enqueue(self.user.id + 1, record_call, "value")
+        res = self.client.get(reverse("job-status", args=[job]))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
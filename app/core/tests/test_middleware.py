@@ -0,0 +1,67 @@
+import gzip
+import json
+from unittest import skipUnless
+from unittest.mock import Mock, patch
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase
+from core import middleware
+
+PAYLOAD = json.dumps([{"title": "recipe", "tags": [1, 2, 3], "price": "4.99"}] * 100).encode()
+
+
+class CompressionMiddlewareTests(TestCase):
+    def setUp(self):
+        caches[settings.COMPRESSION_CACHE].clear()
+        self.factory = RequestFactory()
+
+    def respond(self, response, accept="gzip, deflate, br"):
+        request = self.factory.get("/", HTTP_ACCEPT_ENCODING=accept)
+        return middleware.CompressionMiddleware(lambda request: response)(request)
+
+    def test_gzip_when_brotli_not_accepted(self):
+        res = self.respond(HttpResponse(PAYLOAD, content_type="application/json"), accept="gzip")
+
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertEqual(res["Vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(res.content), PAYLOAD)
+        self.assertLess(len(res.content), len(PAYLOAD) // 5)
+
+    @skipUnless(middleware.brotli, "brotli is not installed")
+    def test_brotli_preferred(self):
+        res = self.respond(HttpResponse(PAYLOAD, content_type="application/json"))
+
+        self.assertEqual(res["Content-Encoding"], "br")
+        self.assertEqual(middleware.brotli.decompress(res.content), PAYLOAD)
+
+    def test_small_and_binary_responses_untouched(self):
+        small = self.respond(HttpResponse(b"{}", content_type="application/json"))
+        image = self.respond(HttpResponse(PAYLOAD, content_type="image/jpeg"))
+
+        self.assertFalse(small.has_header("Content-Encoding"))
+        self.assertFalse(image.has_header("Content-Encoding"))
+
+    def test_quality_values(self):
+        self.assertEqual(middleware.accepted_encoding("br;q=0, gzip;q=0.5"), "gzip")
+        self.assertIsNone(middleware.accepted_encoding("identity"))
+        self.assertIsNone(middleware.accepted_encoding("gzip;q=0"))
+
+    def test_streaming_response(self):
+        chunks = [PAYLOAD[i:i + 500] for i in range(0, len(PAYLOAD), 500)]
+        res = self.respond(StreamingHttpResponse(iter(chunks), content_type="application/json"), accept="gzip")
+
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(b"".join(res.streaming_content)), PAYLOAD)
+
+    def test_compressed_variant_is_cached(self):
+        self.respond(HttpResponse(PAYLOAD, content_type="application/json"), accept="gzip")
+        # Kept apart from the shared default cache
+        cache.clear()
+
+        encoder = Mock()
+        with patch.dict(middleware.ENCODERS, {"gzip": encoder}):
+            res = self.respond(HttpResponse(PAYLOAD, content_type="application/json"), accept="gzip")
+
+        encoder.assert_not_called()
+        self.assertEqual(gzip.decompress(res.content), PAYLOAD)
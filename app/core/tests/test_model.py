@@ -1,6 +1,8 @@
-from unittest.mock import patch
+import hashlib
+from django.core.files.base import ContentFile
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.db.models.deletion import Collector
 from core import models
 
 
@@ -65,11 +67,56 @@ class ModelTests(TestCase):
         )
         self.assertEqual(str(recipe), recipe.title)
 
-    @patch("uuid.uuid4")
-    def test_recipe_image_file_name(self, mock_uuid):
-        uuid = "test-uuid"
-        mock_uuid.return_value = uuid
-        file_path = models.recipe_image_path(None, "my-image.jpg")
-        expected_path = f"uploads/recipe/{uuid}.jpg"
+    def test_recipe_image_file_name(self):
+        file_path = models.recipe_image_path(None, "my-image.JPG")
+        expected_path = "uploads/recipe/image.jpg"
 
         self.assertEqual(file_path, expected_path)
+
+    def test_recipe_image_stored_by_content_hash(self):
+        recipe = models.Recipe.objects.create(
+            user=sample_user(),
+            title="some-title",
+            time_minutes=5,
+            price=4.99,
+        )
+        recipe.image.save("my-image.jpg", ContentFile(b"some-content"))
+        digest = hashlib.sha256(b"some-content").hexdigest()
+
+        self.assertEqual(recipe.image.name, f"uploads/recipe/{digest}.jpg")
+        recipe.image.delete()
+
+    def test_delete_user_with_tracked_recipes(self):
+        user = sample_user()
+        recipe = models.Recipe.objects.create(
+            user=user,
+            title="some-title",
+            time_minutes=5,
+            price=4.99,
+        )
+        recipe.tags.add(models.Tag.objects.create(user=user, name="Vegan"))
+
+        user.delete()
+
+        self.assertFalse(models.ChangeLog.objects.exists())
+        self.assertFalse(models.Recipe.objects.exists())
+
+    def test_user_save_keeps_change_seq(self):
+        user = sample_user()
+        stale = get_user_model().objects.get(pk=user.pk)
+        for title in ("first", "second"):
+            models.Recipe.objects.create(user=user, title=title, time_minutes=5, price=4.99)
+
+        stale.name = "new name"
+        stale.set_password("new-password")
+        stale.save()
+        user.refresh_from_db()
+
+        self.assertEqual(user.change_seq, 2)
+        self.assertEqual(user.name, "new name")
+
+    def test_untracked_models_are_fast_deleted(self):
+        collector = Collector(using="default")
+
+        for model in (models.ChangeLog, models.IdempotencyKey, models.Job, models.Recipe.tags.through):
+            self.assertTrue(collector.can_fast_delete(model.objects.all()), model)
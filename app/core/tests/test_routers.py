@@ -0,0 +1,92 @@
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from core import models, routers
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+
+    def test_reads_use_primary_by_default(self):
+        self.assertEqual(self.router.db_for_read(models.Recipe), "default")
+
+    def test_reads_use_replica_when_enabled(self):
+        token = routers.use_replicas()
+        try:
+            self.assertEqual(self.router.db_for_read(models.Recipe), "replica")
+            self.assertEqual(self.router.db_for_write(models.Recipe), "default")
+        finally:
+            routers.reset_replicas(token)
+
+    @override_settings(DATABASE_REPLICAS=["replica1", "replica2"])
+    def test_one_replica_per_request(self):
+        token = routers.use_replicas()
+        try:
+            aliases = {self.router.db_for_read(models.Recipe) for _ in range(20)}
+        finally:
+            routers.reset_replicas(token)
+
+        self.assertEqual(len(aliases), 1)
+        self.assertFalse(routers.reading_from_replica())
+
+    def test_manager_writes_use_primary(self):
+        token = routers.use_replicas()
+        try:
+            self.assertEqual(models.ChangeLog.objects.db, "default")
+            self.assertEqual(models.Recipe.objects.db, "default")
+            self.assertEqual(models.Recipe.objects.db_manager("replica").db, "replica")
+        finally:
+            routers.reset_replicas(token)
+
+    def test_replicas_are_not_migrated(self):
+        self.assertTrue(self.router.allow_migrate("default", "core"))
+        self.assertFalse(self.router.allow_migrate("replica", "core"))
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+@patch("core.routers.choose_replica", return_value="default")
+class ReadYourWritesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="ehsanadmin@gmail.com",
+            password="some-password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_reads_from_replica(self, choose_replica):
+        self.client.get(RECIPES_URL)
+
+        self.assertTrue(choose_replica.called)
+
+    def test_reads_after_write_use_primary(self, choose_replica):
+        payload = {"title": "some-title", "time_minutes": 5, "price": 4.99, "tags": [], "ingredients": []}
+        self.client.post(RECIPES_URL, payload, format="json")
+        choose_replica.reset_mock()
+
+        self.client.get(RECIPES_URL)
+
+        self.assertFalse(choose_replica.called)
+        self.assertTrue(routers.pinned_to_primary(self.user.id))
+
+    def test_failed_write_does_not_pin(self, choose_replica):
+        self.client.post(RECIPES_URL, {"title": ""}, format="json")
+
+        self.client.get(RECIPES_URL)
+
+        self.assertTrue(choose_replica.called)
+
+    def test_replica_is_reset_after_unhandled_exception(self, choose_replica):
+        with patch("recipes.views.RecipeViewSet.list", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.client.get(RECIPES_URL)
+
+        self.assertFalse(routers.reading_from_replica())
@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core import throttling
+from core.models import Recipe
+
+RECIPES_URL = reverse("recipe:recipe-list")
+STATS_URL = reverse("throttle-stats")
+TOKEN_URL = reverse("user:token")
+
+
+def rates(**overrides):
+    return {**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {
+        **settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"],
+        **overrides
+    }}
+
+
+class TokenBucketTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_bucket_refills_over_the_period(self):
+        self.assertEqual(throttling.take("bucket", 2, 60, now=0), 0)
+        self.assertEqual(throttling.take("bucket", 2, 60, now=0), 0)
+        self.assertEqual(throttling.take("bucket", 2, 60, now=0), 30)
+        self.assertEqual(throttling.take("bucket", 2, 60, now=30), 0)
+
+    def test_parse_rate(self):
+        self.assertEqual(throttling.parse_rate("10/min"), (10, 60))
+        self.assertEqual(throttling.parse_rate("100/hour"), (100, 3600))
+
+
+class ThrottleApiTests(TestCase):
+    def setUp(self):
+        throttling.flush_stats()
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="ehsanadmin@gmail.com",
+            password="some-password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(user=self.user, title="Soup", time_minutes=10, price="3.50")
+
+    @override_settings(REST_FRAMEWORK=rates(uploads="1/min"))
+    def test_upload_has_its_own_stricter_budget(self):
+        url = reverse("recipe:recipe-upload-image", args=[self.recipe.id])
+        self.client.post(url, {}, format="multipart")
+        res = self.client.post(url, {}, format="multipart")
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res["Retry-After"], "60")
+        self.assertEqual(self.client.get(RECIPES_URL).status_code, status.HTTP_200_OK)
+
+    @override_settings(REST_FRAMEWORK=rates(user="2/min"))
+    def test_user_budget_covers_every_endpoint(self):
+        self.client.get(RECIPES_URL)
+        self.client.get(reverse("recipe:tag-list"))
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(REST_FRAMEWORK=rates(anon="1/min"))
+    def test_anonymous_callers_limited_by_ip(self):
+        client = APIClient()
+        payload = {"email": self.user.email, "password": "wrong-password"}
+        client.post(TOKEN_URL, payload, REMOTE_ADDR="10.0.0.1")
+
+        self.assertEqual(client.post(TOKEN_URL, payload, REMOTE_ADDR="10.0.0.1").status_code, 429)
+        self.assertEqual(client.post(TOKEN_URL, payload, REMOTE_ADDR="10.0.0.2").status_code, 400)
+
+    @override_settings(REST_FRAMEWORK=rates(anon="1/min"))
+    def test_forwarded_for_header_is_not_trusted(self):
+        client = APIClient()
+        payload = {"email": self.user.email, "password": "wrong-password"}
+        client.post(TOKEN_URL, payload, HTTP_X_FORWARDED_FOR="1.1.1.1")
+        res = client.post(TOKEN_URL, payload, HTTP_X_FORWARDED_FOR="2.2.2.2")
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(REST_FRAMEWORK=rates(recipes="1/min"))
+    def test_stats_visible_to_admins(self):
+        self.client.get(RECIPES_URL)
+        self.client.get(RECIPES_URL)
+
+        self.assertEqual(self.client.get(STATS_URL).status_code, status.HTTP_403_FORBIDDEN)
+        self.user.is_staff = True
+        self.user.save()
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data["recipes"], {"rate": "1/min", "allowed": 1, "throttled": 1})
@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import Counter
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+# Allowed/throttled counts are summed in process and added to the cache at
+# most every STATS_FLUSH_SECONDS, so most checks make no extra round trip
+STATS_FLUSH_SECONDS = 10
+_counts = Counter()
+_counts_lock = threading.Lock()
+_last_flush = 0.0
+
+
+def parse_rate(rate):
+    # DRF's "<requests>/<period>" syntax: the bucket holds <requests> tokens
+    # and refills completely over one period
+    count, period = rate.split("/")
+    return int(count), PERIODS[period[0]]
+
+
+def take(key, capacity, period, now=None):
+    # One cache read and one write per check. Concurrent checks may both see
+    # the same level and let one extra request through, which is fine for a
+    # rate limit and avoids locking. Returns the seconds until a token is free.
+    cache = caches[settings.THROTTLE_CACHE]
+    now = time.time() if now is None else now
+    refill = capacity / period
+    tokens, updated = cache.get(key, (capacity, now))
+    tokens = min(capacity, tokens + (now - updated) * refill)
+    wait = 0 if tokens >= 1 else (1 - tokens) / refill
+    if not wait:
+        tokens -= 1
+    cache.set(key, (tokens, now), int(period) + 1)
+    return wait
+
+
+def record(scope, allowed):
+    with _counts_lock:
+        _counts[f"throttle-stats:{scope}:{'allowed' if allowed else 'throttled'}"] += 1
+        if time.monotonic() - _last_flush < STATS_FLUSH_SECONDS:
+            return
+    flush_stats()
+
+
+def flush_stats():
+    global _last_flush
+    with _counts_lock:
+        counts = dict(_counts)
+        _counts.clear()
+        _last_flush = time.monotonic()
+
+    cache = caches[settings.THROTTLE_CACHE]
+    for key, count in counts.items():
+        if not cache.add(key, count, None):
+            try:
+                cache.incr(key, count)
+            except ValueError:
+                cache.set(key, count, None)
+
+
+def stats():
+    # Counts from other processes may lag by up to STATS_FLUSH_SECONDS
+    flush_stats()
+    cache = caches[settings.THROTTLE_CACHE]
+    scopes = api_settings.DEFAULT_THROTTLE_RATES
+    counts = cache.get_many([
+        f"throttle-stats:{scope}:{outcome}" for scope in scopes for outcome in ("allowed", "throttled")
+    ])
+    return {
+        scope: {
+            "rate": scopes[scope],
+            "allowed": counts.get(f"throttle-stats:{scope}:allowed", 0),
+            "throttled": counts.get(f"throttle-stats:{scope}:throttled", 0),
+        }
+        for scope in scopes
+    }
+
+
+class TokenBucketThrottle(BaseThrottle):
+    # Token bucket per scope and caller, kept in THROTTLE_CACHE. That cache
+    # must be shared by all processes (CACHE_URL), or each process enforces
+    # the full rate on its own. Scopes without a configured rate are not
+    # limited.
+    scope = None
+
+    def get_scope(self, request, view):
+        return self.scope
+
+    def get_ident_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return f"user:{request.user.id}"
+        return f"ip:{self.get_ident(request)}"
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request, view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope) if scope else None
+        self.delay = 0
+        if rate is None:
+            return True
+
+        capacity, period = parse_rate(rate)
+        self.delay = take(f"throttle:{scope}:{self.get_ident_key(request)}", capacity, period)
+        record(scope, not self.delay)
+        return not self.delay
+
+    def wait(self):
+        return self.delay
+
+
+class UserBucketThrottle(TokenBucketThrottle):
+    scope = "user"
+
+    def get_scope(self, request, view):
+        return self.scope if request.user and request.user.is_authenticated else None
+
+
+class AnonBucketThrottle(TokenBucketThrottle):
+    scope = "anon"
+
+    def get_scope(self, request, view):
+        return None if request.user and request.user.is_authenticated else self.scope
+
+
+class ScopedBucketThrottle(TokenBucketThrottle):
+    # Per endpoint: view.throttle_scopes maps viewset actions to stricter
+    # budgets, falling back to view.throttle_scope
+    def get_scope(self, request, view):
+        action = getattr(view, "action", None)
+        return getattr(view, "throttle_scopes", {}).get(action, getattr(view, "throttle_scope", None))
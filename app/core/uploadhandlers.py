@@ -0,0 +1,77 @@
+import io
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopUpload
+from django.utils.translation import gettext as _
+
+# Room for the multipart boundaries and part headers around the file itself
+MULTIPART_OVERHEAD = 16 * 1024
+
+
+class ImageUploadHandler(FileUploadHandler):
+    # Chunks are held back until the image header is parsed, so rejected
+    # files never reach the memory/temporary file handlers after this one.
+    # Parsing is retried as chunks arrive, up to header_limit bytes.
+    header_limit = 256 * 1024
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.error = None
+        self.request_length = None
+        self.buffer = None
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.request_length = content_length
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        if self.request_length and self.request_length > settings.RECIPE_IMAGE_MAX_SIZE + MULTIPART_OVERHEAD:
+            self.error = self._too_large()
+            raise StopUpload(connection_reset=True)
+        self.buffer = io.BytesIO()
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.RECIPE_IMAGE_MAX_SIZE:
+            self._reject(self._too_large())
+
+        if self.buffer is None:
+            return raw_data
+
+        self.buffer.write(raw_data)
+        if not self._header_valid():
+            return None
+
+        data, self.buffer = self.buffer.getvalue(), None
+        return data
+
+    def file_complete(self, file_size):
+        if self.buffer is not None:
+            self.error = self.error or _("Upload a valid image.")
+        return None
+
+    def _header_valid(self):
+        from PIL import Image
+
+        self.buffer.seek(0)
+        try:
+            with Image.open(self.buffer) as image:
+                image_format, (width, height) = image.format, image.size
+        except Image.DecompressionBombError:
+            self._reject(_("Image dimensions are too large."))
+        except Exception:
+            if self.buffer.seek(0, io.SEEK_END) >= self.header_limit:
+                self._reject(_("Upload a valid image."))
+            return False
+
+        if image_format not in settings.RECIPE_IMAGE_FORMATS:
+            self._reject(_("Unsupported image format %(format)s.") % {"format": image_format})
+        if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+            self._reject(_("Image dimensions are too large."))
+        return True
+
+    def _too_large(self):
+        return _("Image must be smaller than %(size)s bytes.") % {"size": settings.RECIPE_IMAGE_MAX_SIZE}
+
+    def _reject(self, message):
+        self.error = message
+        self.buffer = None
+        raise SkipFile()
@@ -0,0 +1,63 @@
+from django.db.models import Q
+from rest_framework import status
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from . import batch, models, serializers, throttling
+
+
+class BatchView(APIView):
+    # Runs several API calls in one round trip. The caller is authenticated
+    # once and sub-requests go straight to the resolved views; consecutive
+    # reads run concurrently unless the batch is atomic.
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = serializers.BatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        items = serializer.validated_data["requests"]
+        if not serializer.validated_data["atomic"]:
+            return Response(
+                {"responses": batch.run(request, items)},
+                status=status.HTTP_200_OK
+            )
+
+        responses, committed = batch.run_atomic(request, items)
+        return Response(
+            {"committed": committed, "responses": responses},
+            status=status.HTTP_200_OK
+        )
+
+
+class ThrottleStatsView(APIView):
+    # Allowed and throttled requests per throttle scope, counted in THROTTLE_CACHE
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(throttling.stats(), status=status.HTTP_200_OK)
+
+
+class JobStatusView(APIView):
+    # Progress of a queued background job, visible to the user who started it.
+    # Jobs without an owner, such as account deletion, are visible to anyone
+    # holding their random key.
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [AllowAny]
+
+    def get(self, request, job):
+        owners = Q(owner=None)
+        if request.user.is_authenticated:
+            owners |= Q(owner=request.user.id)
+        record = models.Job.objects.filter(owners, key=job).first()
+        if record is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        return Response(serializers.JobSerializer(record).data, status=status.HTTP_200_OK)
@@ -3,9 +3,17 @@
 import os
 import sys
 
+# Commands that boot with app.settings_lean unless a settings module is given
+LEAN_COMMANDS = {
+    'wait_for_db', 'migrate', 'delete_user', 'gc_recipe_images', 'import_recipes', 'merge_names',
+    'repair_recipe_counts', 'purge_idempotency_keys', 'run_worker',
+}
+
 
 def main():
     """Run administrative tasks."""
+    if len(sys.argv) > 1 and sys.argv[1] in LEAN_COMMANDS:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings_lean')
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
     try:
         from django.core.management import execute_from_command_line
@@ -0,0 +1,162 @@
+import hashlib
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse
+from django.utils.translation import gettext as _
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+from core import models, routers
+from core.coalesce import asingle_flight, _achange_seq
+from . import serializers, views
+
+
+async def authenticate(request):
+    auth = get_authorization_header(request).split()
+    if not auth or auth[0].lower() != TokenAuthentication.keyword.lower().encode():
+        raise exceptions.NotAuthenticated()
+    if len(auth) != 2:
+        raise exceptions.AuthenticationFailed(_("Invalid token header."))
+
+    try:
+        token = await Token.objects.select_related("user").aget(key=auth[1].decode())
+    except (Token.DoesNotExist, UnicodeError):
+        raise exceptions.AuthenticationFailed(_("Invalid token."))
+
+    if not token.user.is_active:
+        raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+    return token.user
+
+
+def authenticated(view):
+    async def wrapper(request, *args, **kwargs):
+        try:
+            request.user = await authenticate(request)
+        except exceptions.APIException as exc:
+            return JsonResponse(
+                {"detail": exc.detail},
+                status=status.HTTP_401_UNAUTHORIZED,
+                headers={"WWW-Authenticate": TokenAuthentication.keyword}
+            )
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def throttled(viewset, action):
+    # Runs the DRF throttles of the viewset action the async view stands in
+    # for, so both paths draw from the same buckets; goes after @authenticated
+    def decorator(view):
+        async def wrapper(request, *args, **kwargs):
+            try:
+                await sync_to_async(viewset(action=action).check_throttles)(request)
+            except exceptions.Throttled as exc:
+                headers = {"Retry-After": str(exc.wait)} if exc.wait is not None else {}
+                return JsonResponse({"detail": exc.detail}, status=exc.status_code, headers=headers)
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def replica_reads(view):
+    # As ReplicaReadMixin: reads go to a replica unless the user was pinned
+    # to the primary by a recent write. The ContextVar follows the ORM calls
+    # into their worker threads.
+    async def wrapper(request, *args, **kwargs):
+        pinned = await sync_to_async(routers.pinned_to_primary)(request.user.id)
+        replicas = routers.use_replicas(not pinned)
+        try:
+            return await view(request, *args, **kwargs)
+        finally:
+            routers.reset_replicas(replicas)
+    return wrapper
+
+
+def coalesced(name):
+    # As core.coalesce.coalesce for the viewset actions. The bodies differ
+    # from the paginated DRF responses, so entries are kept apart from theirs.
+    def decorator(view):
+        async def wrapper(request, *args, **kwargs):
+            digest = hashlib.sha1(request.build_absolute_uri().encode()).hexdigest()
+            key = f"coalesce:async:{name}:{request.user.id}:{await _achange_seq(request)}:{digest}"
+
+            async def compute():
+                response = await view(request, *args, **kwargs)
+                return response.status_code, response.content
+
+            status_code, content = await asingle_flight(
+                key,
+                compute,
+                cacheable=lambda value: value[0] == status.HTTP_200_OK
+            )
+            return HttpResponse(content, status=status_code, content_type="application/json")
+        return wrapper
+    return decorator
+
+
+@authenticated
+@throttled(views.RecipeViewSet, "list")
+@replica_reads
+@coalesced("recipe_list")
+async def recipe_list(request):
+    queryset = models.Recipe.objects.filter(user=request.user).order_by("-id").prefetch_related(
+        "tags", "ingredients"
+    )
+    recipes = [recipe async for recipe in queryset]
+    return JsonResponse(serializers.RecipeSerializer(recipes, many=True).data, safe=False)
+
+
+@authenticated
+@throttled(views.RecipeViewSet, "retrieve")
+@replica_reads
+@coalesced("recipe_detail")
+async def recipe_detail(request, pk):
+    queryset = models.Recipe.objects.filter(user=request.user).prefetch_related("tags", "ingredients")
+    try:
+        recipe = await queryset.aget(pk=pk)
+    except models.Recipe.DoesNotExist:
+        return JsonResponse({"detail": _("Not found.")}, status=status.HTTP_404_NOT_FOUND)
+
+    serializer = serializers.RecipeDetailSerializer(recipe, context={"request": request})
+    return JsonResponse(serializer.data)
+
+
+def attr_list(viewset, serializer_class):
+    model = viewset.queryset.model
+
+    @authenticated
+    @throttled(viewset, "list")
+    @replica_reads
+    async def view(request):
+        ordering = viewset.ordering_for(request.GET)
+        queryset = model.objects.filter(user=request.user).order_by(*ordering)
+        items = [item async for item in queryset]
+        return JsonResponse(serializer_class(items, many=True).data, safe=False)
+    return view
+
+
+tag_list = attr_list(views.TagViewSet, serializers.TagSerializer)
+ingredient_list = attr_list(views.IngredientViewSet, serializers.IngredientSerializer)
+
+
+# Renderers other than JSON live in the DRF viewset
+SYNC_MEDIA_TYPES = ("text/html", "msgpack")
+
+
+def read_path(async_view, sync_view, params=()):
+    # JSON reads take the native async path; writes, other renderers and
+    # query parameters the async view does not handle still go through the
+    # DRF viewset in a worker thread.
+    threaded_view = sync_to_async(sync_view)
+
+    async def view(request, *args, **kwargs):
+        if (
+            request.method in ("GET", "HEAD")
+            and not any(media_type in request.headers.get("Accept", "") for media_type in SYNC_MEDIA_TYPES)
+            and set(request.GET) <= set(params)
+        ):
+            return await async_view(request, *args, **kwargs)
+        return await threaded_view(request, *args, **kwargs)
+
+    view = csrf_exempt(view)
+    view.sync_view = sync_view
+    return view
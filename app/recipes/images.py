@@ -0,0 +1,123 @@
+import os
+import threading
+import uuid
+from django.conf import settings
+from django.urls import reverse
+from core import jobs, models
+
+VARIANT_DIR = "cache/recipe/"
+
+FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+    "png": ("PNG", "image/png"),
+}
+
+
+def image_version(recipe):
+    return os.path.splitext(os.path.basename(recipe.image.name))[0][:12]
+
+
+def variant_url(recipe, width, fmt="webp"):
+    url = reverse("recipe-image-variant", args=[recipe.id])
+    return f"{url}?w={width}&fmt={fmt}&v={image_version(recipe)}"
+
+
+def srcset(recipe, build_uri=None, fmt="webp"):
+    entries = []
+    for width in settings.RECIPE_IMAGE_WIDTHS:
+        url = variant_url(recipe, width, fmt)
+        entries.append(f"{build_uri(url) if build_uri else url} {width}w")
+    return ", ".join(entries)
+
+
+class VariantCache:
+    # The directory is only scanned for eviction once this process has
+    # rendered EVICT_FRACTION of max_bytes since its last scan
+    EVICT_FRACTION = 0.05
+    rendered = 0
+    lock = threading.Lock()
+
+    def __init__(self, root=None, max_bytes=None):
+        self.root = os.path.join(root or settings.MEDIA_ROOT, VARIANT_DIR)
+        self.max_bytes = max_bytes or settings.RECIPE_IMAGE_CACHE_MAX_BYTES
+
+    def get(self, recipe, width, fmt):
+        # Raises FileNotFoundError when the source image is missing
+        path = os.path.join(self.root, f"{image_version(recipe)}-{width}.{fmt}")
+        try:
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass
+
+        os.makedirs(self.root, exist_ok=True)
+        self._render(recipe.image.path, path, width, fmt)
+        with VariantCache.lock:
+            VariantCache.rendered += os.path.getsize(path)
+            scan = VariantCache.rendered >= self.max_bytes * self.EVICT_FRACTION
+            if scan:
+                VariantCache.rendered = 0
+        if scan:
+            self.evict(keep=path)
+        return path
+
+    def open_variant(self, recipe, width, fmt):
+        # Another process may evict the file between get() and opening it;
+        # it is rendered again once in that case
+        try:
+            return open(self.get(recipe, width, fmt), "rb")
+        except FileNotFoundError:
+            return open(self.get(recipe, width, fmt), "rb")
+
+    def _render(self, source, path, width, fmt):
+        from PIL import Image
+
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with Image.open(source) as image:
+            image.draft("RGB", (width, width * image.height // image.width))
+            image.thumbnail((width, image.height))
+            if fmt == "jpeg" and image.mode != "RGB":
+                image = image.convert("RGB")
+            image.save(temp_path, format=FORMATS[fmt][0])
+        os.replace(temp_path, path)
+
+    def evict(self, keep=None):
+        entries = []
+        total = 0
+        with os.scandir(self.root) as scan:
+            for entry in scan:
+                stat = entry.stat()
+                total += stat.st_size
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+@jobs.job(priority=-10)
+def render_variants(recipe_id, fmt="webp", progress=None):
+    # Renders the srcset widths ahead of the first request for them
+    recipe = models.Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return 0
+
+    variants = VariantCache()
+    for count, width in enumerate(settings.RECIPE_IMAGE_WIDTHS, 1):
+        try:
+            variants.get(recipe, width, fmt)
+        except FileNotFoundError:
+            # The source was replaced or collected since the job was queued
+            return count - 1
+        if progress:
+            progress(count)
+    return len(settings.RECIPE_IMAGE_WIDTHS)
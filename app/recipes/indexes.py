@@ -0,0 +1,253 @@
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from core import models
+
+# numpy is bound by _load_numpy() when the first SimilarityIndex is built, so
+# loading the URLconf stays cheap
+np = None
+
+
+def _load_numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+
+
+class RecipeIndex:
+    # Per-user in-memory map from recipe to a set of related ids, with the
+    # inverted postings, kept in step with the database through ChangeLog.
+    relations = []
+
+    _registry = OrderedDict()
+    _registry_lock = threading.Lock()
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.seq = None
+        self.recipes = {}
+        self.postings = defaultdict(set)
+        self.lock = threading.Lock()
+
+    @classmethod
+    def get(cls, user_id):
+        key = (cls, user_id)
+        with cls._registry_lock:
+            index = cls._registry.pop(key, None) or cls(user_id)
+            cls._registry[key] = index
+            while len(cls._registry) > settings.RECIPE_INDEX_CACHE_SIZE:
+                cls._registry.popitem(last=False)
+        return index
+
+    @classmethod
+    def clear(cls):
+        with cls._registry_lock:
+            cls._registry.clear()
+
+    def refresh(self):
+        seq = get_user_model().objects.filter(pk=self.user_id).values_list("change_seq", flat=True).get()
+        if seq == self.seq:
+            return False
+
+        if self.seq is None or seq - self.seq > settings.RECIPE_INDEX_MAX_DELTA:
+            self._rebuild(seq)
+        else:
+            self._apply_changes(seq)
+        return True
+
+    def _rebuild(self, seq):
+        self.recipes = {}
+        self.postings = defaultdict(set)
+        self._reset()
+        self._load(models.Recipe.objects.filter(user_id=self.user_id).values_list("id", flat=True), user=True)
+        self.seq = seq
+
+    def _apply_changes(self, seq):
+        kinds = {kind: position for position, (_, kind) in enumerate(self.relations)}
+        changes = models.ChangeLog.objects.filter(
+            user_id=self.user_id,
+            seq__gt=self.seq,
+            seq__lte=seq,
+            kind__in=[models.ChangeLog.RECIPE] + list(kinds)
+        ).values_list("kind", "object_id", "deleted")
+
+        updated = []
+        for kind, object_id, deleted in changes:
+            if kind in kinds and deleted:
+                feature = self._feature(kinds[kind], object_id)
+                for recipe_id in self.postings.pop(feature, set()):
+                    self._set(recipe_id, self.recipes[recipe_id] - {feature})
+                self.postings.pop(feature, None)
+            elif kind == models.ChangeLog.RECIPE:
+                self._remove(object_id)
+                if not deleted:
+                    updated.append(object_id)
+        if updated:
+            self._load(updated)
+        self.seq = seq
+
+    def _load(self, recipe_ids, user=False):
+        features = {recipe_id: set() for recipe_id in recipe_ids}
+        for position, (field, _) in enumerate(self.relations):
+            links = models.Recipe._meta.get_field(field).remote_field.through.objects.all()
+            if user:
+                links = links.filter(recipe__user_id=self.user_id)
+            else:
+                links = links.filter(recipe_id__in=list(features))
+            column = f"{models.Recipe._meta.get_field(field).related_model._meta.model_name}_id"
+            for recipe_id, object_id in links.values_list("recipe_id", column).iterator():
+                features.setdefault(recipe_id, set()).add(self._feature(position, object_id))
+
+        for recipe_id, recipe_features in features.items():
+            self._set(recipe_id, recipe_features)
+
+    def _feature(self, position, object_id):
+        return object_id * len(self.relations) + position
+
+    def _reset(self):
+        pass
+
+    def _set(self, recipe_id, features):
+        self._remove(recipe_id)
+        self.recipes[recipe_id] = features
+        for feature in features:
+            self.postings[feature].add(recipe_id)
+
+    def _remove(self, recipe_id):
+        features = self.recipes.pop(recipe_id, None)
+        if features is not None:
+            for feature in features:
+                self.postings[feature].discard(recipe_id)
+        return features
+
+
+class PantryIndex(RecipeIndex):
+    relations = [("ingredients", models.ChangeLog.INGREDIENT)]
+
+    def __init__(self, user_id):
+        super().__init__(user_id)
+        self._reset()
+
+    def _reset(self):
+        self.by_size = defaultdict(set)
+
+    def _set(self, recipe_id, features):
+        super()._set(recipe_id, features)
+        self.by_size[len(features)].add(recipe_id)
+
+    def _remove(self, recipe_id):
+        features = super()._remove(recipe_id)
+        if features is not None:
+            self.by_size[len(features)].discard(recipe_id)
+        return features
+
+    def match(self, pantry, max_missing=0):
+        pantry = set(pantry)
+        have = Counter()
+        for ingredient_id in pantry:
+            have.update(self.postings.get(ingredient_id, ()))
+
+        matches = []
+        for recipe_id, count in have.items():
+            if len(self.recipes[recipe_id]) - count <= max_missing:
+                matches.append(recipe_id)
+        for size in range(max_missing + 1):
+            matches.extend(recipe_id for recipe_id in self.by_size.get(size, ()) if recipe_id not in have)
+
+        return {recipe_id: self.recipes[recipe_id] - pantry for recipe_id in matches}
+
+
+class SimilarityIndex(RecipeIndex):
+    relations = [("tags", models.ChangeLog.TAG), ("ingredients", models.ChangeLog.INGREDIENT)]
+
+    def __init__(self, user_id):
+        _load_numpy()
+        super().__init__(user_id)
+        self._reset()
+
+    def _reset(self):
+        self.rows = {}
+        self.row_ids = []
+        self.sizes = np.zeros(0, dtype=np.float64)
+        self.arrays = {}
+        self.results = {}
+
+    def _set(self, recipe_id, features):
+        super()._set(recipe_id, features)
+        row = self.rows.get(recipe_id)
+        if row is None:
+            row = self.rows[recipe_id] = len(self.row_ids)
+            self.row_ids.append(recipe_id)
+            if row >= len(self.sizes):
+                self.sizes = np.concatenate([self.sizes, np.zeros(max(row, 1024))])
+        self.sizes[row] = len(features)
+        self._invalidate(features)
+
+    def _remove(self, recipe_id):
+        features = super()._remove(recipe_id)
+        if features is not None:
+            self.sizes[self.rows[recipe_id]] = 0
+            self._invalidate(features)
+        return features
+
+    def _invalidate(self, features):
+        self.results.clear()
+        for feature in features:
+            self.arrays.pop(feature, None)
+
+    def _rows(self, feature):
+        rows = self.arrays.get(feature)
+        if rows is None:
+            rows = self.arrays[feature] = np.fromiter(
+                (self.rows[recipe_id] for recipe_id in self.postings[feature]),
+                dtype=np.int64
+            )
+        return rows
+
+    def similar(self, recipe_id, k=10, metric="jaccard"):
+        key = (recipe_id, k, metric)
+        if key not in self.results:
+            if len(self.results) >= settings.SIMILAR_RESULT_CACHE_SIZE:
+                self.results.clear()
+            self.results[key] = self._score(recipe_id, k, metric)
+        return self.results[key]
+
+    def _score(self, recipe_id, k, metric):
+        features = self.recipes.get(recipe_id)
+        if not features:
+            return []
+
+        rows = np.concatenate([self._rows(feature) for feature in features])
+        overlap = np.bincount(rows, minlength=len(self.row_ids)).astype(np.float64)
+        overlap[self.rows[recipe_id]] = 0
+        candidates = np.flatnonzero(overlap)
+        if not len(candidates):
+            return []
+
+        shared = overlap[candidates]
+        sizes = self.sizes[candidates]
+        if metric == "cosine":
+            scores = shared / np.sqrt(len(features) * sizes)
+        else:
+            scores = shared / (len(features) + sizes - shared)
+
+        top = candidates.size if candidates.size <= k else k
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.lexsort((candidates[best], -scores[best]))]
+        return [(self.row_ids[candidates[i]], float(scores[i])) for i in best]
+
+
+def cookable(user_id, pantry, max_missing=0):
+    index = PantryIndex.get(user_id)
+    with index.lock:
+        index.refresh()
+        return index.match(pantry, max_missing)
+
+
+def similar(user_id, recipe_id, k=10, metric="jaccard"):
+    index = SimilarityIndex.get(user_id)
+    with index.lock:
+        index.refresh()
+        return index.similar(recipe_id, k, metric)
@@ -0,0 +1,82 @@
+import base64
+import json
+from decimal import Decimal
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+from django.utils.translation import gettext as _
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    # Seeks past the last row of the previous page on the full ordering key
+    # instead of using OFFSET, so every page is a range scan on the matching
+    # (user, field, id) index. Opt-in with ?limit=, otherwise the whole list
+    # is returned as before.
+    limit_query_param = "limit"
+    cursor_query_param = "cursor"
+    max_limit = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        try:
+            self.limit = min(int(request.query_params[self.limit_query_param]), self.max_limit)
+        except (KeyError, ValueError):
+            return None
+        if self.limit < 1:
+            return None
+
+        self.request = request
+        self.ordering = list(queryset.query.order_by)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self._after(self._decode(cursor, queryset.model)))
+
+        page = list(queryset[:self.limit + 1])
+        self.has_next = len(page) > self.limit
+        page = page[:self.limit]
+        self.last = page[-1] if page else None
+        return page
+
+    def _after(self, values):
+        condition = Q()
+        for position, key in enumerate(self.ordering):
+            field = key.lstrip("-")
+            step = Q(**{f"{field}__{'lt' if key.startswith('-') else 'gt'}": values[position]})
+            for previous, value in zip(self.ordering[:position], values):
+                step &= Q(**{previous.lstrip("-"): value})
+            condition |= step
+        return condition
+
+    def _encode(self, obj):
+        values = [getattr(obj, key.lstrip("-")) for key in self.ordering]
+        raw = json.dumps([str(value) if isinstance(value, Decimal) else value for value in values])
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def _decode(self, cursor, model):
+        # Each value is converted by its ordering field, so a tampered cursor
+        # is rejected here rather than failing in the query
+        invalid = ValidationError({self.cursor_query_param: [_("Invalid cursor.")]})
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise invalid
+            values = [
+                model._meta.get_field(key.lstrip("-")).to_python(value)
+                for key, value in zip(self.ordering, values)
+            ]
+        except (ValueError, TypeError, DjangoValidationError, FieldDoesNotExist):
+            raise invalid
+        if None in values:
+            raise invalid
+        return values
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self._encode(self.last))
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
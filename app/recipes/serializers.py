@@ -1,19 +1,39 @@
+from django.utils.translation import gettext as _
 from rest_framework import serializers
-from core import models
+from django.db.models.functions import Lower, Trim
+from core import models, imports, merge
+from . import images
 
 
-class TagSerializer(serializers.ModelSerializer):
+class RecipeAttrSerializer(serializers.ModelSerializer):
+    def validate_name(self, value):
+        request = self.context.get("request")
+        if request is None:
+            return value
+
+        existing = self.Meta.model.objects.annotate(key=Lower(Trim("name"))).filter(
+            user=request.user,
+            key=merge.name_key(value)
+        )
+        if self.instance is not None:
+            existing = existing.exclude(pk=self.instance.pk)
+        if existing.exists():
+            raise serializers.ValidationError(_("You already have one with this name."))
+        return value
+
+
+class TagSerializer(RecipeAttrSerializer):
     class Meta:
         model = models.Tag
-        fields = ["id", "name"]
-        read_only_fields = ["id"]
+        fields = ["id", "name", "recipe_count"]
+        read_only_fields = ["id", "recipe_count"]
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(RecipeAttrSerializer):
     class Meta:
         model = models.Ingredient
-        fields = ["id", "name"]
-        read_only_fields = ["id"]
+        fields = ["id", "name", "recipe_count"]
+        read_only_fields = ["id", "recipe_count"]
 
 
 class RecipeSerializer(serializers.ModelSerializer):
@@ -35,6 +55,16 @@ class RecipeSerializer(serializers.ModelSerializer):
 class RecipeDetailSerializer(RecipeSerializer):
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
+    srcset = serializers.SerializerMethodField()
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ["srcset"]
+
+    def get_srcset(self, recipe):
+        if not recipe.image:
+            return None
+        request = self.context.get("request")
+        return images.srcset(recipe, request.build_absolute_uri if request else None)
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
@@ -42,3 +72,134 @@ class RecipeImageSerializer(serializers.ModelSerializer):
         model = models.Recipe
         fields = ["id", "image"]
         read_only_fields = ["id"]
+
+
+class RecipeCloneSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=100
+    )
+
+    def validate(self, attrs):
+        ids = set(attrs["ids"])
+        recipes = list(models.Recipe.objects.filter(
+            user=self.context["request"].user,
+            id__in=ids
+        ))
+
+        if len(recipes) != len(ids):
+            msg = _("Some of the provided recipes do not exist.")
+            raise serializers.ValidationError({"ids": msg}, code="not_found")
+
+        attrs["recipes"] = recipes
+        return attrs
+
+
+class BulkDeleteSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=10000
+    )
+
+
+class IdListField(serializers.CharField):
+    def __init__(self, max_ids=None, **kwargs):
+        self.max_ids = max_ids
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        try:
+            ids = sorted({int(object_id) for object_id in super().to_internal_value(data).split(",") if object_id})
+        except ValueError:
+            raise serializers.ValidationError(_("Provide a comma separated list of ids."))
+
+        if not ids:
+            raise serializers.ValidationError(_("Provide at least one id."))
+        if self.max_ids and len(ids) > self.max_ids:
+            raise serializers.ValidationError(_("Provide at most %(count)s ids.") % {"count": self.max_ids})
+        return ids
+
+
+class CookableSerializer(serializers.Serializer):
+    ingredients = IdListField()
+    missing = serializers.IntegerField(min_value=0, max_value=3, default=0)
+
+
+class SimilarSerializer(serializers.Serializer):
+    k = serializers.IntegerField(min_value=1, max_value=50, default=10)
+    metric = serializers.ChoiceField(choices=["jaccard", "cosine"], default="jaccard")
+
+
+class ShoppingListQuerySerializer(serializers.Serializer):
+    ids = IdListField(max_ids=100)
+
+
+class ShoppingListItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField(source="ingredient_id")
+    name = serializers.CharField(source="ingredient__name")
+    count = serializers.IntegerField()
+    recipes = serializers.ListField(child=serializers.IntegerField())
+
+
+class RecipeImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=imports.FORMATS, required=False)
+
+    def validate(self, attrs):
+        attrs["format"] = attrs.get("format") or imports.detect_format(attrs["file"].name)
+        if not attrs["format"]:
+            raise serializers.ValidationError({"format": [_("Could not detect the file format.")]})
+        return attrs
+
+
+class MergeSerializer(serializers.Serializer):
+    target = serializers.IntegerField()
+    sources = serializers.ListField(child=serializers.IntegerField(), min_length=1, max_length=100)
+
+    def validate(self, attrs):
+        queryset = self.context["queryset"]
+        ids = set(attrs["sources"]) | {attrs["target"]}
+        found = {obj.id: obj for obj in queryset.filter(id__in=ids)}
+        if set(found) != ids:
+            raise serializers.ValidationError(_("Unknown ids: %(ids)s") % {"ids": sorted(ids - set(found))})
+
+        attrs["target"] = found[attrs["target"]]
+        attrs["sources"] = sorted(ids - {attrs["target"].id})
+        if not attrs["sources"]:
+            raise serializers.ValidationError({"sources": [_("Provide at least one id other than target.")]})
+        return attrs
+
+
+class RecipeListQuerySerializer(serializers.Serializer):
+    ORDERING_FIELDS = ["price", "time_minutes", "id"]
+    EXPANDABLE = {"tags": TagSerializer, "ingredients": IngredientSerializer}
+
+    min_price = serializers.DecimalField(max_digits=5, decimal_places=2, required=False)
+    max_price = serializers.DecimalField(max_digits=5, decimal_places=2, required=False)
+    max_time = serializers.IntegerField(min_value=0, required=False)
+    ordering = serializers.CharField(required=False)
+    expand = serializers.CharField(required=False)
+
+    def validate_expand(self, value):
+        fields = [field.strip() for field in value.split(",") if field.strip()]
+        if not fields or any(field not in self.EXPANDABLE for field in fields):
+            raise serializers.ValidationError(
+                _("Use a comma-separated list of %(fields)s.") % {"fields": ", ".join(self.EXPANDABLE)}
+            )
+        return list(dict.fromkeys(fields))
+
+    def validate_ordering(self, value):
+        keys = [key.strip() for key in value.split(",") if key.strip()]
+        fields = [key.lstrip("-") for key in keys]
+        if not keys or any(field not in self.ORDERING_FIELDS for field in fields) or len(set(fields)) != len(fields):
+            raise serializers.ValidationError(
+                _("Use a comma-separated list of %(fields)s, each optionally prefixed with -.")
+                % {"fields": ", ".join(self.ORDERING_FIELDS)}
+            )
+        # Ties are broken by id in the direction of the first key, which is
+        # the order the (user, field, id) index is read in.
+        if "id" not in fields:
+            keys.append("-id" if keys[0].startswith("-") else "id")
+        return keys
@@ -0,0 +1,51 @@
+import base64
+import binascii
+from django.conf import settings
+from core import models
+from . import serializers
+
+KINDS = [
+    (models.ChangeLog.RECIPE, "recipes", models.Recipe, serializers.RecipeSerializer),
+    (models.ChangeLog.TAG, "tags", models.Tag, serializers.TagSerializer),
+    (models.ChangeLog.INGREDIENT, "ingredients", models.Ingredient, serializers.IngredientSerializer),
+]
+
+
+def encode_watermark(seq):
+    return base64.urlsafe_b64encode(str(seq).encode()).decode().rstrip("=")
+
+
+def decode_watermark(token):
+    if not token:
+        return 0
+    try:
+        seq = int(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid sync token.")
+    if seq < 0:
+        raise ValueError("Invalid sync token.")
+    return seq
+
+
+def changes_since(user, since, limit=None):
+    limit = limit or settings.SYNC_PAGE_SIZE
+    changes = list(
+        models.ChangeLog.objects.filter(user=user, seq__gt=since)
+        .order_by("seq")
+        .values_list("kind", "object_id", "deleted", "seq")[:limit + 1]
+    )
+    more = len(changes) > limit
+    changes = changes[:limit]
+
+    payload = {"deleted": {}}
+    for kind, key, model, serializer_class in KINDS:
+        updated = [object_id for k, object_id, deleted, _ in changes if k == kind and not deleted]
+        queryset = model.objects.filter(user=user, id__in=updated).order_by("id")
+        if model is models.Recipe:
+            queryset = queryset.prefetch_related("tags", "ingredients")
+        payload[key] = serializer_class(queryset if updated else [], many=True).data
+        payload["deleted"][key] = [object_id for k, object_id, deleted, _ in changes if k == kind and deleted]
+
+    payload["next"] = encode_watermark(changes[-1][3] if changes else since)
+    payload["more"] = more
+    return payload
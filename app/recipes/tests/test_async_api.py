@@ -0,0 +1,138 @@
+import json
+from unittest.mock import patch
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, AsyncRequestFactory, override_settings
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from core import routers
+from core.models import Recipe, Tag, Ingredient
+from recipes import async_views
+from recipes.serializers import RecipeSerializer, RecipeDetailSerializer, TagSerializer
+
+
+def rates(**overrides):
+    return {**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {
+        **settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"],
+        **overrides
+    }}
+
+
+class AsyncReadApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="ehsanadmin@gmail.com",
+            password="some-password"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.factory = AsyncRequestFactory()
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title="some-title",
+            time_minutes=5,
+            price=4.99
+        )
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name="tag"))
+        self.recipe.ingredients.add(Ingredient.objects.create(user=self.user, name="ingredient"))
+        self.recipe.refresh_from_db()
+        self.list_data = json.loads(json.dumps(RecipeSerializer([self.recipe], many=True).data))
+        self.detail_data = json.loads(json.dumps(RecipeDetailSerializer(self.recipe).data))
+        self.tags_data = TagSerializer(Tag.objects.all(), many=True).data
+
+    def get(self):
+        return self.factory.get("/", headers={"Authorization": f"Token {self.token.key}"})
+
+    async def test_login_required(self):
+        res = await async_views.recipe_list(AsyncRequestFactory().get("/"))
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res["WWW-Authenticate"], "Token")
+
+    async def test_invalid_token(self):
+        request = AsyncRequestFactory().get("/", headers={"Authorization": "Token wrong"})
+        res = await async_views.recipe_list(request)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(json.loads(res.content), {"detail": "Invalid token."})
+
+    async def test_recipe_list(self):
+        res = await async_views.recipe_list(self.get())
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(res.content), self.list_data)
+
+    async def test_recipe_detail(self):
+        res = await async_views.recipe_detail(self.get(), pk=self.recipe.id)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(res.content), self.detail_data)
+
+    async def test_recipe_detail_limited_to_user(self):
+        res = await async_views.recipe_detail(self.get(), pk=self.recipe.id + 1)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_tag_list(self):
+        res = await async_views.tag_list(self.get())
+
+        self.assertEqual(json.loads(res.content), self.tags_data)
+
+    @override_settings(REST_FRAMEWORK=rates(recipes="1/min"))
+    async def test_reads_are_throttled(self):
+        await async_views.recipe_list(self.get())
+        res = await async_views.recipe_detail(self.get(), pk=self.recipe.id)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res["Retry-After"], "60")
+        self.assertEqual((await async_views.tag_list(self.get())).status_code, status.HTTP_200_OK)
+
+    @override_settings(REST_FRAMEWORK=rates(user="1/min"))
+    async def test_user_budget_covers_async_reads(self):
+        await async_views.tag_list(self.get())
+        res = await async_views.ingredient_list(self.get())
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    async def test_recipe_reads_are_coalesced(self):
+        await async_views.recipe_list(self.get())
+        # A queryset update leaves change_seq alone, so the entry still applies
+        await Recipe.objects.filter(pk=self.recipe.id).aupdate(title="changed")
+        res = await async_views.recipe_list(self.get())
+
+        self.assertEqual(json.loads(res.content), self.list_data)
+
+    async def test_coalesced_reads_see_own_writes(self):
+        await async_views.recipe_list(self.get())
+        await Recipe.objects.acreate(user=self.user, title="Soup", time_minutes=10, price="3.50")
+        res = await async_views.recipe_list(self.get())
+
+        self.assertEqual([recipe["title"] for recipe in json.loads(res.content)], ["Soup", "some-title"])
+
+    @override_settings(DATABASE_REPLICAS=["replica"])
+    @patch("core.routers.choose_replica", return_value="default")
+    async def test_reads_use_replica_unless_pinned(self, choose_replica):
+        await async_views.tag_list(self.get())
+        self.assertTrue(choose_replica.called)
+        self.assertFalse(routers.reading_from_replica())
+
+        choose_replica.reset_mock()
+        routers.pin_to_primary(self.user.id)
+        await async_views.tag_list(self.get())
+
+        self.assertFalse(choose_replica.called)
+
+    async def test_writes_use_sync_view(self):
+        calls = []
+
+        def sync_view(request):
+            calls.append(request.method)
+            return HttpResponse(status=status.HTTP_201_CREATED)
+
+        view = async_views.read_path(async_views.recipe_list, sync_view)
+        res = await view(self.factory.post("/"))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(calls, ["POST"])
@@ -1,16 +1,34 @@
-from django.test import TestCase
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.core.cache import cache
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
-from core.models import Recipe, Tag, Ingredient
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from core.models import Job, Recipe, Tag, Ingredient
 from recipes.serializers import RecipeSerializer, RecipeDetailSerializer
 import tempfile
+import base64
+import io
+import json
+import msgpack
 import os
+import shutil
 from PIL import Image
 from decimal import Decimal
+from unittest.mock import patch
+from core import deletion, jobs
+from recipes import images, indexes
 
 RECIPES_URL = reverse("recipe:recipe-list")
+CLONE_URL = reverse("recipe:recipe-clone")
+IMPORT_URL = reverse("recipe:recipe-import")
+BULK_DELETE_URL = reverse("recipe:recipe-bulk-delete")
+COOKABLE_URL = reverse("recipe:recipe-cookable")
+SHOPPING_LIST_URL = reverse("recipe:recipe-shopping-list")
 
 
 def image_upload_url(recipe_id):
@@ -53,6 +71,7 @@ class PublicRecipesApiTests(TestCase):
 
 class PrivateRecipesApiTests(TestCase):
     def setUp(self):
+        cache.clear()
         self.user = get_user_model().objects.create_user(
             email="ehsanadmin@gmail.com",
             password="some-password"
@@ -172,8 +191,540 @@ class PrivateRecipesApiTests(TestCase):
         self.assertEqual(tags.count(), 0)
 
 
+class RecipeListQueryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="ehsanadmin@gmail.com",
+            password="some-password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.cheap = sample_recipe(user=self.user, title="cheap", price=Decimal("2.00"), time_minutes=30)
+        self.quick = sample_recipe(user=self.user, title="quick", price=Decimal("5.00"), time_minutes=5)
+        self.slow = sample_recipe(user=self.user, title="slow", price=Decimal("5.00"), time_minutes=90)
+        self.fancy = sample_recipe(user=self.user, title="fancy", price=Decimal("40.00"), time_minutes=60)
+
+    def ids(self, res):
+        return [recipe["id"] for recipe in res.data]
+
+    def test_filter_by_price_and_time(self):
+        res = self.client.get(RECIPES_URL, {"min_price": "3", "max_price": "10", "max_time": "60"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.ids(res), [self.quick.id])
+
+    def test_multi_key_ordering(self):
+        res = self.client.get(RECIPES_URL, {"ordering": "price,-time_minutes"})
+
+        self.assertEqual(self.ids(res), [self.cheap.id, self.slow.id, self.quick.id, self.fancy.id])
+
+    def test_invalid_ordering(self):
+        for ordering in ("title", "price,-price", ","):
+            res = self.client.get(RECIPES_URL, {"ordering": ordering})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_keyset_pages(self):
+        seen = []
+        url, params = RECIPES_URL, {"ordering": "-price", "limit": 1}
+        while url:
+            res = self.client.get(url, params)
+            self.assertEqual(len(res.data["results"]), 1)
+            seen += [recipe["id"] for recipe in res.data["results"]]
+            url, params = res.data["next"], None
+
+        self.assertEqual(seen, [self.fancy.id, self.slow.id, self.quick.id, self.cheap.id])
+
+    def test_invalid_cursor(self):
+        res = self.client.get(RECIPES_URL, {"limit": 1, "cursor": "not-a-cursor"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("cursor", res.data)
+
+    def test_cursor_values_must_match_ordering_types(self):
+        cursors = [
+            ({}, ["abc"]),
+            ({}, [None]),
+            ({}, [{"x": 1}]),
+            ({"ordering": "price"}, ["x", 1]),
+        ]
+        for params, values in cursors:
+            cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+            res = self.client.get(RECIPES_URL, {"limit": 1, "cursor": cursor, **params})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, values)
+
+    def test_expand_side_loads_distinct_objects(self):
+        vegan = sample_tag(user=self.user, name="vegan")
+        salt = sample_ingredient(user=self.user, name="salt")
+        for recipe in (self.cheap, self.quick, self.slow):
+            recipe.tags.add(vegan)
+            recipe.ingredients.add(salt)
+        res = self.client.get(RECIPES_URL, {"expand": "tags,ingredients", "ordering": "price"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"][0]["tags"], [vegan.id])
+        self.assertEqual(res.data["results"][3]["tags"], [])
+        self.assertEqual(
+            res.data["included"]["tags"],
+            {str(vegan.id): {"id": vegan.id, "name": "vegan", "recipe_count": 3}}
+        )
+        self.assertEqual(list(res.data["included"]["ingredients"]), [str(salt.id)])
+
+    def test_expand_queries_do_not_grow_with_recipes(self):
+        tag = sample_tag(user=self.user)
+        for recipe in (self.cheap, self.quick, self.slow, self.fancy):
+            recipe.tags.add(tag)
+            recipe.ingredients.add(sample_ingredient(user=self.user, name=recipe.title))
+
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(RECIPES_URL, {"expand": "tags,ingredients", "limit": 2})
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(RECIPES_URL, {"expand": "tags,ingredients", "limit": 4})
+
+        self.assertEqual(len(few), len(many))
+
+    def test_expand_with_keyset_pages(self):
+        res = self.client.get(RECIPES_URL, {"expand": "tags", "limit": 1})
+
+        self.assertIsNotNone(res.data["next"])
+        self.assertEqual(res.data["included"], {"tags": {}})
+
+    def test_invalid_expand(self):
+        res = self.client.get(RECIPES_URL, {"expand": "user"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeMessagePackTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="ehsanadmin@gmail.com",
+            password="some-password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_round_trips_recipe_serializer(self):
+        recipe = sample_recipe(user=self.user, price=Decimal("12.50"))
+        recipe.tags.add(sample_tag(user=self.user))
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT="application/msgpack")
+
+        self.assertEqual(res["Content-Type"], "application/msgpack")
+        data = msgpack.unpackb(res.content, raw=False)
+        serializer = RecipeSerializer(Recipe.objects.all(), many=True)
+        self.assertEqual(data, json.loads(json.dumps(serializer.data)))
+        self.assertEqual(data[0]["price"], "12.50")
+
+    def test_detail_round_trips_image_urls(self):
+        recipe = sample_recipe(user=self.user)
+        recipe.ingredients.add(sample_ingredient(user=self.user))
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as ntf:
+            Image.new("RGB", (400, 200)).save(ntf, format="JPEG")
+            ntf.seek(0)
+            upload = self.client.post(
+                image_upload_url(recipe.id),
+                {"image": ntf},
+                format="multipart",
+                HTTP_ACCEPT="application/msgpack"
+            )
+        self.addCleanup(lambda: Recipe.objects.get(pk=recipe.id).image.delete())
+
+        packed = self.client.get(detail_url(recipe.id), HTTP_ACCEPT="application/msgpack")
+        plain = self.client.get(detail_url(recipe.id), HTTP_ACCEPT="application/json")
+
+        image = msgpack.unpackb(upload.content, raw=False)["image"]
+        data = msgpack.unpackb(packed.content, raw=False)
+        self.assertTrue(image.startswith("http://testserver/"))
+        self.assertEqual(data, json.loads(plain.content))
+        self.assertTrue(data["srcset"].startswith("http://testserver/"))
+        self.assertEqual(data["srcset"], RecipeDetailSerializer(
+            Recipe.objects.get(pk=recipe.id), context={"request": packed.wsgi_request}
+        ).data["srcset"])
+
+    def test_create_recipe_from_msgpack(self):
+        tag = sample_tag(user=self.user)
+        payload = {"title": "Cake", "time_minutes": 30, "price": "5.25", "tags": [tag.id], "ingredients": []}
+        res = self.client.post(
+            RECIPES_URL,
+            msgpack.packb(payload, use_bin_type=True),
+            content_type="application/msgpack",
+            HTTP_ACCEPT="application/msgpack"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(pk=msgpack.unpackb(res.content, raw=False)["id"])
+        self.assertEqual(recipe.price, Decimal("5.25"))
+        self.assertEqual(list(recipe.tags.all()), [tag])
+
+    def test_malformed_msgpack_rejected(self):
+        res = self.client.post(RECIPES_URL, b"\xc1", content_type="application/msgpack")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeCloneTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="ehsanadmin@gmail.com",
+            password="some-password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_clone_recipe(self):
+        recipe = sample_recipe(user=self.user, title="Pasta", link="http://a.b")
+        tag = sample_tag(user=self.user)
+        ingredient = sample_ingredient(user=self.user)
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+
+        res = self.client.post(CLONE_URL, {"ids": [recipe.id]}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 1)
+        clone = Recipe.objects.get(id=res.data[0]["id"])
+        self.assertNotEqual(clone.id, recipe.id)
+        self.assertEqual(clone.user, self.user)
+        self.assertEqual(clone.title, recipe.title)
+        self.assertEqual(clone.link, recipe.link)
+        self.assertEqual(list(clone.tags.all()), [tag])
+        self.assertEqual(list(clone.ingredients.all()), [ingredient])
+        self.assertEqual(recipe.tags.count(), 1)
+        tag.refresh_from_db()
+        ingredient.refresh_from_db()
+        self.assertEqual((tag.recipe_count, ingredient.recipe_count), (2, 2))
+
+    def test_clone_many_recipes_in_constant_queries(self):
+        tag = sample_tag(user=self.user)
+        recipes = [sample_recipe(user=self.user, title=f"r{i}") for i in range(6)]
+        for recipe in recipes:
+            recipe.tags.add(tag)
+
+        with CaptureQueriesContext(connection) as single:
+            self.client.post(CLONE_URL, {"ids": [recipes[0].id]}, format="json")
+        with CaptureQueriesContext(connection) as batch:
+            res = self.client.post(
+                CLONE_URL,
+                {"ids": [recipe.id for recipe in recipes[1:]]},
+                format="json"
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(single), len(batch))
+        self.assertEqual(
+            sorted(recipe["title"] for recipe in res.data),
+            [f"r{i}" for i in range(1, 6)]
+        )
+        self.assertEqual(tag.recipes.count(), 12)
+
+    def test_clone_other_users_recipe_fails(self):
+        user2 = get_user_model().objects.create_user(
+            email="user2@gmail.com",
+            password="some-password"
+        )
+        recipe = sample_recipe(user=user2)
+
+        res = self.client.post(CLONE_URL, {"ids": [recipe.id]}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Recipe.objects.count(), 1)
+
+
+class RecipeBulkDeleteTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="ehsanadmin@gmail.com",
+            password="some-password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_delete_recipes(self):
+        tag = sample_tag(user=self.user)
+        recipes = [sample_recipe(user=self.user) for _ in range(3)]
+        for recipe in recipes:
+            recipe.tags.add(tag)
+
+        res = self.client.delete(
+            BULK_DELETE_URL,
+            {"ids": [recipes[0].id, recipes[1].id]},
+            format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["deleted"], 2)
+        self.assertEqual(list(Recipe.objects.all()), [recipes[2]])
+        self.assertEqual(Recipe.tags.through.objects.count(), 1)
+        self.assertTrue(Tag.objects.filter(id=tag.id).exists())
+
+    def test_bulk_delete_limited_to_user(self):
+        user2 = get_user_model().objects.create_user(
+            email="user2@gmail.com",
+            password="some-password"
+        )
+        recipe = sample_recipe(user=user2)
+
+        res = self.client.delete(BULK_DELETE_URL, {"ids": [recipe.id]}, format="json")
+
+        self.assertEqual(res.data["deleted"], 0)
+        self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
+
+    def test_bulk_delete_in_background(self):
+        recipe = sample_recipe(user=self.user)
+
+        res = self.client.delete(
+            BULK_DELETE_URL + "?background=true",
+            {"ids": [recipe.id]},
+            format="json"
+        )
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        status_url = reverse("recipe:recipe-bulk-delete-status", args=[res.data["job"]])
+        self.assertEqual(self.client.get(status_url).data["status"], "pending")
+
+        jobs.Worker().run(burst=True)
+        res = self.client.get(status_url)
+
+        self.assertEqual(res.data, {"status": "done", "deleted": 1})
+        self.assertFalse(Recipe.objects.filter(id=recipe.id).exists())
+
+
+class RecipeImportTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="ehsanadmin@gmail.com",
+            password="some-password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_import_ndjson_in_background(self):
+        sample_tag(user=self.user, name="Vegan")
+        lines = [
+            {"title": "Salad", "time_minutes": 5, "price": "4.50", "tags": ["Vegan", "Quick"], "ingredients": ["Kale"]},
+            {"title": "", "time_minutes": 5, "price": "1.00"},
+            {"title": "Soup", "time_minutes": "ten", "price": "1.00"},
+            {"title": "Stew", "time_minutes": 90, "price": "12", "tags": ["Vegan"]},
+        ]
+        upload = io.BytesIO("\n".join(json.dumps(line) for line in lines).encode())
+        upload.name = "recipes.ndjson"
+
+        res = self.client.post(IMPORT_URL, {"file": upload}, format="multipart")
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        jobs.Worker().run(burst=True)
+        res = self.client.get(reverse("recipe:recipe-import-status", args=[res.data["job"]]))
+
+        self.assertEqual(res.data["status"], "done")
+        self.assertEqual(res.data["imported"], 2)
+        self.assertEqual([row["line"] for row in res.data["rejected"]], [2, 3])
+        stew = Recipe.objects.get(title="Stew")
+        self.assertEqual(stew.price, Decimal("12"))
+        self.assertEqual([tag.name for tag in stew.tags.all()], ["Vegan"])
+        self.assertEqual(Tag.objects.get(name="Vegan").recipe_count, 2)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_import_unknown_format(self):
+        upload = io.BytesIO(b"title")
+        upload.name = "recipes.txt"
+
+        res = self.client.post(IMPORT_URL, {"file": upload}, format="multipart")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeCookableTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="ehsanadmin@gmail.com",
+            password="some-password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        indexes.RecipeIndex.clear()
+        self.salt = sample_ingredient(user=self.user, name="salt")
+        self.egg = sample_ingredient(user=self.user, name="egg")
+        self.flour = sample_ingredient(user=self.user, name="flour")
+        self.omelette = sample_recipe(user=self.user, title="omelette")
+        self.omelette.ingredients.add(self.salt, self.egg)
+        self.bread = sample_recipe(user=self.user, title="bread")
+        self.bread.ingredients.add(self.salt, self.flour)
+
+    def cookable(self, ingredients, missing=0):
+        return self.client.get(COOKABLE_URL, {
+            "ingredients": ",".join(str(i.id) for i in ingredients),
+            "missing": missing
+        })
+
+    def test_recipes_fully_covered(self):
+        res = self.cookable([self.salt, self.egg])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r["title"] for r in res.data], ["omelette"])
+        self.assertEqual(res.data[0]["missing"], [])
+
+    def test_recipes_with_missing_ingredients(self):
+        res = self.cookable([self.salt], missing=1)
+
+        self.assertEqual([r["title"] for r in res.data], ["bread", "omelette"])
+        self.assertEqual(res.data[0]["missing"], [self.flour.id])
+
+    def test_index_follows_recipe_writes(self):
+        self.cookable([self.salt, self.egg])
+
+        self.bread.ingredients.remove(self.flour)
+        self.omelette.delete()
+        deletion.delete_in_batches(Ingredient.objects.filter(id=self.egg.id))
+        res = self.cookable([self.salt])
+
+        self.assertEqual([r["title"] for r in res.data], ["bread"])
+        self.assertEqual(
+            indexes.PantryIndex.get(self.user.id).recipes,
+            {self.bread.id: {self.salt.id}}
+        )
+
+    def test_invalid_ingredients(self):
+        res = self.client.get(COOKABLE_URL, {"ingredients": "salt"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeSimilarTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="ehsanadmin@gmail.com",
+            password="some-password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        indexes.RecipeIndex.clear()
+        self.vegan = sample_tag(user=self.user, name="vegan")
+        self.salt = sample_ingredient(user=self.user, name="salt")
+        self.egg = sample_ingredient(user=self.user, name="egg")
+        self.recipe = sample_recipe(user=self.user, title="base")
+        self.recipe.tags.add(self.vegan)
+        self.recipe.ingredients.add(self.salt, self.egg)
+
+    def similar(self, recipe, **params):
+        return self.client.get(reverse("recipe:recipe-similar", args=[recipe.id]), params)
+
+    def test_similar_recipes_ranked_by_overlap(self):
+        close = sample_recipe(user=self.user, title="close")
+        close.tags.add(self.vegan)
+        close.ingredients.add(self.salt, self.egg)
+        far = sample_recipe(user=self.user, title="far")
+        far.ingredients.add(self.salt)
+        sample_recipe(user=self.user, title="unrelated")
+
+        res = self.similar(self.recipe)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r["title"] for r in res.data], ["close", "far"])
+        self.assertEqual(res.data[0]["score"], 1.0)
+        self.assertEqual(res.data[1]["score"], round(1 / 3, 4))
+
+    def test_similar_cosine_and_k(self):
+        for title in ("a", "b", "c"):
+            sample_recipe(user=self.user, title=title).ingredients.add(self.salt)
+
+        res = self.similar(self.recipe, k=2, metric="cosine")
+
+        self.assertEqual(len(res.data), 2)
+        self.assertEqual(res.data[0]["score"], round(1 / 3 ** 0.5, 4))
+
+    def test_similar_follows_writes(self):
+        other = sample_recipe(user=self.user, title="other")
+        other.ingredients.add(self.salt)
+        self.assertEqual(len(self.similar(self.recipe).data), 1)
+
+        other.ingredients.clear()
+        res = self.similar(self.recipe)
+
+        self.assertEqual(res.data, [])
+
+    def test_similar_limited_to_user(self):
+        user2 = get_user_model().objects.create_user(
+            email="user2@gmail.com",
+            password="some-password"
+        )
+        recipe = sample_recipe(user=user2)
+
+        res = self.similar(recipe)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class RecipeShoppingListTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="ehsanadmin@gmail.com",
+            password="some-password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.salt = sample_ingredient(user=self.user, name="salt")
+        self.egg = sample_ingredient(user=self.user, name="egg")
+        self.omelette = sample_recipe(user=self.user, title="omelette")
+        self.omelette.ingredients.add(self.salt, self.egg)
+        self.soup = sample_recipe(user=self.user, title="soup")
+        self.soup.ingredients.add(self.salt)
+        self.user.refresh_from_db()
+
+    def shopping_list(self, *recipes):
+        return self.client.get(SHOPPING_LIST_URL, {"ids": ",".join(str(r.id) for r in recipes)})
+
+    def test_shopping_list_aggregates_ingredients(self):
+        res = self.shopping_list(self.soup, self.omelette)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [
+            {"id": self.egg.id, "name": "egg", "count": 1, "recipes": [self.omelette.id]},
+            {"id": self.salt.id, "name": "salt", "count": 2, "recipes": [self.omelette.id, self.soup.id]},
+        ])
+
+    def test_shopping_list_is_cached_until_recipes_change(self):
+        self.shopping_list(self.omelette)
+        with self.assertNumQueries(0):
+            self.shopping_list(self.omelette)
+
+        self.omelette.ingredients.remove(self.egg)
+        self.user.refresh_from_db()
+        res = self.shopping_list(self.omelette)
+
+        self.assertEqual([item["name"] for item in res.data], ["salt"])
+
+    @override_settings(DATABASE_REPLICAS=["replica"])
+    @patch("core.routers.choose_replica", return_value="default")
+    def test_shopping_list_is_keyed_on_the_replica_change_seq(self, choose_replica):
+        self.shopping_list(self.omelette)
+        # The request user keeps its stale change_seq; the replica has moved on
+        self.omelette.ingredients.remove(self.egg)
+        res = self.shopping_list(self.omelette)
+
+        self.assertEqual([item["name"] for item in res.data], ["salt"])
+
+    def test_shopping_list_limited_to_user(self):
+        user2 = get_user_model().objects.create_user(
+            email="user2@gmail.com",
+            password="some-password"
+        )
+        recipe = sample_recipe(user=user2)
+        recipe.ingredients.add(sample_ingredient(user=user2))
+
+        res = self.shopping_list(recipe)
+
+        self.assertEqual(res.data, [])
+
+    def test_shopping_list_requires_ids(self):
+        res = self.client.get(SHOPPING_LIST_URL, {"ids": ""})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class RecipeImageUploadTests(TestCase):
     def setUp(self):
+        # Image uploads share a small per-user throttle budget
+        cache.clear()
         self.user = get_user_model().objects.create_user(
             email="ehsanadmin@gmail.com",
             password="some-password"
@@ -204,4 +755,161 @@ class RecipeImageUploadTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_upload_queues_variant_rendering(self):
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as ntf:
+            Image.new("RGB", (800, 400)).save(ntf, format="JPEG")
+            ntf.seek(0)
+            self.client.post(image_upload_url(self.recipe.id), {"image": ntf}, format="multipart")
+        self.recipe.refresh_from_db()
+
+        job = Job.objects.get(name=images.render_variants.job_name)
+        jobs.Worker().run(burst=True)
+        job.refresh_from_db()
+
+        self.assertEqual((job.status, job.count), (Job.DONE, len(settings.RECIPE_IMAGE_WIDTHS)))
+        with patch("recipes.images.VariantCache._render") as render:
+            self.client.get(images.variant_url(self.recipe, 320))
+            render.assert_not_called()
+
+    def test_upload_same_image_is_deduplicated(self):
+        other = sample_recipe(user=self.user)
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as ntf:
+            Image.new("RGB", (10, 10)).save(ntf, format="JPEG")
+            for recipe in (self.recipe, other):
+                ntf.seek(0)
+                self.client.post(image_upload_url(recipe.id), {"image": ntf}, format="multipart")
+        self.recipe.refresh_from_db()
+        other.refresh_from_db()
+
+        self.assertEqual(self.recipe.image.name, other.image.name)
+        self.assertEqual(len(os.listdir(os.path.dirname(self.recipe.image.path))), 1)
+
+    def test_replaced_image_is_collected_when_unreferenced(self):
+        paths = []
+        for color in ("red", "blue"):
+            with tempfile.NamedTemporaryFile(suffix=".jpg") as ntf:
+                Image.new("RGB", (10, 10), color).save(ntf, format="JPEG")
+                ntf.seek(0)
+                self.client.post(image_upload_url(self.recipe.id), {"image": ntf}, format="multipart")
+            self.recipe.refresh_from_db()
+            paths.append(self.recipe.image.path)
+
+        self.assertNotEqual(paths[0], paths[1])
+        self.assertTrue(os.path.exists(paths[0]))
+        call_command("gc_recipe_images", min_age=-1, stdout=io.StringIO())
+        self.assertFalse(os.path.exists(paths[0]))
+        self.assertTrue(os.path.exists(paths[1]))
+
+    def _upload(self, size=(10, 10), image_format="JPEG"):
+        with tempfile.NamedTemporaryFile(suffix=f".{image_format.lower()}") as ntf:
+            noise = os.urandom(size[0] * size[1] * 3)
+            Image.frombytes("RGB", size, noise).save(ntf, format=image_format)
+            ntf.seek(0)
+            return self.client.post(
+                image_upload_url(self.recipe.id),
+                {"image": ntf},
+                format="multipart"
+            )
+
+    @override_settings(RECIPE_IMAGE_MAX_SIZE=1024)
+    def test_upload_image_too_large(self):
+        res = self._upload(size=(100, 100), image_format="PNG")
+        self.recipe.refresh_from_db()
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("smaller than", res.data["image"][0])
+        self.assertFalse(self.recipe.image)
+
+    @override_settings(RECIPE_IMAGE_MAX_SIZE=20000)
+    def test_upload_image_too_large_while_streaming(self):
+        res = self._upload(size=(100, 100), image_format="PNG")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("smaller than", res.data["image"][0])
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=50)
+    def test_upload_image_too_many_pixels(self):
+        res = self._upload()
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("dimensions", res.data["image"][0])
+
+    def test_upload_image_unsupported_format(self):
+        res = self._upload(image_format="BMP")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("BMP", res.data["image"][0])
+
+
+class RecipeImageVariantTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="ehsanadmin@gmail.com",
+            password="some-password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user)
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as ntf:
+            Image.new("RGB", (800, 400)).save(ntf, format="JPEG")
+            ntf.seek(0)
+            self.client.post(image_upload_url(self.recipe.id), {"image": ntf}, format="multipart")
+        self.recipe.refresh_from_db()
+
+    def tearDown(self):
+        self.recipe.image.delete()
+
+    def test_variant_is_resized_and_cached(self):
+        url = images.variant_url(self.recipe, 320)
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "image/webp")
+        self.assertIn("immutable", res["Cache-Control"])
+        with Image.open(io.BytesIO(b"".join(res.streaming_content))) as image:
+            self.assertEqual(image.size, (320, 160))
+
+        with patch("recipes.images.VariantCache._render") as render:
+            self.client.get(url)
+            render.assert_not_called()
+
+    def test_variant_with_stale_version_not_found(self):
+        url = reverse("recipe-image-variant", args=[self.recipe.id])
+        res = self.client.get(url, {"w": 320, "fmt": "webp", "v": "stale"})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_variant_width_must_be_allowed(self):
+        url = images.variant_url(self.recipe, 333)
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_detail_exposes_srcset(self):
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertIn(images.variant_url(self.recipe, 320) + " 320w", res.data["srcset"])
+
+    def test_variant_cache_evicts_least_recently_used(self):
+        cache = images.VariantCache(max_bytes=1)
+        first = cache.get(self.recipe, 160, "png")
+        second = cache.get(self.recipe, 320, "png")
+
+        self.assertFalse(os.path.exists(first))
+        self.assertTrue(os.path.exists(second))
+
+    def test_variant_evicted_before_open_is_rendered_again(self):
+        variants = images.VariantCache()
+        evicted = os.path.join(variants.root, "evicted.png")
+        rendered = variants.get(self.recipe, 160, "png")
+        with patch.object(variants, "get", side_effect=[evicted, rendered]):
+            with variants.open_variant(self.recipe, 160, "png") as fileobj:
+                self.assertEqual(fileobj.name, rendered)
+
+    def test_variant_of_missing_source_not_found(self):
+        shutil.rmtree(images.VariantCache().root, ignore_errors=True)
+        os.remove(self.recipe.image.path)
+        res = self.client.get(images.variant_url(self.recipe, 320))
 
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
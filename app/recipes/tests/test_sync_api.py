@@ -0,0 +1,127 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Recipe, Tag, Ingredient
+from core import deletion
+
+
+SYNC_URL = reverse("recipe:sync")
+
+
+def sample_recipe(user, **params):
+    defaults = {
+        "title": "some-title",
+        "time_minutes": 5,
+        "price": 4.99,
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicSyncApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_login_required(self):
+        res = self.client.get(SYNC_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateSyncApiTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="ehsanadmin@gmail.com",
+            password="some-password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, since=None):
+        return self.client.get(SYNC_URL, {"since": since} if since else {})
+
+    def test_initial_sync_returns_everything(self):
+        recipe = sample_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name="tag")
+        Ingredient.objects.create(user=self.user, name="ingredient")
+        recipe.tags.add(tag)
+
+        res = self.sync()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r["id"] for r in res.data["recipes"]], [recipe.id])
+        self.assertEqual(res.data["recipes"][0]["tags"], [tag.id])
+        self.assertEqual(len(res.data["tags"]), 1)
+        self.assertEqual(len(res.data["ingredients"]), 1)
+        self.assertFalse(res.data["more"])
+
+    def test_sync_without_changes_is_one_query(self):
+        sample_recipe(user=self.user)
+        token = self.sync().data["next"]
+
+        with self.assertNumQueries(1):
+            res = self.sync(token)
+
+        self.assertEqual(res.data["recipes"], [])
+        self.assertEqual(res.data["next"], token)
+
+    def test_sync_returns_updates_and_tombstones(self):
+        kept = sample_recipe(user=self.user)
+        removed = sample_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name="tag")
+        token = self.sync().data["next"]
+
+        kept.title = "new title"
+        kept.save()
+        removed_id = removed.id
+        removed.delete()
+        deletion.delete_in_batches(Tag.objects.filter(id=tag.id))
+        res = self.sync(token)
+
+        self.assertEqual([r["title"] for r in res.data["recipes"]], ["new title"])
+        self.assertEqual(res.data["deleted"]["recipes"], [removed_id])
+        self.assertEqual(res.data["deleted"]["tags"], [tag.id])
+
+    def test_sync_tracks_tag_links_and_clones(self):
+        recipe = sample_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name="tag")
+        token = self.sync().data["next"]
+
+        tag.recipes.add(recipe)
+        clone = Recipe.objects.clone([recipe])[0]
+        res = self.sync(token)
+
+        self.assertEqual(
+            sorted(r["id"] for r in res.data["recipes"]),
+            [recipe.id, clone.id]
+        )
+
+    def test_sync_limited_to_user(self):
+        user2 = get_user_model().objects.create_user(
+            email="user2@gmail.com",
+            password="some-password"
+        )
+        sample_recipe(user=user2)
+
+        res = self.sync()
+
+        self.assertEqual(res.data["recipes"], [])
+
+    @override_settings(SYNC_PAGE_SIZE=2)
+    def test_sync_is_paginated(self):
+        for _ in range(3):
+            sample_recipe(user=self.user)
+
+        first = self.sync()
+        second = self.sync(first.data["next"])
+
+        self.assertTrue(first.data["more"])
+        self.assertEqual(len(first.data["recipes"]), 2)
+        self.assertFalse(second.data["more"])
+        self.assertEqual(len(second.data["recipes"]), 1)
+
+    def test_invalid_token(self):
+        res = self.sync("not-a-token!")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
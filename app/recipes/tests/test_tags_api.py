@@ -3,7 +3,7 @@ from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
-from core.models import Tag
+from core.models import Tag, Recipe
 from recipes.serializers import TagSerializer
 
 
@@ -66,3 +66,112 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.post(TAGS_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_delete_tags(self):
+        tag1 = Tag.objects.create(name="name-1", user=self.user)
+        tag2 = Tag.objects.create(name="name-2", user=self.user)
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title="some-title",
+            time_minutes=5,
+            price=4.99
+        )
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.delete(
+            reverse("recipe:tag-bulk-delete"),
+            {"ids": [tag1.id]},
+            format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(recipe.tags.all()), [tag2])
+        self.assertFalse(Tag.objects.filter(id=tag1.id).exists())
+
+    def test_recipe_count_follows_links(self):
+        tag1 = Tag.objects.create(name="name-1", user=self.user)
+        tag2 = Tag.objects.create(name="name-2", user=self.user)
+        recipe = Recipe.objects.create(user=self.user, title="some-title", time_minutes=5, price=4.99)
+        other = Recipe.objects.create(user=self.user, title="other-title", time_minutes=5, price=4.99)
+
+        recipe.tags.add(tag1, tag2)
+        recipe.tags.add(tag1)
+        tag1.recipes.add(other)
+        recipe.tags.remove(tag2, tag2)
+        tag2.recipes.remove(other)
+        counts = dict(Tag.objects.values_list("id", "recipe_count"))
+
+        self.assertEqual(counts, {tag1.id: 2, tag2.id: 0})
+
+        tag1.recipes.clear()
+        tag1.refresh_from_db()
+        self.assertEqual(tag1.recipe_count, 0)
+
+    def test_recipe_count_after_recipe_delete(self):
+        tag = Tag.objects.create(name="name-1", user=self.user)
+        for _ in range(3):
+            Recipe.objects.create(user=self.user, title="some-title", time_minutes=5, price=4.99).tags.add(tag)
+        recipes = list(Recipe.objects.values_list("id", flat=True))
+
+        Recipe.objects.get(id=recipes[0]).delete()
+        self.client.delete(reverse("recipe:recipe-bulk-delete"), {"ids": recipes[1:2]}, format="json")
+        tag.refresh_from_db()
+
+        self.assertEqual(tag.recipe_count, 1)
+
+    def test_order_tags_by_recipe_count(self):
+        tag1 = Tag.objects.create(name="name-1", user=self.user)
+        tag2 = Tag.objects.create(name="name-2", user=self.user)
+        recipe = Recipe.objects.create(user=self.user, title="some-title", time_minutes=5, price=4.99)
+        recipe.tags.add(tag1)
+
+        res = self.client.get(TAGS_URL, {"ordering": "-recipe_count"})
+
+        self.assertEqual([tag["id"] for tag in res.data], [tag1.id, tag2.id])
+        self.assertEqual(res.data[0]["recipe_count"], 1)
+
+    def test_create_tag_duplicate_name(self):
+        Tag.objects.create(name="Salt", user=self.user)
+
+        res = self.client.post(TAGS_URL, {"name": " salt "})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Tag.objects.count(), 1)
+
+    def test_merge_tags(self):
+        salt = Tag.objects.create(name="Salt", user=self.user)
+        sea_salt = Tag.objects.create(name="Sea salt", user=self.user)
+        flakes = Tag.objects.create(name="Salt flakes", user=self.user)
+        both = Recipe.objects.create(user=self.user, title="some-title", time_minutes=5, price=4.99)
+        both.tags.add(salt, sea_salt)
+        other = Recipe.objects.create(user=self.user, title="other-title", time_minutes=5, price=4.99)
+        other.tags.add(flakes)
+
+        res = self.client.post(
+            reverse("recipe:tag-merge"),
+            {"target": salt.id, "sources": [sea_salt.id, flakes.id]},
+            format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["recipe_count"], 2)
+        self.assertEqual(list(Tag.objects.all()), [salt])
+        self.assertEqual(list(both.tags.all()), [salt])
+        self.assertEqual(list(other.tags.all()), [salt])
+
+    def test_merge_tags_of_other_user(self):
+        user2 = get_user_model().objects.create_user(
+            email="user2@gmail.com",
+            password="some-password"
+        )
+        tag = Tag.objects.create(name="Salt", user=self.user)
+        foreign = Tag.objects.create(name="Salt", user=user2)
+
+        res = self.client.post(
+            reverse("recipe:tag-merge"),
+            {"target": tag.id, "sources": [foreign.id]},
+            format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Tag.objects.filter(id=foreign.id).exists())
@@ -1,6 +1,7 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import views, async_views
 
 app_name = "recipe"
 
@@ -11,5 +12,33 @@ router.register("ingredients", views.IngredientViewSet)
 router.register("recipes", views.RecipeViewSet)
 
 urlpatterns = [
+    path("sync/", views.SyncView.as_view(), name="sync"),
     path("", include(router.urls))
 ]
+
+if settings.ASYNC_READS:
+    urlpatterns = [
+        path("tags/", async_views.read_path(
+            async_views.tag_list,
+            views.TagViewSet.as_view({"get": "list", "post": "create"}),
+            params=["ordering"]
+        )),
+        path("ingredients/", async_views.read_path(
+            async_views.ingredient_list,
+            views.IngredientViewSet.as_view({"get": "list", "post": "create"}),
+            params=["ordering"]
+        )),
+        path("recipes/", async_views.read_path(
+            async_views.recipe_list,
+            views.RecipeViewSet.as_view({"get": "list", "post": "create"})
+        )),
+        path("recipes/<int:pk>/", async_views.read_path(
+            async_views.recipe_detail,
+            views.RecipeViewSet.as_view({
+                "get": "retrieve",
+                "put": "update",
+                "patch": "partial_update",
+                "delete": "destroy"
+            })
+        )),
+    ] + urlpatterns
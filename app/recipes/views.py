@@ -1,22 +1,129 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseBadRequest
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_safe
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
-from core import models
-from . import serializers
+from core import models, deletion, imports, jobs, merge
+from core.mixins import IdempotencyMixin, ReplicaReadMixin
+from core.aggregates import ConcatIds
+from core.coalesce import coalesce, _change_seq
+from core.uploadhandlers import ImageUploadHandler
+from . import serializers, images, sync, indexes
+from .pagination import KeysetPagination
 
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateModelMixin):
+class BulkDeleteMixin:
+    @action(methods=["DELETE"], detail=False, url_path="bulk-delete")
+    def bulk_delete(self, request):
+        serializer = serializers.BulkDeleteSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = self.get_queryset().filter(id__in=serializer.validated_data["ids"])
+        if request.query_params.get("background") in ("1", "true"):
+            job = jobs.enqueue(
+                request.user.id,
+                deletion.delete_objects,
+                queryset.model._meta.label,
+                request.user.id,
+                sorted(set(serializer.validated_data["ids"]))
+            )
+            return Response({"job": job}, status=status.HTTP_202_ACCEPTED)
+
+        return Response(
+            {"deleted": deletion.delete_in_batches(queryset)},
+            status=status.HTTP_200_OK
+        )
+
+    @action(methods=["GET"], detail=False, url_path=r"bulk-delete/(?P<job>[0-9a-f]+)")
+    def bulk_delete_status(self, request, job=None):
+        progress = jobs.get_job(job)
+        if not progress or progress["owner"] != request.user.id:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        return Response(
+            {"status": progress["status"], "deleted": progress["count"]},
+            status=status.HTTP_200_OK
+        )
+
+
+class BaseRecipeAttrViewSet(
+    IdempotencyMixin,
+    ReplicaReadMixin,
+    BulkDeleteMixin,
+    viewsets.GenericViewSet,
+    mixins.ListModelMixin,
+    mixins.CreateModelMixin
+):
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    throttle_scope = "recipe_attrs"
+    throttle_scopes = {"bulk_delete": "bulk", "merge": "bulk"}
+    orderings = {
+        "name": ["name", "id"],
+        "-name": ["-name", "-id"],
+        "recipe_count": ["recipe_count", "id"],
+        "-recipe_count": ["-recipe_count", "-id"],
+    }
+
+    @classmethod
+    def ordering_for(cls, params):
+        return cls.orderings.get(params.get("ordering"), cls.orderings["-name"])
 
     def get_queryset(self):
-        return self.queryset.filter(user=self.request.user).order_by("-name")
+        return self.queryset.filter(user=self.request.user).order_by(*self.ordering_for(self.request.query_params))
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(methods=["POST"], detail=False, url_path="merge")
+    def merge(self, request):
+        serializer = serializers.MergeSerializer(data=request.data, context={"queryset": self.get_queryset()})
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        target = serializer.validated_data["target"]
+        sources = serializer.validated_data["sources"]
+        if request.query_params.get("background") in ("1", "true"):
+            job = jobs.enqueue(request.user.id, merge.merge_into, self.queryset.model._meta.label, target.id, sources)
+            return Response({"job": job}, status=status.HTTP_202_ACCEPTED)
+
+        merge.merge(self.queryset.model, target, sources)
+        target.refresh_from_db()
+        return Response(
+            self.get_serializer(target).data,
+            status=status.HTTP_200_OK
+        )
+
+    @action(methods=["GET"], detail=False, url_path=r"merge/(?P<job>[0-9a-f]+)")
+    def merge_status(self, request, job=None):
+        progress = jobs.get_job(job)
+        if not progress or progress["owner"] != request.user.id:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        return Response(
+            {"status": progress["status"], "moved": progress["count"]},
+            status=status.HTTP_200_OK
+        )
+
 
 class TagViewSet(BaseRecipeAttrViewSet):
     serializer_class = serializers.TagSerializer
@@ -28,19 +135,89 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     queryset = models.Ingredient.objects.all()
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(IdempotencyMixin, ReplicaReadMixin, BulkDeleteMixin, viewsets.ModelViewSet):
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
     queryset = models.Recipe.objects.all()
+    pagination_class = KeysetPagination
+    throttle_scope = "recipes"
+    throttle_scopes = {
+        "upload_image": "uploads",
+        "import_recipes": "bulk",
+        "clone": "bulk",
+        "bulk_delete": "bulk",
+    }
+
+    def get_list_params(self):
+        serializer = serializers.RecipeListQuerySerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
 
     def get_queryset(self):
-        return self.queryset.filter(user=self.request.user).order_by("-id")
+        queryset = self.queryset.filter(user=self.request.user).order_by("-id")
+        if self.action != "list":
+            return queryset
+
+        params = self.get_list_params()
+        if "min_price" in params:
+            queryset = queryset.filter(price__gte=params["min_price"])
+        if "max_price" in params:
+            queryset = queryset.filter(price__lte=params["max_price"])
+        if "max_time" in params:
+            queryset = queryset.filter(time_minutes__lte=params["max_time"])
+        if "ordering" in params:
+            queryset = queryset.order_by(*params["ordering"])
+        if "expand" in params:
+            queryset = queryset.prefetch_related(*params["expand"])
+        return queryset
+
+    @coalesce()
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @coalesce()
+    def list(self, request, *args, **kwargs):
+        # ?expand=tags,ingredients keeps the ids on each recipe and side-loads
+        # every distinct related object once, under included[field][id]. The
+        # prefetch is one query per relation for the whole page.
+        expand = self.get_list_params().get("expand")
+        if not expand:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        recipes = page if page is not None else list(queryset)
+        data = self.get_serializer(recipes, many=True).data
+        included = {field: self._included(recipes, field) for field in expand}
+        if page is not None:
+            response = self.get_paginated_response(data)
+            response.data["included"] = included
+            return response
+
+        return Response(
+            {"results": data, "included": included},
+            status=status.HTTP_200_OK
+        )
+
+    def _included(self, recipes, field):
+        objects = {obj.id: obj for recipe in recipes for obj in getattr(recipe, field).all()}
+        serializer_class = serializers.RecipeListQuerySerializer.EXPANDABLE[field]
+        items = serializer_class(sorted(objects.values(), key=lambda obj: obj.id), many=True).data
+        return {str(item["id"]): item for item in items}
 
     def get_serializer_class(self):
         if self.action == "retrieve":
             return serializers.RecipeDetailSerializer
         elif self.action == "upload_image":
             return serializers.RecipeImageSerializer
+        elif self.action == "clone":
+            return serializers.RecipeCloneSerializer
+        elif self.action == "cookable":
+            return serializers.CookableSerializer
+        elif self.action == "similar":
+            return serializers.SimilarSerializer
+        elif self.action == "shopping_list":
+            return serializers.ShoppingListQuerySerializer
         return serializers.RecipeSerializer
 
     def perform_create(self, serializer):
@@ -48,13 +225,23 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @action(methods=["POST"], detail=True, url_path="upload-image")
     def upload_image(self, request, pk=None):
+        upload_handler = ImageUploadHandler(request)
+        request.upload_handlers.insert(0, upload_handler)
         recipe = self.get_object()
+        old_image = recipe.image.name
         serializer = self.get_serializer(
             recipe,
             data=request.data
         )
+        if upload_handler.error:
+            return Response(
+                {"image": [upload_handler.error]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         if serializer.is_valid():
             serializer.save()
+            if old_image != recipe.image.name:
+                jobs.enqueue(request.user.id, images.render_variants, recipe.id)
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK
@@ -64,3 +251,184 @@ class RecipeViewSet(viewsets.ModelViewSet):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    @action(methods=["GET"], detail=False, url_path="cookable")
+    def cookable(self, request):
+        serializer = self.get_serializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        matches = indexes.cookable(
+            request.user.id,
+            serializer.validated_data["ingredients"],
+            serializer.validated_data["missing"]
+        )
+        ranked = sorted(matches, key=lambda recipe_id: (len(matches[recipe_id]), -recipe_id))
+        ranked = ranked[:settings.PANTRY_RESULT_LIMIT]
+        recipes = self.get_queryset().filter(id__in=ranked).prefetch_related("tags", "ingredients")
+        position = {recipe_id: i for i, recipe_id in enumerate(ranked)}
+        recipes = sorted(recipes, key=lambda recipe: position[recipe.id])
+
+        data = serializers.RecipeSerializer(recipes, many=True).data
+        for item in data:
+            item["missing"] = sorted(matches[item["id"]])
+        return Response(data, status=status.HTTP_200_OK)
+
+    @action(methods=["GET"], detail=True, url_path="similar")
+    def similar(self, request, pk=None):
+        recipe = self.get_object()
+        serializer = self.get_serializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        scores = dict(indexes.similar(
+            request.user.id,
+            recipe.id,
+            serializer.validated_data["k"],
+            serializer.validated_data["metric"]
+        ))
+        recipes = self.get_queryset().filter(id__in=scores).prefetch_related("tags", "ingredients")
+        recipes = sorted(recipes, key=lambda item: (-scores[item.id], item.id))
+
+        data = serializers.RecipeSerializer(recipes, many=True).data
+        for item in data:
+            item["score"] = round(scores[item["id"]], 4)
+        return Response(data, status=status.HTTP_200_OK)
+
+    @action(methods=["GET"], detail=False, url_path="shopping-list")
+    def shopping_list(self, request):
+        serializer = self.get_serializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        ids = serializer.validated_data["ids"]
+        # Keyed on the change_seq of the database the list is read from, so a
+        # lagging replica cannot store its list under the primary's newer seq
+        digest = hashlib.sha1(",".join(map(str, ids)).encode()).hexdigest()
+        cache_key = f"shopping-list:{request.user.id}:{_change_seq(request)}:{digest}"
+        data = cache.get(cache_key)
+        if data is None:
+            items = models.Recipe.ingredients.through.objects.filter(
+                recipe_id__in=ids,
+                recipe__user=request.user
+            ).values("ingredient_id", "ingredient__name").annotate(
+                count=Count("recipe_id"),
+                recipes=ConcatIds("recipe_id")
+            ).order_by("ingredient__name", "ingredient_id")
+            data = serializers.ShoppingListItemSerializer(items, many=True).data
+            cache.set(cache_key, data, settings.SHOPPING_LIST_CACHE_TIMEOUT)
+
+        return Response(data, status=status.HTTP_200_OK)
+
+    @action(methods=["POST"], detail=False, url_path="clone")
+    def clone(self, request):
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        clones = models.Recipe.objects.clone(serializer.validated_data["recipes"])
+        recipes = self.get_queryset().filter(
+            id__in=[recipe.id for recipe in clones]
+        ).prefetch_related("tags", "ingredients")
+
+        return Response(
+            serializers.RecipeSerializer(recipes, many=True).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(methods=["POST"], detail=False, url_path="import", url_name="import", parser_classes=[MultiPartParser])
+    def import_recipes(self, request):
+        serializer = serializers.RecipeImportSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # The upload is gone once the request ends, so the job reads a copy
+        with tempfile.NamedTemporaryFile(suffix=".import", dir=settings.JOB_FILES_DIR, delete=False) as copy:
+            shutil.copyfileobj(serializer.validated_data["file"], copy)
+        job = jobs.enqueue(
+            request.user.id,
+            imports.import_file,
+            request.user.id,
+            copy.name,
+            serializer.validated_data["format"]
+        )
+        return Response({"job": job}, status=status.HTTP_202_ACCEPTED)
+
+    @action(methods=["GET"], detail=False, url_path=r"import/(?P<job>[0-9a-f]+)", url_name="import-status")
+    def import_status(self, request, job=None):
+        progress = jobs.get_job(job)
+        if not progress or progress["owner"] != request.user.id:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        return Response(
+            {"status": progress["status"], "imported": progress["count"], "rejected": progress.get("rejected", [])},
+            status=status.HTTP_200_OK
+        )
+
+
+class SyncView(ReplicaReadMixin, APIView):
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    throttle_scope = "sync"
+
+    def get(self, request):
+        try:
+            since = sync.decode_watermark(request.query_params.get("since"))
+        except ValueError as exc:
+            return Response(
+                {"since": [str(exc)]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(
+            sync.changes_since(request.user, since),
+            status=status.HTTP_200_OK
+        )
+
+
+@require_safe
+def recipe_image_variant(request, pk):
+    recipe = get_object_or_404(models.Recipe.objects.exclude(image=""), pk=pk, image__isnull=False)
+    if request.GET.get("v") != images.image_version(recipe):
+        raise Http404
+
+    fmt = request.GET.get("fmt", "webp")
+    try:
+        width = int(request.GET.get("w", ""))
+    except ValueError:
+        width = None
+    if width not in settings.RECIPE_IMAGE_WIDTHS or fmt not in images.FORMATS:
+        return HttpResponseBadRequest()
+
+    variants = images.VariantCache()
+    content_type = images.FORMATS[fmt][1]
+    try:
+        if settings.RECIPE_IMAGE_SENDFILE_HEADER:
+            path = variants.get(recipe, width, fmt)
+            response = HttpResponse(content_type=content_type)
+            response[settings.RECIPE_IMAGE_SENDFILE_HEADER] = (
+                settings.RECIPE_IMAGE_SENDFILE_PREFIX + os.path.relpath(path, settings.MEDIA_ROOT)
+            )
+        else:
+            response = FileResponse(variants.open_variant(recipe, width, fmt), content_type=content_type)
+    except FileNotFoundError:
+        # The source image file is missing
+        raise Http404
+    response["Cache-Control"] = "public, max-age=31536000, immutable"
+
+    return response
@@ -3,6 +3,8 @@ from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
+from core import jobs
+from core.models import Recipe, Tag, Ingredient
 
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse("user:token")
@@ -29,6 +31,27 @@ class PublicUserApiTests(TestCase):
         self.assertTrue(user.check_password(payload["password"]))
         self.assertNotIn("password", res.data)
 
+    def test_create_user_retry_is_replayed(self):
+        payload = {
+            "email": "test@gmail.com",
+            "password": "some-password",
+            "name": "Test user"
+        }
+        first = self.client.post(CREATE_USER_URL, payload, HTTP_IDEMPOTENCY_KEY="signup")
+        retry = self.client.post(CREATE_USER_URL, payload, HTTP_IDEMPOTENCY_KEY="signup")
+
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(get_user_model().objects.count(), 1)
+
+    def test_anonymous_keys_are_scoped_per_client(self):
+        for number, address in enumerate(("10.0.0.1", "10.0.0.2")):
+            payload = {"email": f"test{number}@gmail.com", "password": "some-password", "name": "Test user"}
+            res = self.client.post(CREATE_USER_URL, payload, HTTP_IDEMPOTENCY_KEY="signup", REMOTE_ADDR=address)
+
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(get_user_model().objects.count(), 2)
+
     def test_user_exists(self):
         payload = {
             "email": "test@gmail.com",
@@ -136,3 +159,35 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(self.user.name, payload["name"])
         self.assertTrue(self.user.check_password(payload["password"]))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_delete_user_profile(self):
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title="some-title",
+            time_minutes=5,
+            price=4.99
+        )
+        recipe.tags.add(Tag.objects.create(user=self.user, name="tag"))
+        recipe.ingredients.add(Ingredient.objects.create(user=self.user, name="ingredient"))
+
+        res = self.client.delete(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(get_user_model().objects.filter(id=self.user.id).exists())
+        self.assertEqual(Recipe.objects.count(), 0)
+        self.assertEqual(Tag.objects.count(), 0)
+        self.assertEqual(Ingredient.objects.count(), 0)
+        self.assertEqual(Recipe.tags.through.objects.count(), 0)
+
+    def test_delete_user_profile_in_background(self):
+        Recipe.objects.create(user=self.user, title="some-title", time_minutes=5, price=4.99)
+
+        res = self.client.delete(ME_URL + "?background=1")
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        jobs.Worker().run(burst=True)
+
+        status_res = APIClient().get(reverse("job-status", args=[res.data["job"]]))
+        self.assertEqual(status_res.status_code, status.HTTP_200_OK)
+        self.assertEqual(status_res.data["status"], "done")
+        self.assertFalse(get_user_model().objects.filter(id=self.user.id).exists())
+        self.assertEqual(Recipe.objects.count(), 0)
@@ -1,22 +1,37 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, authentication, permissions, status
+from rest_framework.response import Response
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
+from core import deletion, jobs
+from core.mixins import IdempotencyMixin, ReplicaReadMixin
 from . import serializers
 
 
-class CreateUserView(generics.CreateAPIView):
+class CreateUserView(IdempotencyMixin, generics.CreateAPIView):
     serializer_class = serializers.UserSerializer
 
 
 class CreateTokenView(ObtainAuthToken):
     serializer_class = serializers.AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(ReplicaReadMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = serializers.UserSerializer
     authentication_classes = [authentication.TokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
         return self.request.user
+
+    def destroy(self, request, *args, **kwargs):
+        user = self.get_object()
+        if request.query_params.get("background") in ("1", "true"):
+            # The account and its token are gone before the job ends, so the
+            # job has no owner and its key alone is enough to poll /api/jobs/
+            job = jobs.enqueue(None, deletion.delete_user_by_id, user.id)
+            return Response({"job": job}, status=status.HTTP_202_ACCEPTED)
+
+        deletion.delete_user(user)
+        return Response(status=status.HTTP_204_NO_CONTENT)